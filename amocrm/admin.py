@@ -4,3 +4,5 @@ from . import models
 
 
 admin.site.register(models.AmoCRMTokens)
+admin.site.register(models.AmoCRMContactStep)
+admin.site.register(models.AmoCRMChatMessage)
@@ -0,0 +1,49 @@
+# Generated by Django 4.1.7 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("amocrm", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AmoCRMContactStep",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("contact_id", models.BigIntegerField(verbose_name="ID контакта")),
+                (
+                    "chat_id",
+                    models.CharField(max_length=100, verbose_name="ID чата"),
+                ),
+                ("step", models.CharField(max_length=32, verbose_name="Шаг")),
+                (
+                    "completed_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Время выполнения"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Шаг обработки контакта",
+                "verbose_name_plural": "Шаги обработки контактов",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="amocrmcontactstep",
+            constraint=models.UniqueConstraint(
+                fields=("contact_id", "chat_id", "step"),
+                name="amocrm_contact_step_unique",
+            ),
+        ),
+    ]
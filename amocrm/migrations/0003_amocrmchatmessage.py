@@ -0,0 +1,54 @@
+# Generated by Django 4.1.7 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("amocrm", "0002_amocrmcontactstep"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AmoCRMChatMessage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "chat_id",
+                    models.CharField(max_length=100, verbose_name="ID чата"),
+                ),
+                (
+                    "message_id",
+                    models.CharField(max_length=100, verbose_name="ID сообщения"),
+                ),
+                (
+                    "origin",
+                    models.CharField(max_length=32, verbose_name="Источник канала"),
+                ),
+                ("sender", models.TextField(verbose_name="Отправитель")),
+                ("receiver", models.TextField(verbose_name="Получатель")),
+                ("time", models.DateTimeField(verbose_name="Время отправки")),
+                ("text", models.TextField(blank=True, verbose_name="Текст")),
+                ("media", models.TextField(blank=True, verbose_name="Вложения")),
+            ],
+            options={
+                "verbose_name": "Сообщение переписки",
+                "verbose_name_plural": "Сообщения переписок",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="amocrmchatmessage",
+            constraint=models.UniqueConstraint(
+                fields=("chat_id", "message_id"),
+                name="amocrm_chat_message_unique",
+            ),
+        ),
+    ]
@@ -23,3 +23,85 @@ class AmoCRMTokens(models.Model):
 
     def __str__(self) -> str:
         return self.manager_name[:15]
+
+
+class AmoCRMContactStep(models.Model):
+    """Выполненный шаг обработки канала контакта"""
+
+    contact_id = models.BigIntegerField(
+        verbose_name=_("ID контакта"),
+    )
+    chat_id = models.CharField(
+        max_length=100,
+        verbose_name=_("ID чата"),
+    )
+    step = models.CharField(
+        max_length=32,
+        verbose_name=_("Шаг"),
+    )
+    completed_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_("Время выполнения"),
+    )
+
+    class Meta:
+        verbose_name = _("Шаг обработки контакта")
+        verbose_name_plural = _("Шаги обработки контактов")
+        constraints = [
+            # Ограничение заодно служит индексом для выборки шагов контакта.
+            models.UniqueConstraint(
+                fields=["contact_id", "chat_id", "step"],
+                name="amocrm_contact_step_unique",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.contact_id}:{self.chat_id[:15]}:{self.step}"
+
+
+class AmoCRMChatMessage(models.Model):
+    """Сообщение выгруженной переписки amojo"""
+
+    chat_id = models.CharField(
+        max_length=100,
+        verbose_name=_("ID чата"),
+    )
+    message_id = models.CharField(
+        max_length=100,
+        verbose_name=_("ID сообщения"),
+    )
+    origin = models.CharField(
+        max_length=32,
+        verbose_name=_("Источник канала"),
+    )
+    sender = models.TextField(
+        verbose_name=_("Отправитель"),
+    )
+    receiver = models.TextField(
+        verbose_name=_("Получатель"),
+    )
+    time = models.DateTimeField(
+        verbose_name=_("Время отправки"),
+    )
+    text = models.TextField(
+        blank=True,
+        verbose_name=_("Текст"),
+    )
+    media = models.TextField(
+        blank=True,
+        verbose_name=_("Вложения"),
+    )
+
+    class Meta:
+        verbose_name = _("Сообщение переписки")
+        verbose_name_plural = _("Сообщения переписок")
+        constraints = [
+            # Повторно выгруженные сообщения отбрасываются при вставке.
+            models.UniqueConstraint(
+                fields=["chat_id", "message_id"],
+                name="amocrm_chat_message_unique",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.chat_id[:15]}:{self.message_id[:15]}"
@@ -0,0 +1,20 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class AmoCRMAccount:
+    """Настройки подключения к одному аккаунту amoCRM"""
+
+    # Уникальный идентификатор аккаунта, например поддомен.
+    account_id: str
+    # Базовый URL аккаунта, например https://example.amocrm.ru.
+    base_url: str
+    # Базовый URL amojo-сервера аккаунта.
+    amojo_base_url: str
+    # Данные интеграции.
+    secret_key: str
+    integration_id: str
+    auth_code: str
+    redirect_url: str
+    # Ограничение частоты запросов к аккаунту в секунду.
+    rate_limit: float = 7
@@ -0,0 +1,361 @@
+import time
+import threading
+from typing import (
+    Callable,
+    Iterator,
+)
+from contextlib import contextmanager
+from collections import OrderedDict
+
+import requests
+
+from ..core.client import AmoCRMClient
+from ..amojo.client import AmoJoClient
+from ..utils.rate_limiter import RateLimiter
+from ..utils.single_flight import SingleFlight
+from ..utils.circuit_breaker import CircuitBreakerRegistry
+from ..tokens.interfaces.token_managed import ITokenManaged
+from ..tokens.managers.memory_tokens_manager import MemoryTokensManager
+from ..instrumentation.interfaces.request_hook import IRequestHook
+
+from .account import AmoCRMAccount
+from .exceptions import AmoCRMUnknownAccountException
+
+
+# Фабрика менеджеров токенов: (ID аккаунта, имя клиента) -> менеджер.
+TokensManagerFactory = Callable[[str, str], ITokenManaged]
+
+
+def _memory_tokens_manager_factory(account_id: str, client_name: str) -> ITokenManaged:
+    return MemoryTokensManager()
+
+
+class AmoCRMAccountClients:
+    """
+    Клиенты одного аккаунта amoCRM.
+
+    Клиенты amoCRM и amojo создаются лениво при первом обращении и разделяют
+    общие для аккаунта пул соединений, ограничитель частоты запросов и
+    объединение одинаковых одновременных GET-запросов.
+    """
+
+    def __init__(
+        self,
+        account: AmoCRMAccount,
+        tokens_manager_factory: TokensManagerFactory,
+        request_hooks: list[IRequestHook] | None = None,
+        circuit_breakers: CircuitBreakerRegistry | None = None,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param account: Настройки аккаунта.
+        :param tokens_manager_factory: Фабрика менеджеров токенов.
+        :param request_hooks: Хуки, вызываемые до и после каждого запроса.
+        :param circuit_breakers: Реестр предохранителей по хостам.
+        """
+
+        self.__account = account
+        self.__tokens_manager_factory = tokens_manager_factory
+        self.__request_hooks = request_hooks
+        self.__circuit_breakers = circuit_breakers
+
+        self.__session = requests.Session()
+        self.__rate_limiter = RateLimiter(account.rate_limit)
+        self.__single_flight = SingleFlight()
+
+        self.__lock = threading.Lock()
+        self.__amocrm_client: AmoCRMClient | None = None
+        self.__amojo_client: AmoJoClient | None = None
+
+    @property
+    def account(self) -> AmoCRMAccount:
+        return self.__account
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return self.__rate_limiter
+
+    @property
+    def amocrm_client(self) -> AmoCRMClient:
+        with self.__lock:
+            if self.__amocrm_client is None:
+                self.__amocrm_client = AmoCRMClient(
+                    base_url=self.__account.base_url,
+                    secret_key=self.__account.secret_key,
+                    integration_id=self.__account.integration_id,
+                    auth_code=self.__account.auth_code,
+                    redirect_url=self.__account.redirect_url,
+                    tokens_manager=self.__tokens_manager_factory(
+                        self.__account.account_id, "amocrm_client"
+                    ),
+                    request_hooks=self.__request_hooks,
+                    session=self.__session,
+                    rate_limiter=self.__rate_limiter,
+                    circuit_breakers=self.__circuit_breakers,
+                    single_flight=self.__single_flight,
+                )
+
+            return self.__amocrm_client
+
+    @property
+    def amojo_client(self) -> AmoJoClient:
+        amocrm_client = self.amocrm_client
+
+        with self.__lock:
+            if self.__amojo_client is None:
+                self.__amojo_client = AmoJoClient(
+                    base_url=self.__account.amojo_base_url,
+                    amocrm_client=amocrm_client,
+                    tokens_manager=self.__tokens_manager_factory(
+                        self.__account.account_id, "amojo_client"
+                    ),
+                    request_hooks=self.__request_hooks,
+                    session=self.__session,
+                    rate_limiter=self.__rate_limiter,
+                    circuit_breakers=self.__circuit_breakers,
+                    single_flight=self.__single_flight,
+                )
+
+            return self.__amojo_client
+
+    def close(self) -> None:
+        """Закрытие соединений аккаунта"""
+
+        self.__session.close()
+
+
+class _PoolEntry:
+    """Запись пула: клиенты аккаунта и учет их использования"""
+
+    __slots__ = ("clients", "leases", "last_used_at")
+
+    def __init__(self, clients: AmoCRMAccountClients) -> None:
+        self.clients = clients
+        self.leases = 0
+        self.last_used_at = time.monotonic()
+
+
+class AmoCRMClientsPool:
+    """
+    Пул клиентов для нескольких аккаунтов amoCRM.
+
+    Клиенты аккаунта создаются лениво при первом обращении. У каждого аккаунта
+    свои токены, пул соединений и ограничитель частоты запросов, поэтому
+    нагрузка на один аккаунт не расходует лимит других.
+
+    Количество аккаунтов с живыми клиентами ограничено `max_accounts`: при
+    переполнении закрываются клиенты давно не использованных аккаунтов.
+    Аккаунты, клиенты которых сейчас используются (см. `lease`), не вытесняются.
+    Менеджеры токенов при вытеснении сохраняются: токены удаляются только
+    вместе с аккаунтом (см. `unregister`).
+    """
+
+    def __init__(
+        self,
+        tokens_manager_factory: TokensManagerFactory = _memory_tokens_manager_factory,
+        max_accounts: int = 100,
+        request_hooks: list[IRequestHook] | None = None,
+        circuit_breakers: CircuitBreakerRegistry | None = None,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param tokens_manager_factory:
+            Фабрика менеджеров токенов, принимающая ID аккаунта и имя клиента
+            (`amocrm_client` или `amojo_client`). Вызывается один раз на пару
+            "аккаунт, клиент", менеджеры переживают вытеснение аккаунта из пула.
+        :param max_accounts: Максимальное количество аккаунтов с живыми клиентами.
+        :param request_hooks: Хуки, вызываемые до и после каждого запроса.
+        :param circuit_breakers:
+            Реестр предохранителей по хостам, общий для всех аккаунтов. Хост
+            amojo у аккаунтов общий, поэтому его недоступность заметят все.
+        """
+
+        self.__tokens_manager_factory = tokens_manager_factory
+        # Менеджеры токенов хранятся вне записей пула: при вытеснении аккаунта
+        # закрываются только его соединения, а токены остаются. Иначе
+        # пересозданным клиентам пришлось бы снова авторизоваться по
+        # одноразовому коду, который уже использован.
+        self.__tokens_managers: dict[tuple[str, str], ITokenManaged] = {}
+        self.__tokens_managers_lock = threading.Lock()
+        self.__max_accounts = max_accounts
+        self.__request_hooks = request_hooks
+        self.__circuit_breakers = circuit_breakers
+
+        self.__accounts: dict[str, AmoCRMAccount] = {}
+        self.__entries: OrderedDict[str, _PoolEntry] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def register(self, account: AmoCRMAccount) -> None:
+        """
+        Регистрация аккаунта в пуле.
+
+        Если аккаунт уже был зарегистрирован с другими настройками, его
+        клиенты будут пересозданы при следующем обращении.
+
+        :param account: Настройки аккаунта.
+        """
+
+        with self.__lock:
+            previous = self.__accounts.get(account.account_id)
+            self.__accounts[account.account_id] = account
+            if previous is not None and previous != account:
+                entry = self.__entries.pop(account.account_id, None)
+                if entry is not None and entry.leases == 0:
+                    entry.clients.close()
+
+    def unregister(self, account_id: str) -> None:
+        """
+        Удаление аккаунта из пула вместе с менеджерами его токенов.
+
+        :param account_id: ID аккаунта.
+        """
+
+        with self.__lock:
+            self.__accounts.pop(account_id, None)
+            entry = self.__entries.pop(account_id, None)
+            if entry is not None and entry.leases == 0:
+                entry.clients.close()
+
+        with self.__tokens_managers_lock:
+            for key in [key for key in self.__tokens_managers if key[0] == account_id]:
+                del self.__tokens_managers[key]
+
+    @property
+    def accounts(self) -> list[str]:
+        with self.__lock:
+            return list(self.__accounts)
+
+    @property
+    def active_accounts(self) -> list[str]:
+        """ID аккаунтов, клиенты которых сейчас созданы"""
+
+        with self.__lock:
+            return list(self.__entries)
+
+    def get(self, account_id: str) -> AmoCRMAccountClients:
+        """
+        Получение клиентов аккаунта.
+
+        Клиенты, полученные этим методом, могут быть вытеснены из пула, пока
+        ими пользуются. Для длительной работы используйте `lease`.
+
+        :param account_id: ID аккаунта.
+
+        :raise AmoCRMUnknownAccountException: Если аккаунт не зарегистрирован.
+
+        :return: Клиенты аккаунта.
+        """
+
+        with self.__lock:
+            return self.__get_entry(account_id).clients
+
+    @contextmanager
+    def lease(self, account_id: str) -> Iterator[AmoCRMAccountClients]:
+        """
+        Получение клиентов аккаунта на время работы с ними.
+
+        Пока клиенты арендованы, аккаунт не вытесняется из пула.
+
+        :param account_id: ID аккаунта.
+
+        :raise AmoCRMUnknownAccountException: Если аккаунт не зарегистрирован.
+        """
+
+        with self.__lock:
+            entry = self.__get_entry(account_id)
+            entry.leases += 1
+
+        try:
+            yield entry.clients
+        finally:
+            with self.__lock:
+                entry.leases -= 1
+                entry.last_used_at = time.monotonic()
+                # Аккаунт мог быть удален или перерегистрирован во время аренды.
+                if self.__entries.get(account_id) is not entry and entry.leases == 0:
+                    entry.clients.close()
+                self.__evict()
+
+    def evict_idle(self, idle_seconds: float) -> list[str]:
+        """
+        Закрытие клиентов аккаунтов, которые не использовались дольше заданного.
+
+        :param idle_seconds: Время простоя в секундах.
+
+        :return: ID аккаунтов, клиенты которых были закрыты.
+        """
+
+        threshold = time.monotonic() - idle_seconds
+        evicted: list[str] = []
+
+        with self.__lock:
+            for account_id, entry in list(self.__entries.items()):
+                if entry.leases == 0 and entry.last_used_at < threshold:
+                    del self.__entries[account_id]
+                    entry.clients.close()
+                    evicted.append(account_id)
+
+        return evicted
+
+    def close(self) -> None:
+        """Закрытие клиентов всех аккаунтов"""
+
+        with self.__lock:
+            for entry in self.__entries.values():
+                entry.clients.close()
+            self.__entries.clear()
+
+    def __get_entry(self, account_id: str) -> _PoolEntry:
+        """Получение записи пула с созданием при необходимости. Вызывать под блокировкой"""
+
+        entry = self.__entries.get(account_id)
+        if entry is None:
+            account = self.__accounts.get(account_id)
+            if account is None:
+                raise AmoCRMUnknownAccountException(account_id)
+
+            # Сами клиенты создаются лениво, поэтому здесь нет сетевых запросов.
+            entry = _PoolEntry(
+                AmoCRMAccountClients(
+                    account,
+                    self.__get_tokens_manager,
+                    self.__request_hooks,
+                    self.__circuit_breakers,
+                )
+            )
+            self.__entries[account_id] = entry
+            self.__evict()
+        else:
+            self.__entries.move_to_end(account_id)
+
+        entry.last_used_at = time.monotonic()
+        return entry
+
+    def __get_tokens_manager(self, account_id: str, client_name: str) -> ITokenManaged:
+        """Получение менеджера токенов клиента аккаунта с созданием при необходимости"""
+
+        # Клиенты создаются вне блокировки пула, поэтому у менеджеров своя.
+        with self.__tokens_managers_lock:
+            key = (account_id, client_name)
+            tokens_manager = self.__tokens_managers.get(key)
+            if tokens_manager is None:
+                tokens_manager = self.__tokens_managers[key] = (
+                    self.__tokens_manager_factory(account_id, client_name)
+                )
+
+            return tokens_manager
+
+    def __evict(self) -> None:
+        """Вытеснение давно не использованных аккаунтов. Вызывать под блокировкой"""
+
+        if len(self.__entries) <= self.__max_accounts:
+            return
+
+        for account_id, entry in list(self.__entries.items()):
+            if len(self.__entries) <= self.__max_accounts:
+                break
+            if entry.leases == 0:
+                del self.__entries[account_id]
+                entry.clients.close()
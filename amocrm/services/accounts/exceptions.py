@@ -0,0 +1,10 @@
+class AmoCRMUnknownAccountException(Exception):
+    """Исключение при обращении к незарегистрированному аккаунту amoCRM"""
+
+    def __init__(self, account_id: str) -> None:
+        """Инициализатор класса"""
+
+        self.account_id = account_id
+        self.message = f"Аккаунт amoCRM {account_id} не зарегистрирован"
+
+        super().__init__(self.message)
@@ -1,13 +1,25 @@
-import json
 import requests
-from typing import Self
+from typing import (
+    Any,
+    Self,
+    Iterator,
+)
 from datetime import datetime
 from dataclasses import dataclass
 
 from ..utils.request_status import HTTPStatus
+from ..utils.json_codec import (
+    JSONCodec,
+    convert,
+    get_json_codec,
+)
 from ..core.exceptions import AmoCRMResponseException
 
 from .client import AmoJoClient
+from .schemas import (
+    AmoJoMessage,
+    AmoJoOriginProfile,
+)
 from .endpoints import AmoJoClosedEndpoints
 
 
@@ -25,6 +37,137 @@ class AmoJoChatUnloader:
         time: datetime
         text: str
         media: str
+        # ID сообщения в amojo. По нему отбрасываются повторно выгруженные сообщения.
+        message_id: str
+        # ID чата, из которого выгружено сообщение.
+        chat_id: str
+
+        @classmethod
+        def from_schema(
+            cls, message: AmoJoMessage, chat_id: str, json_codec: JSONCodec
+        ) -> "AmoJoChatUnloader.ChatMessage":
+            """
+            Сообщение из разобранного сообщения amojo.
+
+            Единственное место, где поля ответа amojo переводятся в поля
+            `ChatMessage`: им пользуются и обычная выгрузка, и `LazyChatMessage`.
+
+            :param message: Сообщение по схеме ответа amojo.
+            :param chat_id: ID чата, из которого выгружено сообщение.
+            :param json_codec: Кодек для разбора вложенного профиля канала.
+
+            :raise JSONSchemaException: Если профиль не соответствует схеме.
+            """
+
+            phone = json_codec.decode(
+                message.recipient.origin_profile, AmoJoOriginProfile
+            ).profile.phone
+            return cls(
+                sender=message.author.full_name,
+                receiver=f"{message.recipient.full_name} {phone}",
+                time=datetime.fromtimestamp(message.created_at),
+                text=message.text,
+                media=message.message.media,
+                message_id=message.id,
+                chat_id=chat_id,
+            )
+
+    class LazyChatMessage:
+        """
+        Представление сообщения amojo, поля которого разбираются при обращении.
+
+        Создание представления ничего не разбирает: время, получатель и
+        профиль канала вычисляются только при чтении соответствующих полей,
+        и при каждом чтении заново. Исходные данные доступны через `raw`.
+        """
+
+        __slots__ = ("__data", "__chat_id", "__json_codec")
+
+        def __init__(
+            self,
+            data: dict[str, Any],
+            chat_id: str,
+            json_codec: JSONCodec | None = None,
+        ) -> None:
+            """
+            Инициализатор класса.
+
+            :param data: Данные сообщения из ответа amojo.
+            :param chat_id: ID чата, из которого выгружено сообщение.
+            :param json_codec: Кодек для разбора вложенного профиля канала.
+            """
+
+            self.__data = data
+            self.__chat_id = chat_id
+            self.__json_codec = json_codec or get_json_codec()
+
+        @property
+        def raw(self) -> dict[str, Any]:
+            return self.__data
+
+        @property
+        def message_id(self) -> str:
+            return self.__data["id"]
+
+        @property
+        def chat_id(self) -> str:
+            return self.__chat_id
+
+        @property
+        def sender(self) -> str:
+            return self.__data["author"]["full_name"]
+
+        @property
+        def receiver(self) -> str:
+            recipient = self.__data["recipient"]
+            phone = self.__json_codec.loads(recipient["origin_profile"])["profile"][
+                "phone"
+            ]
+            return f"{recipient['full_name']} {phone}"
+
+        @property
+        def time(self) -> datetime:
+            return datetime.fromtimestamp(self.__data["created_at"])
+
+        @property
+        def text(self) -> str:
+            return self.__data["text"]
+
+        @property
+        def media(self) -> str:
+            return self.__data["message"]["media"]
+
+        def to_message(self) -> "AmoJoChatUnloader.ChatMessage":
+            """
+            Разбор всех полей в объект `ChatMessage`.
+
+            Данные проверяются по схеме `AmoJoMessage`, как и при обычной выгрузке.
+
+            :raise JSONSchemaException: Если сообщение не соответствует схеме.
+            """
+
+            return AmoJoChatUnloader.ChatMessage.from_schema(
+                convert(self.__data, AmoJoMessage), self.__chat_id, self.__json_codec
+            )
+
+    @dataclass
+    class SizeEstimate:
+        """Оценка размера чата, полученная пробными запросами"""
+
+        # Количество страниц выгрузки.
+        pages: int
+        # Размер страницы выгрузки.
+        page_size: int
+        # Оценка ограничена сверху: настоящее количество страниц может быть больше.
+        is_lower_bound: bool
+        # Количество пробных запросов.
+        probes: int
+
+        @property
+        def messages(self) -> int:
+            """Оценка количества сообщений сверху (с точностью до страницы)"""
+
+            return self.pages * self.page_size
 
     def __init__(self, amojo_client: AmoJoClient, chat_id: str) -> None:
         """
@@ -61,16 +204,147 @@ class AmoJoChatUnloader:
         :return: Некоторый набор сообщений из чата.
         """
 
-        # Делаем запрос на получение очередной пачки сообщений из чата.
+        response = self.__request_page()
+        if response is None:
+            raise StopIteration()
+
+        # Парсим сообщения из ответа в объекты.
+        messages = self.__get_messages_from_response(response)
+        if len(messages) == 0:
+            raise StopIteration()
+
+        self.__next_page()
+
+        return messages
+
+    def iter_raw_pages(self) -> Iterator[bytes]:
+        """
+        Выгрузка сообщений чата в виде сырых страниц.
+
+        Тело каждого ответа amojo (JSON-массив сообщений) отдается как есть,
+        без разбора JSON и создания объектов сообщений.
+
+        :raise AmoCRMResponseException: В случае ошибки выгрузки сообщений.
+
+        :return: Итератор по телам ответов amojo.
+        """
+
+        self.__offset = 0
+        self.__limit = 100
+
+        while True:
+            response = self.__request_page()
+            if response is None:
+                return
+
+            page = response.content
+            if page.strip() == b"[]":
+                return
+
+            yield page
+
+            self.__next_page()
+
+    def iter_lazy_pages(self) -> Iterator[list[LazyChatMessage]]:
+        """
+        Выгрузка сообщений чата в виде ленивых представлений.
+
+        Страница декодируется из JSON целиком, но поля сообщений разбираются
+        только при обращении к ним (см. `LazyChatMessage`).
+
+        :raise AmoCRMResponseException: В случае ошибки выгрузки сообщений.
+
+        :return: Итератор по страницам представлений сообщений.
+        """
+
+        json_codec = self.__amojo_client.json_codec
+        for page in self.iter_raw_pages():
+            yield [
+                self.LazyChatMessage(message_data, self.__chat_id, json_codec)
+                for message_data in json_codec.loads(page)
+            ]
+
+    def probe_size(self, max_pages: int = 64) -> SizeEstimate:
+        """
+        Дешевая оценка количества страниц выгрузки без выгрузки сообщений.
+
+        Наличие сообщений на странице проверяется запросом одного сообщения
+        с ее начала. Сначала количество проверяемых страниц удваивается, пока
+        не найдется пустая, затем граница уточняется двоичным поиском. Для чата
+        из `n` страниц нужно около `2 * log2(n)` запросов по одному сообщению.
+
+        :param max_pages:
+            Сколько страниц проверять не больше. Если столько страниц есть,
+            оценка считается ограниченной снизу.
+
+        :raise AmoCRMResponseException: В случае ошибки запроса сообщений.
+
+        :return: Оценка размера чата.
+        """
+
+        page_size = self.__delta
+        probes = 0
+
+        def has_page(page: int) -> bool:
+            nonlocal probes
+            probes += 1
+            response = self.__request_messages(page * page_size, 1)
+            return response is not None and response.content.strip() != b"[]"
+
+        if not has_page(0):
+            return self.SizeEstimate(0, page_size, False, probes)
+
+        # Страница `low` есть. Удваиваем `high`, пока не найдется пустая страница.
+        low, high = 0, 1
+        while high < max_pages and has_page(high):
+            low, high = high, high * 2
+        if high >= max_pages:
+            # Последнюю допустимую страницу еще не проверяли.
+            if low == max_pages - 1 or has_page(max_pages - 1):
+                return self.SizeEstimate(max_pages, page_size, True, probes)
+            high = max_pages - 1
+
+        # Страница `low` есть, страницы `high` нет.
+        while high - low > 1:
+            middle = (low + high) // 2
+            if has_page(middle):
+                low = middle
+            else:
+                high = middle
+
+        return self.SizeEstimate(low + 1, page_size, False, probes)
+
+    def __request_page(self) -> requests.Response | None:
+        """
+        Запрос очередной пачки сообщений из чата.
+
+        :raise AmoCRMResponseException: В случае ошибки выгрузки сообщений.
+
+        :return: Объект HTTP-ответа или None, если сообщений больше нет.
+        """
+
+        return self.__request_messages(self.__offset, self.__limit)
+
+    def __request_messages(self, offset: int, limit: int) -> requests.Response | None:
+        """
+        Запрос сообщений чата.
+
+        :param offset: Смещение первого сообщения.
+        :param limit: Значение параметра limit.
+
+        :raise AmoCRMResponseException: В случае ошибки выгрузки сообщений.
+
+        :return: Объект HTTP-ответа или None, если сообщений нет.
+        """
+
         response = self.__amojo_client.request(
             method="get",
-            url_postfix=AmoJoClosedEndpoints.GET_CHAT_MESSAGES.format(  # type: ignore[str-format]
-                amojo_id=self.__amojo_id
-            ),
+            url_postfix=AmoJoClosedEndpoints.GET_CHAT_MESSAGES,
+            path_params={"amojo_id": self.__amojo_id},
             params={
                 "stand": "v15",
-                "offset": self.__offset,
-                "limit": self.__limit,
+                "offset": offset,
+                "limit": limit,
                 "chat_id[]": self.__chat_id,
                 "get_tags": True,
                 "lang": "ru",
@@ -78,56 +352,42 @@ class AmoJoChatUnloader:
         )
 
         if response.status_code == HTTPStatus.HTTP_204_NO_CONTENT:
-            raise StopIteration()
+            return None
         if response.status_code != HTTPStatus.HTTP_200_OK:
             raise AmoCRMResponseException(
                 message=(
                     f"Ошибка при выгрузке сообщений "
-                    f"[{self.__offset} - {self.__limit}] из чата {self.__chat_id}"
+                    f"[{offset} - {limit}] из чата {self.__chat_id}"
                 ),
                 response=response,
             )
 
-        # Парсим сообщения из ответа в объекты.
-        messages = self.__get_messages_from_response(response)
-        if len(messages) == 0:
-            raise StopIteration()
+        return response
+
+    def __next_page(self) -> None:
+        """Смещение параметров offset и limit для получения следующих сообщений"""
 
-        # Смещаем параметры offset и limit для получения следующих сообщений.
         self.__offset += self.__delta
         self.__limit += self.__delta
 
-        return messages
-
     def __get_messages_from_response(
         self, response: requests.Response
     ) -> list[ChatMessage]:
         """
         Получение списка сообщений из тела HTTP-ответа.
 
+        Тело разбирается сразу в объекты схемы `AmoJoMessage` с проверкой типов
+        полей, без промежуточных словарей.
+
         :param response: Объект HTTP-ответа, содержащий данные с сообщениями.
 
+        :raise JSONSchemaException: Если ответ не соответствует схеме.
+
         :return: Список объектов `ChatMessages`.
         """
 
-        messages: list[self.ChatMessage] = []  # type: ignore[name-defined]
-
-        for message_data in response.json():
-            sender = message_data["author"]["full_name"]
-            receiver = message_data["recipient"]["full_name"]
-            receiver_phone = json.loads(message_data["recipient"]["origin_profile"])[
-                "profile"
-            ]["phone"]
-            time = datetime.fromtimestamp(message_data["created_at"])
-
-            messages.append(
-                self.ChatMessage(
-                    sender=sender,
-                    receiver=f"{receiver} {receiver_phone}",
-                    time=time,
-                    text=message_data["text"],
-                    media=message_data["message"]["media"],
-                )
-            )
-
-        return messages
+        json_codec = self.__amojo_client.json_codec
+        return [
+            self.ChatMessage.from_schema(message, self.__chat_id, json_codec)
+            for message in json_codec.decode(response.content, list[AmoJoMessage])
+        ]
@@ -1,3 +1,4 @@
+import requests
 from typing import Any
 
 from ..core import endpoints
@@ -5,11 +6,17 @@ from ..core import exceptions
 from ..core.client import AmoCRMClient
 
 from ..utils.request_status import HTTPStatus
+from ..utils.rate_limiter import RateLimiter
+from ..utils.json_codec import JSONCodec
+from ..utils.single_flight import SingleFlight
+from ..utils.circuit_breaker import CircuitBreakerRegistry
 from ..utils.base_api_client import BaseAPIClient
 
 from ..tokens import Tokens
 from ..tokens.interfaces.token_managed import ITokenManaged
 
+from ..instrumentation.interfaces.request_hook import IRequestHook
+
 
 class AmoJoClient(BaseAPIClient):
     """
@@ -24,6 +31,12 @@ class AmoJoClient(BaseAPIClient):
         amocrm_client: AmoCRMClient,
         tokens_manager: ITokenManaged,
         amojo_id: str | None = None,
+        request_hooks: list[IRequestHook] | None = None,
+        session: requests.Session | None = None,
+        rate_limiter: RateLimiter | None = None,
+        circuit_breakers: CircuitBreakerRegistry | None = None,
+        json_codec: JSONCodec | None = None,
+        single_flight: SingleFlight | None = None,
     ) -> None:
         """
         Инициализатор класса.
@@ -36,9 +49,23 @@ class AmoJoClient(BaseAPIClient):
         :param amojo_id:
             ID аккаунта amoCRM на сервере API Чатов. Если None, то
             парамер будет запрошен через объект `amocrm_client`.
+        :param request_hooks: Хуки, вызываемые до и после каждого запроса.
+        :param session: HTTP-сессия с пулом соединений.
+        :param rate_limiter: Ограничитель частоты запросов.
+        :param circuit_breakers: Реестр предохранителей по хостам.
+        :param json_codec: Кодек для разбора ответов.
+        :param single_flight: Объединение одинаковых одновременных GET-запросов.
         """
 
-        super().__init__(base_url)
+        super().__init__(
+            base_url,
+            request_hooks,
+            session,
+            rate_limiter,
+            circuit_breakers,
+            json_codec,
+            single_flight,
+        )
 
         self.__amocrm_client = amocrm_client
         self.__amojo_id = amojo_id or self.__get_amojo_id()
@@ -59,7 +86,7 @@ class AmoJoClient(BaseAPIClient):
         if response.status_code != HTTPStatus.HTTP_200_OK:
             raise exceptions.AmoCRMResponseException(response)
 
-        return response.json()["amojo_id"]
+        return self.decode_json(response)["amojo_id"]
 
     @property
     def amojo_id(self) -> str:
@@ -68,6 +95,18 @@ class AmoJoClient(BaseAPIClient):
     def _authorization(self) -> None:
         """Обновление токена авторизации"""
 
+        with self.__tokens_manager.refresh_lock():
+            # Сессию мог уже создать другой клиент с тем же менеджером токенов.
+            stored_tokens = self.__tokens_manager.get_tokens()
+            if stored_tokens is not None and stored_tokens != self.__tokens:
+                self.__tokens = stored_tokens
+                return
+
+            self.__create_session()
+
+    def __create_session(self) -> None:
+        """Создание сессии сервера API Чатов и сохранение ее токенов"""
+
         # Получим токены для сервера API Чатов.
         response = self.__amocrm_client.request(
             method="post",
@@ -83,7 +122,7 @@ class AmoJoClient(BaseAPIClient):
         if response.status_code != HTTPStatus.HTTP_200_OK:
             raise exceptions.AmoCRMAuthException(response)
 
-        response_data: dict[str, Any] = response.json()
+        response_data: dict[str, Any] = self.decode_json(response)
         new_tokens = Tokens(
             response_data["response"]["chats"]["session"]["access_token"],
             response_data["response"]["chats"]["session"]["refresh_token"],
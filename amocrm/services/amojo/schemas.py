@@ -0,0 +1,57 @@
+"""
+Схемы ответов amojo, которые разбираются сразу в объекты.
+
+Схемы содержат только используемые поля, остальные поля ответов отбрасываются
+при разборе. Разбор выполняется `JSONCodec.decode` за один проход.
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class AmoJoAuthor:
+    """Автор сообщения"""
+
+    full_name: str
+
+
+@dataclass(slots=True)
+class AmoJoRecipient:
+    """Получатель сообщения"""
+
+    full_name: str
+    # Профиль канала получателя, JSON в строке.
+    origin_profile: str
+
+
+@dataclass(slots=True)
+class AmoJoMessageBody:
+    """Содержимое сообщения"""
+
+    media: str
+
+
+@dataclass(slots=True)
+class AmoJoMessage:
+    """Сообщение чата"""
+
+    id: str
+    created_at: int
+    text: str
+    author: AmoJoAuthor
+    recipient: AmoJoRecipient
+    message: AmoJoMessageBody
+
+
+@dataclass(slots=True)
+class AmoJoProfile:
+    """Профиль канала из `AmoJoRecipient.origin_profile`"""
+
+    phone: str
+
+
+@dataclass(slots=True)
+class AmoJoOriginProfile:
+    """Содержимое `AmoJoRecipient.origin_profile`"""
+
+    profile: AmoJoProfile
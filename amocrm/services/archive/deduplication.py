@@ -0,0 +1,147 @@
+import threading
+from collections import OrderedDict
+
+from ..amojo.chat_unloader import AmoJoChatUnloader
+
+from .interfaces.chat_messages_sink import IChatMessagesSink
+
+
+class ChatMessagesDeduplicator:
+    """
+    Индекс уже сохраненных сообщений для отбрасывания повторов.
+
+    Сообщения выгружаются повторно при повторах задач и из-за пересекающихся
+    страниц amojo. Для каждого чата хранится множество ID уже сохраненных
+    сообщений. Используется точное множество самих ID, а не фильтр Блума или
+    хеши: ложное срабатывание или коллизия означали бы потерю сообщения.
+
+    Память ограничена: хранится не больше `max_chats` чатов (давно не
+    использованные вытесняются) и не больше `max_messages_per_chat` ID на
+    чат (вытесняются самые старые). После вытеснения повтор уже не будет
+    отброшен здесь, и его должно отбросить уникальное ограничение хранилища.
+
+    Потокобезопасен.
+    """
+
+    def __init__(
+        self,
+        max_chats: int = 10_000,
+        max_messages_per_chat: int = 100_000,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param max_chats: Максимальное количество чатов в индексе.
+        :param max_messages_per_chat:
+            Максимальное количество сообщений одного чата в индексе.
+        """
+
+        self.__max_chats = max_chats
+        self.__max_messages_per_chat = max_messages_per_chat
+
+        # Упорядоченные словари работают как множества с порядком вставки.
+        self.__seen: OrderedDict[str, dict[str, None]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def filter(
+        self,
+        chat_id: str,
+        messages: list[AmoJoChatUnloader.ChatMessage],
+    ) -> list[AmoJoChatUnloader.ChatMessage]:
+        """
+        Отбор еще не сохраненных сообщений с их запоминанием.
+
+        :param chat_id: ID чата.
+        :param messages: Выгруженные сообщения чата.
+
+        :return: Сообщения, которых еще не было, без повторов внутри пачки.
+        """
+
+        unseen: list[AmoJoChatUnloader.ChatMessage] = []
+
+        with self.__lock:
+            seen = self.__seen.get(chat_id)
+            if seen is None:
+                seen = self.__seen[chat_id] = {}
+                while len(self.__seen) > self.__max_chats:
+                    self.__seen.popitem(last=False)
+            else:
+                self.__seen.move_to_end(chat_id)
+
+            for message in messages:
+                if message.message_id in seen:
+                    continue
+
+                seen[message.message_id] = None
+                unseen.append(message)
+
+            while len(seen) > self.__max_messages_per_chat:
+                del seen[next(iter(seen))]
+
+        return unseen
+
+    def forget(self, chat_id: str) -> None:
+        """
+        Удаление чата из индекса.
+
+        :param chat_id: ID чата.
+        """
+
+        with self.__lock:
+            self.__seen.pop(chat_id, None)
+
+
+class DeduplicatingChatMessagesSink(IChatMessagesSink):
+    """Хранилище-обертка, не передающее дальше уже сохраненные сообщения"""
+
+    def __init__(
+        self,
+        sink: IChatMessagesSink,
+        deduplicator: ChatMessagesDeduplicator | None = None,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param sink: Хранилище, в которое пишутся новые сообщения.
+        :param deduplicator:
+            Индекс сохраненных сообщений. Можно разделять между несколькими
+            хранилищами, чтобы отбрасывать повторы между запусками в одном процессе.
+        """
+
+        self.__sink = sink
+        self.__deduplicator = deduplicator or ChatMessagesDeduplicator()
+        self.__skipped = 0
+
+    @property
+    def skipped(self) -> int:
+        """Количество отброшенных повторов"""
+
+        return self.__skipped
+
+    def write(
+        self,
+        chat_id: str,
+        origin: str,
+        messages: list[AmoJoChatUnloader.ChatMessage],
+    ) -> None:
+        unseen = self.__deduplicator.filter(chat_id, messages)
+        self.__skipped += len(messages) - len(unseen)
+        if len(unseen) == 0:
+            return
+
+        try:
+            self.__sink.write(chat_id, origin, unseen)
+        except BaseException:
+            # Сообщения не сохранены, их нельзя считать сохраненными.
+            self.__deduplicator.forget(chat_id)
+            raise
+
+    def rollback_chat(self, chat_id: str) -> None:
+        self.__deduplicator.forget(chat_id)
+        self.__sink.rollback_chat(chat_id)
+
+    def flush_chat(self, chat_id: str) -> None:
+        self.__sink.flush_chat(chat_id)
+
+    def close(self) -> None:
+        self.__sink.close()
@@ -0,0 +1,62 @@
+from abc import (
+    ABC,
+    abstractmethod,
+)
+
+from ...amojo.chat_unloader import AmoJoChatUnloader
+
+
+class IChatMessagesSink(ABC):
+    """Интерфейс хранилища выгруженных из amojo сообщений"""
+
+    @abstractmethod
+    def write(
+        self,
+        chat_id: str,
+        origin: str,
+        messages: list[AmoJoChatUnloader.ChatMessage],
+    ) -> None:
+        """
+        Сохранение пачки сообщений чата.
+
+        :param chat_id: ID чата, из которого выгружены сообщения.
+        :param origin: Источник канала связи (whatsapp, telegram и прочее).
+        :param messages: Сообщения чата.
+        """
+
+        raise NotImplementedError()
+
+    def rollback_chat(self, chat_id: str) -> None:
+        """
+        Уведомление о том, что записанные сообщения чата не сохранились.
+
+        Вызывается, например, при откате транзакции, в которой выгружался чат.
+        По умолчанию ничего не делает.
+
+        :param chat_id: ID чата.
+        """
+
+        pass
+
+    def flush_chat(self, chat_id: str) -> None:
+        """
+        Надежное сохранение записанных сообщений чата.
+
+        После возврата сообщения чата должны пережить аварийное завершение
+        процесса: хранилища, копящие их в памяти или в буферах файлов,
+        записывают их и синхронизируют с диском. Вызывается до того, как
+        выгрузка чата будет считаться выполненной и чат открепят от контакта.
+
+        По умолчанию ничего не делает, что подходит хранилищам, пишущим в БД
+        в транзакции обработки канала: сохранность обеспечивает ее фиксация.
+
+        :param chat_id: ID чата.
+        """
+
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        """Завершение записи и освобождение ресурсов"""
+
+        raise NotImplementedError()
@@ -0,0 +1,34 @@
+from abc import abstractmethod
+
+from .chat_messages_sink import IChatMessagesSink
+
+
+class IRawChatPagesSink(IChatMessagesSink):
+    """
+    Интерфейс хранилища, принимающего сырые страницы сообщений amojo.
+
+    Таким хранилищам сообщения передаются без разбора JSON, см.
+    `AmoJoChatUnloader.iter_raw_pages`.
+    """
+
+    @abstractmethod
+    def write_page(self, chat_id: str, origin: str, page: bytes) -> None:
+        """
+        Сохранение сырой страницы сообщений чата.
+
+        :param chat_id: ID чата, из которого выгружены сообщения.
+        :param origin: Источник канала связи.
+        :param page: Тело ответа amojo - JSON-массив сообщений.
+        """
+
+        raise NotImplementedError()
+
+    @abstractmethod
+    def finish_chat(self, chat_id: str) -> None:
+        """
+        Завершение выгрузки чата.
+
+        :param chat_id: ID чата.
+        """
+
+        raise NotImplementedError()
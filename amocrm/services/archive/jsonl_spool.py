@@ -0,0 +1,425 @@
+"""
+Спул выгруженных переписок: сжатые zstd файлы JSONL только на дозапись.
+
+Требует установленного пакета `zstandard`.
+"""
+
+import os
+import json
+import threading
+from typing import (
+    Any,
+    Iterator,
+    BinaryIO,
+)
+from pathlib import Path
+from dataclasses import dataclass
+
+import zstandard
+
+from ..amojo.chat_unloader import AmoJoChatUnloader
+from ..utils.json_codec import (
+    JSONCodec,
+    get_json_codec,
+)
+
+from .interfaces.raw_chat_pages_sink import IRawChatPagesSink
+
+
+@dataclass(frozen=True)
+class SpoolFrame:
+    """Положение сжатого кадра с данными одного чата в спуле"""
+
+    segment: int
+    offset: int
+    length: int
+
+
+class ZstdJsonlChatSpool(IRawChatPagesSink):
+    """
+    Легковесное хранилище переписок без БД и хранилища данных.
+
+    Каждая строка спула - JSON-объект с ID чата, источником и страницей
+    сообщений. Сырые страницы amojo вставляются в строку как есть, без разбора
+    JSON и создания объектов сообщений.
+
+    Строки чата копятся в буфере и сжимаются в отдельные кадры zstd по
+    `frame_size` байт или по завершении чата. Кадры дописываются в файлы-сегменты,
+    которые сменяются по достижении `max_segment_bytes`. Положение каждого
+    кадра записывается в индекс `index.jsonl`, поэтому переписку одного чата
+    можно прочитать, не распаковывая весь спул. Сегмент целиком остается
+    корректным zstd-потоком и читается стандартными утилитами.
+
+    Данные сбрасываются на диск (fsync) не после каждого кадра, а раз в
+    `fsync_every` кадров, при закрытии и по `flush_chat`.
+
+    `rollback_chat` отбрасывает буфер чата, а кадры, уже записанные в этой
+    попытке выгрузки чата, помечает в индексе недействительными: при повторной
+    выгрузке переписка не раздваивается. Попытка начинается с первой записи
+    после `finish_chat` или `flush_chat`.
+
+    Потокобезопасен. В один каталог должен писать только один процесс.
+    """
+
+    SEGMENT_NAME = "segment-{:06d}.jsonl.zst"
+    INDEX_NAME = "index.jsonl"
+
+    def __init__(
+        self,
+        root_dir: str | Path,
+        compression_level: int = 3,
+        frame_size: int = 1 << 20,
+        max_segment_bytes: int = 256 << 20,
+        fsync_every: int = 64,
+        json_codec: JSONCodec | None = None,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param root_dir: Каталог спула.
+        :param compression_level: Уровень сжатия zstd.
+        :param frame_size:
+            Размер несжатых данных чата, после которого они сжимаются в кадр.
+        :param max_segment_bytes: Размер сегмента, после которого начинается новый.
+        :param fsync_every: Количество кадров между сбросами данных на диск.
+        :param json_codec: Кодек для сериализации разобранных сообщений и чтения спула.
+        """
+
+        self.__root_dir = Path(root_dir)
+        self.__root_dir.mkdir(parents=True, exist_ok=True)
+        self.__frame_size = frame_size
+        self.__max_segment_bytes = max_segment_bytes
+        self.__fsync_every = fsync_every
+        self.__json_codec = json_codec or get_json_codec()
+
+        self.__compressor = zstandard.ZstdCompressor(level=compression_level)
+        self.__lock = threading.Lock()
+        self.__buffers: dict[str, bytearray] = {}
+        # Кадры текущей попытки выгрузки чатов и чаты, попытка которых завершена.
+        self.__attempt_frames: dict[str, list[SpoolFrame]] = {}
+        self.__finished_chats: set[str] = set()
+        self.__frames_since_fsync = 0
+        self.__is_closed = False
+
+        self.__index: dict[str, list[SpoolFrame]] = {}
+        self.__load_index()
+
+        # Существующие сегменты не дописываем: их хвост мог остаться
+        # недописанным после аварийного завершения.
+        self.__segment = (
+            max(
+                (
+                    int(path.name.split("-")[1].split(".")[0])
+                    for path in self.__root_dir.glob("segment-*.jsonl.zst")
+                ),
+                default=-1,
+            )
+            + 1
+        )
+        # Файлы открываются при записи первого кадра.
+        self.__segment_file: BinaryIO | None = None
+        self.__index_file: BinaryIO | None = None
+
+    @property
+    def chat_ids(self) -> list[str]:
+        """ID чатов, данные которых есть в спуле"""
+
+        with self.__lock:
+            return list(self.__index)
+
+    def write_page(self, chat_id: str, origin: str, page: bytes) -> None:
+        """
+        Добавление сырой страницы сообщений чата.
+
+        :param chat_id: ID чата.
+        :param origin: Источник канала связи.
+        :param page: Тело ответа amojo - JSON-массив сообщений.
+        """
+
+        # Переводы строк в JSON допустимы только как пробельные символы вне
+        # строк, поэтому их замена на пробелы не меняет данные.
+        line = b"".join(
+            (
+                self.__line_prefix(chat_id, origin),
+                b'"page":',
+                page.replace(b"\n", b" ").replace(b"\r", b" "),
+                b"}\n",
+            )
+        )
+        self.__append(chat_id, line)
+
+    def write(
+        self,
+        chat_id: str,
+        origin: str,
+        messages: list[AmoJoChatUnloader.ChatMessage],
+    ) -> None:
+        """
+        Добавление пачки разобранных сообщений чата.
+
+        :param chat_id: ID чата.
+        :param origin: Источник канала связи.
+        :param messages: Сообщения чата.
+        """
+
+        messages_data = self.__json_codec.dumps(
+            [message.__dict__ for message in messages]
+        )
+        line = b"".join(
+            (self.__line_prefix(chat_id, origin), b'"messages":', messages_data, b"}\n")
+        )
+        self.__append(chat_id, line)
+
+    def finish_chat(self, chat_id: str) -> None:
+        """
+        Сжатие накопленных данных чата в кадр.
+
+        :param chat_id: ID чата.
+        """
+
+        with self.__lock:
+            self.__write_frame(chat_id)
+            self.__finished_chats.add(chat_id)
+
+    def flush_chat(self, chat_id: str) -> None:
+        """
+        Сжатие накопленных данных чата в кадр и сброс спула на диск.
+
+        :param chat_id: ID чата.
+        """
+
+        with self.__lock:
+            if self.__is_closed:
+                raise RuntimeError("Спул уже закрыт")
+
+            self.__write_frame(chat_id)
+            self.__finished_chats.add(chat_id)
+            self.__fsync()
+
+    def rollback_chat(self, chat_id: str) -> None:
+        """
+        Отмена текущей попытки выгрузки чата.
+
+        :param chat_id: ID чата.
+        """
+
+        with self.__lock:
+            self.__buffers.pop(chat_id, None)
+            self.__finished_chats.discard(chat_id)
+            frames = self.__attempt_frames.pop(chat_id, [])
+            if len(frames) == 0 or self.__is_closed:
+                return
+
+            invalid = set(frames)
+            self.__index[chat_id] = [
+                frame for frame in self.__index.get(chat_id, []) if frame not in invalid
+            ]
+            assert self.__index_file is not None
+            self.__index_file.write(
+                json.dumps(
+                    {
+                        "chat_id": chat_id,
+                        "invalid": [[frame.segment, frame.offset] for frame in frames],
+                    }
+                ).encode()
+                + b"\n"
+            )
+            self.__fsync()
+
+    def flush(self) -> None:
+        """Сжатие всех накопленных данных и сброс их на диск"""
+
+        with self.__lock:
+            for chat_id in list(self.__buffers):
+                self.__write_frame(chat_id)
+            self.__fsync()
+
+    def close(self) -> None:
+        """Запись накопленных данных и закрытие файлов"""
+
+        with self.__lock:
+            if self.__is_closed:
+                return
+
+            for chat_id in list(self.__buffers):
+                self.__write_frame(chat_id)
+            self.__fsync()
+            for file in (self.__segment_file, self.__index_file):
+                if file is not None:
+                    file.close()
+            self.__is_closed = True
+
+    def __enter__(self) -> "ZstdJsonlChatSpool":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def read_chat_lines(self, chat_id: str) -> Iterator[bytes]:
+        """
+        Чтение строк спула одного чата.
+
+        Возвращаются только данные, уже сжатые в кадры (см. `finish_chat`).
+
+        :param chat_id: ID чата.
+
+        :return: Итератор по строкам JSON в порядке записи.
+        """
+
+        with self.__lock:
+            frames = list(self.__index.get(chat_id, []))
+            # Кадры могли остаться в буфере файла, читаем мы через другой файл.
+            if self.__segment_file is not None and not self.__is_closed:
+                self.__segment_file.flush()
+
+        decompressor = zstandard.ZstdDecompressor()
+        for frame in frames:
+            with open(self.__segment_path(frame.segment), "rb") as segment_file:
+                segment_file.seek(frame.offset)
+                data = decompressor.decompress(segment_file.read(frame.length))
+            yield from data.splitlines()
+
+    def read_chat(self, chat_id: str) -> Iterator[dict[str, Any]]:
+        """
+        Чтение записей спула одного чата.
+
+        :param chat_id: ID чата.
+
+        :return: Итератор по записям с ключами `chat_id`, `origin` и
+            `page` (сырая страница amojo) или `messages` (разобранные сообщения).
+        """
+
+        for line in self.read_chat_lines(chat_id):
+            yield self.__json_codec.loads(line)
+
+    def __append(self, chat_id: str, line: bytes) -> None:
+        """Добавление строки в буфер чата"""
+
+        with self.__lock:
+            if self.__is_closed:
+                raise RuntimeError("Спул уже закрыт")
+
+            if chat_id in self.__finished_chats:
+                # Новая попытка выгрузки уже сохраненного чата.
+                self.__finished_chats.discard(chat_id)
+                self.__attempt_frames.pop(chat_id, None)
+
+            buffer = self.__buffers.get(chat_id)
+            if buffer is None:
+                buffer = self.__buffers[chat_id] = bytearray()
+            buffer += line
+
+            if len(buffer) >= self.__frame_size:
+                self.__write_frame(chat_id)
+
+    def __write_frame(self, chat_id: str) -> None:
+        """Сжатие буфера чата в кадр и его запись. Вызывать под блокировкой"""
+
+        buffer = self.__buffers.pop(chat_id, None)
+        if not buffer:
+            return
+
+        frame_data = self.__compressor.compress(bytes(buffer))
+
+        if self.__segment_file is None or self.__index_file is None:
+            self.__segment_file = open(self.__segment_path(self.__segment), "ab")
+            self.__index_file = open(self.__root_dir / self.INDEX_NAME, "ab")
+
+        offset = self.__segment_file.tell()
+        if offset > 0 and offset + len(frame_data) > self.__max_segment_bytes:
+            self.__rotate()
+            offset = 0
+
+        self.__segment_file.write(frame_data)
+        frame = SpoolFrame(self.__segment, offset, len(frame_data))
+        self.__index.setdefault(chat_id, []).append(frame)
+        self.__attempt_frames.setdefault(chat_id, []).append(frame)
+        self.__index_file.write(
+            json.dumps(
+                {
+                    "chat_id": chat_id,
+                    "segment": frame.segment,
+                    "offset": frame.offset,
+                    "length": frame.length,
+                }
+            ).encode()
+            + b"\n"
+        )
+
+        self.__frames_since_fsync += 1
+        if self.__frames_since_fsync >= self.__fsync_every:
+            self.__fsync()
+
+    def __rotate(self) -> None:
+        """Переход на новый сегмент. Вызывать под блокировкой"""
+
+        self.__fsync()
+        if self.__segment_file is not None:
+            self.__segment_file.close()
+        self.__segment += 1
+        self.__segment_file = open(self.__segment_path(self.__segment), "ab")
+
+    def __fsync(self) -> None:
+        """
+        Сброс данных на диск. Вызывать под блокировкой.
+
+        Сначала сегмент, затем индекс, чтобы индекс не ссылался на
+        несохраненные кадры.
+        """
+
+        for file in (self.__segment_file, self.__index_file):
+            if file is not None:
+                file.flush()
+                os.fsync(file.fileno())
+        self.__frames_since_fsync = 0
+
+    def __load_index(self) -> None:
+        """Загрузка индекса с пропуском недописанных и отмененных кадров"""
+
+        index_path = self.__root_dir / self.INDEX_NAME
+        if not index_path.exists():
+            return
+
+        segment_sizes: dict[int, int] = {}
+        with open(index_path, "rb") as index_file:
+            for line in index_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Недописанная последняя строка.
+                    continue
+
+                if "invalid" in entry:
+                    invalid = {tuple(position) for position in entry["invalid"]}
+                    self.__index[entry["chat_id"]] = [
+                        frame
+                        for frame in self.__index.get(entry["chat_id"], [])
+                        if (frame.segment, frame.offset) not in invalid
+                    ]
+                    continue
+
+                frame = SpoolFrame(entry["segment"], entry["offset"], entry["length"])
+                if frame.segment not in segment_sizes:
+                    segment_path = self.__segment_path(frame.segment)
+                    segment_sizes[frame.segment] = (
+                        segment_path.stat().st_size if segment_path.exists() else 0
+                    )
+                if frame.offset + frame.length > segment_sizes[frame.segment]:
+                    continue
+
+                self.__index.setdefault(entry["chat_id"], []).append(frame)
+
+    def __segment_path(self, segment: int) -> Path:
+        return self.__root_dir / self.SEGMENT_NAME.format(segment)
+
+    @staticmethod
+    def __line_prefix(chat_id: str, origin: str) -> bytes:
+        """Начало строки спула до поля с сообщениями"""
+
+        return (
+            b'{"chat_id":'
+            + json.dumps(chat_id).encode()
+            + b',"origin":'
+            + json.dumps(origin).encode()
+            + b","
+        )
@@ -0,0 +1,172 @@
+"""
+Чтение и поиск по колоночному архиву переписок.
+
+Требует установленного пакета `pyarrow`.
+"""
+
+import operator
+import functools
+from typing import Iterator
+from pathlib import Path
+from datetime import date
+from dataclasses import dataclass
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from ..amojo.chat_unloader import AmoJoChatUnloader
+
+from .parquet_writer import (
+    PARTITION_SCHEMA,
+    DICTIONARY_COLUMNS,
+)
+
+
+@dataclass
+class ArchivedChatMessage:
+    """Сообщение из архива вместе с его партицией"""
+
+    account_id: str
+    origin: str
+    chat_id: str
+    message: AmoJoChatUnloader.ChatMessage
+
+
+class ParquetChatArchiveReader:
+    """
+    Поиск сообщений в архиве, записанном `ParquetChatArchiveWriter`.
+
+    Условия по аккаунту, источнику и датам отсекают целые каталоги партиций,
+    а условия по колонкам проверяются по статистике групп строк, поэтому
+    лишние файлы и группы строк не читаются.
+    """
+
+    def __init__(self, root_dir: str | Path) -> None:
+        """
+        Инициализатор класса.
+
+        :param root_dir: Корневой каталог архива.
+        """
+
+        self.__root_dir = Path(root_dir)
+
+    def read(
+        self,
+        account_id: str | None = None,
+        origin: str | None = None,
+        chat_id: str | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        text_contains: str | None = None,
+        columns: list[str] | None = None,
+    ) -> pa.Table:
+        """
+        Чтение сообщений, подходящих под условия, в одну таблицу.
+
+        :param account_id: ID аккаунта amoCRM.
+        :param origin: Источник канала связи.
+        :param chat_id: ID чата.
+        :param date_from: Дата первого сообщения включительно.
+        :param date_to: Дата последнего сообщения включительно.
+        :param text_contains: Подстрока, которую должен содержать текст сообщения.
+        :param columns: Читаемые колонки. По умолчанию все.
+
+        :return: Таблица Arrow с сообщениями.
+        """
+
+        return self.__dataset().to_table(
+            columns=columns,
+            filter=self.__build_filter(
+                account_id, origin, chat_id, date_from, date_to, text_contains
+            ),
+        )
+
+    def iter_messages(
+        self,
+        account_id: str | None = None,
+        origin: str | None = None,
+        chat_id: str | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        text_contains: str | None = None,
+    ) -> Iterator[ArchivedChatMessage]:
+        """
+        Потоковое чтение сообщений, подходящих под условия.
+
+        Параметры те же, что у `read`. Сообщения читаются пачками, поэтому
+        весь результат не держится в памяти.
+
+        :return: Итератор по сообщениям архива.
+        """
+
+        batches = self.__dataset().to_batches(
+            filter=self.__build_filter(
+                account_id, origin, chat_id, date_from, date_to, text_contains
+            ),
+        )
+        for batch in batches:
+            for row in batch.to_pylist():
+                yield ArchivedChatMessage(
+                    account_id=row["account_id"],
+                    origin=row["origin"],
+                    chat_id=row["chat_id"],
+                    message=AmoJoChatUnloader.ChatMessage(
+                        sender=row["sender"],
+                        receiver=row["receiver"],
+                        time=row["time"],
+                        text=row["text"],
+                        media=row["media"],
+                        message_id=row["message_id"],
+                        chat_id=row["chat_id"],
+                    ),
+                )
+
+    def __dataset(self) -> ds.Dataset:
+        """
+        Открытие архива как набора данных.
+
+        Открывается при каждом запросе, чтобы видеть файлы, дописанные
+        с момента предыдущего запроса.
+        """
+
+        return ds.dataset(
+            self.__root_dir,
+            format=ds.ParquetFileFormat(
+                read_options=ds.ParquetReadOptions(
+                    dictionary_columns=DICTIONARY_COLUMNS
+                )
+            ),
+            partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+        )
+
+    @staticmethod
+    def __build_filter(
+        account_id: str | None,
+        origin: str | None,
+        chat_id: str | None,
+        date_from: date | None,
+        date_to: date | None,
+        text_contains: str | None,
+    ) -> ds.Expression | None:
+        """Сборка условия отбора строк"""
+
+        conditions: list[ds.Expression] = []
+        if account_id is not None:
+            conditions.append(ds.field("account_id") == account_id)
+        if origin is not None:
+            conditions.append(ds.field("origin") == origin)
+        if chat_id is not None:
+            conditions.append(ds.field("chat_id") == chat_id)
+        # Даты партиций в формате ISO, поэтому сравниваются как строки.
+        if date_from is not None:
+            conditions.append(ds.field("date") >= date_from.isoformat())
+        if date_to is not None:
+            conditions.append(ds.field("date") <= date_to.isoformat())
+        if text_contains is not None:
+            conditions.append(pc.match_substring(ds.field("text"), text_contains))
+
+        if len(conditions) == 0:
+            return None
+
+        return functools.reduce(operator.and_, conditions)
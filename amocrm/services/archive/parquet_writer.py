@@ -0,0 +1,290 @@
+"""
+Колоночный архив выгруженных переписок в формате Parquet.
+
+Требует установленного пакета `pyarrow`.
+"""
+
+import os
+import uuid
+import threading
+from pathlib import Path
+from urllib.parse import quote
+from collections import OrderedDict
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ..amojo.chat_unloader import AmoJoChatUnloader
+
+from .interfaces.chat_messages_sink import IChatMessagesSink
+
+
+# Схема строк архива.
+MESSAGES_SCHEMA = pa.schema(
+    [
+        ("chat_id", pa.string()),
+        ("message_id", pa.string()),
+        ("sender", pa.string()),
+        ("receiver", pa.string()),
+        ("time", pa.timestamp("s")),
+        ("text", pa.string()),
+        ("media", pa.string()),
+    ]
+)
+
+# Схема партиций архива. Партиции лежат в каталогах в стиле Hive:
+# `account_id=.../origin=.../date=YYYY-MM-DD/`.
+PARTITION_SCHEMA = pa.schema(
+    [
+        ("account_id", pa.string()),
+        ("origin", pa.string()),
+        ("date", pa.string()),
+    ]
+)
+
+# Колонки с малым количеством различных значений. Для них используется
+# словарное кодирование, для текстов сообщений оно только мешает.
+DICTIONARY_COLUMNS = ["chat_id", "sender", "receiver"]
+
+
+class _PartitionBuffer:
+    """Накопленные, но еще не записанные строки одной партиции"""
+
+    __slots__ = ("columns", "size")
+
+    def __init__(self) -> None:
+        self.columns: dict[str, list] = {name: [] for name in MESSAGES_SCHEMA.names}
+        self.size = 0
+
+
+class ParquetChatArchiveWriter(IChatMessagesSink):
+    """
+    Потоковая запись выгруженных сообщений в Parquet-файлы.
+
+    Сообщения копятся в буферах партиций (источник канала и дата сообщения)
+    и записываются группами строк по `row_group_size`. В каждой партиции
+    писатель создает свой файл, поэтому несколько писателей, в том числе в
+    разных процессах, могут писать в один архив одновременно.
+
+    Файл Parquet читается только после закрытия, поэтому строки чата
+    надежно сохранены лишь после `flush_chat`: он записывает буферы партиций
+    чата, закрывает их файлы и синхронизирует их с диском. Следующие строки
+    этих партиций пойдут в новые файлы, так что частые `flush_chat` дают
+    много небольших файлов.
+
+    `rollback_chat` отбрасывает еще не записанные строки чата. Строки,
+    уже попавшие в файл полной группой строк, остаются в архиве.
+
+    Потокобезопасен: один писатель можно разделять между потоками.
+    """
+
+    def __init__(
+        self,
+        root_dir: str | Path,
+        account_id: str,
+        row_group_size: int = 50_000,
+        compression: str = "zstd",
+        max_open_files: int = 64,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param root_dir: Корневой каталог архива.
+        :param account_id: ID аккаунта amoCRM, переписки которого пишутся.
+        :param row_group_size: Количество строк в группе строк Parquet.
+        :param compression: Алгоритм сжатия колонок.
+        :param max_open_files:
+            Максимальное количество одновременно открытых файлов партиций.
+            При превышении закрываются давно не использованные файлы.
+        """
+
+        self.__root_dir = Path(root_dir)
+        self.__account_id = account_id
+        self.__row_group_size = row_group_size
+        self.__compression = compression
+        self.__max_open_files = max_open_files
+
+        self.__lock = threading.Lock()
+        self.__buffers: dict[tuple[str, str], _PartitionBuffer] = {}
+        self.__writers: OrderedDict[tuple[str, str], pq.ParquetWriter] = OrderedDict()
+        # Пути открытых файлов партиций.
+        self.__paths: dict[tuple[str, str], Path] = {}
+        # Партиции, в которые писались строки чатов с последнего `flush_chat`.
+        self.__chat_partitions: dict[str, set[tuple[str, str]]] = {}
+        self.__written_rows = 0
+        self.__is_closed = False
+
+    @property
+    def written_rows(self) -> int:
+        """Количество строк, записанных в файлы"""
+
+        return self.__written_rows
+
+    def write(
+        self,
+        chat_id: str,
+        origin: str,
+        messages: list[AmoJoChatUnloader.ChatMessage],
+    ) -> None:
+        """
+        Добавление пачки сообщений чата в архив.
+
+        :param chat_id: ID чата, из которого выгружены сообщения.
+        :param origin: Источник канала связи.
+        :param messages: Сообщения чата.
+        """
+
+        with self.__lock:
+            if self.__is_closed:
+                raise RuntimeError("Архив уже закрыт")
+
+            chat_partitions = self.__chat_partitions.setdefault(chat_id, set())
+            for message in messages:
+                partition = (origin, message.time.date().isoformat())
+                chat_partitions.add(partition)
+                buffer = self.__buffers.get(partition)
+                if buffer is None:
+                    buffer = self.__buffers[partition] = _PartitionBuffer()
+
+                columns = buffer.columns
+                columns["chat_id"].append(chat_id)
+                columns["message_id"].append(message.message_id)
+                columns["sender"].append(message.sender)
+                columns["receiver"].append(message.receiver)
+                columns["time"].append(message.time)
+                columns["text"].append(message.text)
+                columns["media"].append(message.media)
+                buffer.size += 1
+
+                if buffer.size >= self.__row_group_size:
+                    self.__flush_partition(partition)
+
+    def flush_chat(self, chat_id: str) -> None:
+        """
+        Запись строк чата и закрытие файлов его партиций с синхронизацией на диск.
+
+        :param chat_id: ID чата.
+        """
+
+        with self.__lock:
+            for partition in self.__chat_partitions.pop(chat_id, ()):
+                self.__flush_partition(partition)
+                writer = self.__writers.pop(partition, None)
+                if writer is not None:
+                    writer.close()
+                    self.__fsync(self.__paths.pop(partition))
+
+    def rollback_chat(self, chat_id: str) -> None:
+        """
+        Отбрасывание еще не записанных в файлы строк чата.
+
+        :param chat_id: ID чата.
+        """
+
+        with self.__lock:
+            for partition in self.__chat_partitions.pop(chat_id, ()):
+                buffer = self.__buffers.get(partition)
+                if buffer is None:
+                    continue
+
+                keep = [
+                    i
+                    for i, row_chat_id in enumerate(buffer.columns["chat_id"])
+                    if row_chat_id != chat_id
+                ]
+                if len(keep) == buffer.size:
+                    continue
+                for name, values in buffer.columns.items():
+                    buffer.columns[name] = [values[i] for i in keep]
+                buffer.size = len(keep)
+
+    def flush(self) -> None:
+        """Запись всех накопленных строк в файлы"""
+
+        with self.__lock:
+            for partition in list(self.__buffers):
+                self.__flush_partition(partition)
+
+    def close(self) -> None:
+        """Запись накопленных строк и закрытие всех файлов"""
+
+        with self.__lock:
+            if self.__is_closed:
+                return
+
+            for partition in list(self.__buffers):
+                self.__flush_partition(partition)
+            for partition, writer in self.__writers.items():
+                writer.close()
+                self.__fsync(self.__paths[partition])
+            self.__writers.clear()
+            self.__paths.clear()
+            self.__chat_partitions.clear()
+            self.__is_closed = True
+
+    def __enter__(self) -> "ParquetChatArchiveWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __flush_partition(self, partition: tuple[str, str]) -> None:
+        """Запись буфера партиции в ее файл. Вызывать под блокировкой"""
+
+        buffer = self.__buffers.pop(partition, None)
+        if buffer is None or buffer.size == 0:
+            return
+
+        table = pa.Table.from_pydict(buffer.columns, schema=MESSAGES_SCHEMA)
+        self.__get_writer(partition).write_table(
+            table, row_group_size=self.__row_group_size
+        )
+        self.__written_rows += buffer.size
+
+    def __get_writer(self, partition: tuple[str, str]) -> pq.ParquetWriter:
+        """Получение открытого файла партиции. Вызывать под блокировкой"""
+
+        writer = self.__writers.get(partition)
+        if writer is not None:
+            self.__writers.move_to_end(partition)
+            return writer
+
+        # Закрытый файл партиции уже не дописать, следующие строки этой
+        # партиции пойдут в новый файл.
+        while len(self.__writers) >= self.__max_open_files:
+            evicted_partition, evicted_writer = self.__writers.popitem(last=False)
+            evicted_writer.close()
+            # Строки закрытого файла могли принадлежать чатам, которые еще
+            # не сохранены через `flush_chat`.
+            self.__fsync(self.__paths.pop(evicted_partition))
+
+        origin, date = partition
+        partition_dir = (
+            self.__root_dir
+            / f"account_id={quote(self.__account_id, safe='')}"
+            / f"origin={quote(origin, safe='')}"
+            / f"date={date}"
+        )
+        partition_dir.mkdir(parents=True, exist_ok=True)
+
+        path = partition_dir / f"part-{uuid.uuid4().hex}.parquet"
+        writer = pq.ParquetWriter(
+            path,
+            MESSAGES_SCHEMA,
+            compression=self.__compression,
+            use_dictionary=DICTIONARY_COLUMNS,
+        )
+        self.__writers[partition] = writer
+        self.__paths[partition] = path
+
+        return writer
+
+    @staticmethod
+    def __fsync(path: Path) -> None:
+        """Синхронизация закрытого файла с диском"""
+
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,176 @@
+"""
+Буфер записей с ограничением памяти, переносящий данные во временный файл.
+"""
+
+import os
+import struct
+import tempfile
+from typing import (
+    Iterator,
+    BinaryIO,
+)
+from pathlib import Path
+
+
+# Длина записи перед ее данными.
+_LENGTH = struct.Struct("<I")
+
+
+def current_rss() -> int | None:
+    """
+    Текущий размер резидентной памяти процесса в байтах.
+
+    :return: Размер или None, если его нельзя узнать (не Linux).
+    """
+
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class SpillBuffer:
+    """
+    Буфер байтовых записей, который держит в памяти не больше заданного объема.
+
+    Пока суммарный размер записей не превышает `max_memory_bytes`, записи
+    хранятся в памяти. После превышения все записи переносятся во временный
+    файл, и следующие записи дописываются уже в него. Перенос также
+    происходит, если резидентная память процесса превысила `max_rss_bytes`.
+    Временный файл удаляется при закрытии буфера.
+
+    Записи читаются в порядке добавления итерированием, без загрузки всего
+    буфера в память. Читать можно несколько раз.
+
+    Не потокобезопасен: один буфер заполняет и читает один поток.
+    """
+
+    # Как часто, в записях, проверять резидентную память процесса.
+    RSS_CHECK_INTERVAL = 16
+
+    def __init__(
+        self,
+        max_memory_bytes: int = 8 << 20,
+        max_rss_bytes: int | None = None,
+        spill_dir: str | Path | None = None,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param max_memory_bytes: Объем записей, который можно держать в памяти.
+        :param max_rss_bytes:
+            Резидентная память процесса, при превышении которой записи
+            переносятся в файл независимо от их объема. None - не проверять.
+        :param spill_dir:
+            Каталог временного файла. По умолчанию - системный каталог
+            временных файлов.
+        """
+
+        self.__max_memory_bytes = max_memory_bytes
+        self.__max_rss_bytes = max_rss_bytes
+        self.__spill_dir = spill_dir
+
+        self.__records: list[bytes] = []
+        self.__file: BinaryIO | None = None
+        self.__size = 0
+        self.__count = 0
+
+    @property
+    def size(self) -> int:
+        """Суммарный размер записей в байтах"""
+
+        return self.__size
+
+    @property
+    def is_spilled(self) -> bool:
+        """Перенесены ли записи во временный файл"""
+
+        return self.__file is not None
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def append(self, record: bytes) -> None:
+        """
+        Добавление записи.
+
+        :param record: Данные записи.
+        """
+
+        self.__size += len(record)
+        self.__count += 1
+
+        if self.__file is not None:
+            self.__write(self.__file, record)
+            return
+
+        self.__records.append(record)
+        if self.__size > self.__max_memory_bytes or self.__is_rss_exceeded():
+            self.__spill()
+
+    def __iter__(self) -> Iterator[bytes]:
+        """Чтение записей в порядке добавления"""
+
+        if self.__file is None:
+            yield from self.__records
+            return
+
+        self.__file.flush()
+        # Читаем по смещениям, не сбивая позицию записи файла.
+        fd = self.__file.fileno()
+        offset = 0
+        for _ in range(self.__count):
+            (length,) = _LENGTH.unpack(os.pread(fd, _LENGTH.size, offset))
+            offset += _LENGTH.size
+            yield os.pread(fd, length, offset)
+            offset += length
+
+    def close(self) -> None:
+        """Освобождение памяти и удаление временного файла"""
+
+        self.__records = []
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+        self.__size = 0
+        self.__count = 0
+
+    def __enter__(self) -> "SpillBuffer":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __spill(self) -> None:
+        """Перенос записей из памяти во временный файл"""
+
+        file = tempfile.TemporaryFile(dir=self.__spill_dir)
+        try:
+            for record in self.__records:
+                self.__write(file, record)
+        except BaseException:
+            file.close()
+            raise
+
+        self.__file = file  # type: ignore[assignment]
+        self.__records = []
+
+    def __is_rss_exceeded(self) -> bool:
+        """Превышена ли резидентная память процесса. Проверяется не на каждой записи"""
+
+        if (
+            self.__max_rss_bytes is None
+            or (self.__count - 1) % self.RSS_CHECK_INTERVAL != 0
+        ):
+            return False
+
+        rss = current_rss()
+        return rss is not None and rss > self.__max_rss_bytes
+
+    @staticmethod
+    def __write(file: BinaryIO, record: bytes) -> None:
+        file.write(_LENGTH.pack(len(record)))
+        file.write(record)
@@ -0,0 +1,146 @@
+import threading
+from pathlib import Path
+
+from ..amojo.chat_unloader import AmoJoChatUnloader
+from ..utils.json_codec import (
+    JSONCodec,
+    get_json_codec,
+)
+
+from .spill_buffer import SpillBuffer
+from .interfaces.chat_messages_sink import IChatMessagesSink
+from .interfaces.raw_chat_pages_sink import IRawChatPagesSink
+
+
+class SpillingChatPagesSink(IRawChatPagesSink):
+    """
+    Хранилище, накапливающее сырые страницы чата в `SpillBuffer` и передающее
+    их вложенному хранилищу по завершении чата.
+
+    Пока чат выгружается, в памяти находится не больше `max_memory_bytes`
+    страниц на чат, остальное лежит во временном файле. По `finish_chat`
+    страницы по одной читаются из буфера и записываются во вложенное
+    хранилище, поэтому чат любого размера сохраняется с ограниченной памятью.
+    Вложенному хранилищу без поддержки сырых страниц передаются разобранные
+    сообщения каждой страницы.
+
+    Переписка попадает во вложенное хранилище только целиком: если выгрузка
+    чата оборвалась, буфер отбрасывается.
+
+    Потокобезопасен для разных чатов, если потокобезопасно вложенное хранилище.
+    """
+
+    def __init__(
+        self,
+        sink: IChatMessagesSink,
+        max_memory_bytes: int = 8 << 20,
+        max_rss_bytes: int | None = None,
+        spill_dir: str | Path | None = None,
+        json_codec: JSONCodec | None = None,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param sink: Хранилище, в которое сохраняются переписки.
+        :param max_memory_bytes: Объем страниц одного чата, который держится в памяти.
+        :param max_rss_bytes:
+            Резидентная память процесса, при превышении которой страницы
+            переносятся в файл независимо от их объема. None - не проверять.
+        :param spill_dir: Каталог временных файлов.
+        :param json_codec: Кодек для разбора страниц, если `sink` не принимает сырые.
+        """
+
+        self.__sink = sink
+        self.__max_memory_bytes = max_memory_bytes
+        self.__max_rss_bytes = max_rss_bytes
+        self.__spill_dir = spill_dir
+        self.__json_codec = json_codec or get_json_codec()
+
+        self.__lock = threading.Lock()
+        # Буферы выгружаемых чатов и источники их каналов.
+        self.__buffers: dict[str, tuple[str, SpillBuffer]] = {}
+        self.__spilled_chats = 0
+
+    @property
+    def spilled_chats(self) -> int:
+        """Количество чатов, страницы которых не поместились в память"""
+
+        return self.__spilled_chats
+
+    def write(
+        self,
+        chat_id: str,
+        origin: str,
+        messages: list[AmoJoChatUnloader.ChatMessage],
+    ) -> None:
+        # Разобранные сообщения уже в памяти, буферизовать их незачем.
+        self.__sink.write(chat_id, origin, messages)
+
+    def write_page(self, chat_id: str, origin: str, page: bytes) -> None:
+        with self.__lock:
+            entry = self.__buffers.get(chat_id)
+            if entry is None:
+                entry = self.__buffers[chat_id] = (
+                    origin,
+                    SpillBuffer(
+                        self.__max_memory_bytes,
+                        self.__max_rss_bytes,
+                        self.__spill_dir,
+                    ),
+                )
+
+        entry[1].append(page)
+
+    def finish_chat(self, chat_id: str) -> None:
+        with self.__lock:
+            entry = self.__buffers.pop(chat_id, None)
+
+        if entry is None:
+            if isinstance(self.__sink, IRawChatPagesSink):
+                self.__sink.finish_chat(chat_id)
+            return
+
+        origin, buffer = entry
+        with buffer:
+            if buffer.is_spilled:
+                with self.__lock:
+                    self.__spilled_chats += 1
+
+            if isinstance(self.__sink, IRawChatPagesSink):
+                for page in buffer:
+                    self.__sink.write_page(chat_id, origin, page)
+                self.__sink.finish_chat(chat_id)
+            else:
+                for page in buffer:
+                    self.__sink.write(
+                        chat_id,
+                        origin,
+                        [
+                            AmoJoChatUnloader.LazyChatMessage(
+                                message_data, chat_id, self.__json_codec
+                            ).to_message()
+                            for message_data in self.__json_codec.loads(page)
+                        ],
+                    )
+
+    def rollback_chat(self, chat_id: str) -> None:
+        with self.__lock:
+            entry = self.__buffers.pop(chat_id, None)
+        if entry is not None:
+            entry[1].close()
+
+        self.__sink.rollback_chat(chat_id)
+
+    def flush_chat(self, chat_id: str) -> None:
+        # Страницы передаются вложенному хранилищу по `finish_chat`, после
+        # него в буфере чата ничего не остается.
+        self.__sink.flush_chat(chat_id)
+
+    def close(self) -> None:
+        with self.__lock:
+            buffers = list(self.__buffers.values())
+            self.__buffers.clear()
+        for _, buffer in buffers:
+            buffer.close()
+
+        self.__sink.close()
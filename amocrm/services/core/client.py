@@ -1,3 +1,4 @@
+import requests
 from typing import Any
 from enum import StrEnum
 
@@ -5,8 +6,14 @@ from ..tokens import Tokens
 from ..tokens.interfaces.token_managed import ITokenManaged
 
 from ..utils.request_status import HTTPStatus
+from ..utils.rate_limiter import RateLimiter
+from ..utils.json_codec import JSONCodec
+from ..utils.single_flight import SingleFlight
+from ..utils.circuit_breaker import CircuitBreakerRegistry
 from ..utils.base_api_client import BaseAPIClient
 
+from ..instrumentation.interfaces.request_hook import IRequestHook
+
 from .endpoints import AmoCRMAuthEndpoints
 from .exceptions import AmoCRMAuthException
 
@@ -28,6 +35,12 @@ class AmoCRMClient(BaseAPIClient):
         auth_code: str,
         redirect_url: str,
         tokens_manager: ITokenManaged,
+        request_hooks: list[IRequestHook] | None = None,
+        session: requests.Session | None = None,
+        rate_limiter: RateLimiter | None = None,
+        circuit_breakers: CircuitBreakerRegistry | None = None,
+        json_codec: JSONCodec | None = None,
+        single_flight: SingleFlight | None = None,
     ) -> None:
         """
         Инициализатор класса.
@@ -43,9 +56,23 @@ class AmoCRMClient(BaseAPIClient):
         :param tokens_manager:
             Объект для управления токенами. Отвечает за их получение и сохранение
             согласно логике класса, реализующего данный интерфейс.
+        :param request_hooks: Хуки, вызываемые до и после каждого запроса.
+        :param session: HTTP-сессия с пулом соединений.
+        :param rate_limiter: Ограничитель частоты запросов.
+        :param circuit_breakers: Реестр предохранителей по хостам.
+        :param json_codec: Кодек для разбора ответов.
+        :param single_flight: Объединение одинаковых одновременных GET-запросов.
         """
 
-        super().__init__(base_url)
+        super().__init__(
+            base_url,
+            request_hooks,
+            session,
+            rate_limiter,
+            circuit_breakers,
+            json_codec,
+            single_flight,
+        )
 
         self.__secret_key = secret_key
         self.__integration_id = integration_id
@@ -64,15 +91,24 @@ class AmoCRMClient(BaseAPIClient):
     def _authorization(self) -> None:
         """Обновление токенов доступа"""
 
-        # Пытаемся обновить токены доступа через refresh-токен.
-        try:
-            self._auth_with(self.GrantType.REFRESH)
-        except Exception as refresh_error:
-            # Либо пытаемся это сделать через авторизационный код.
+        with self.__tokens_manager.refresh_lock():
+            # Токены мог уже обновить другой клиент, пока мы ждали блокировку
+            # или с тех пор, как мы их прочитали. Refresh-токен при обновлении
+            # становится недействительным, поэтому повторно обновлять нельзя.
+            stored_tokens = self.__tokens_manager.get_tokens()
+            if stored_tokens is not None and stored_tokens != self.__tokens:
+                self.__tokens = stored_tokens
+                return
+
+            # Пытаемся обновить токены доступа через refresh-токен.
             try:
-                self._auth_with(self.GrantType.AUTH_CODE)
-            except Exception as auth_code_error:
-                raise auth_code_error from refresh_error
+                self._auth_with(self.GrantType.REFRESH)
+            except Exception as refresh_error:
+                # Либо пытаемся это сделать через авторизационный код.
+                try:
+                    self._auth_with(self.GrantType.AUTH_CODE)
+                except Exception as auth_code_error:
+                    raise auth_code_error from refresh_error
 
     def _auth_with(self, grant_type: GrantType) -> None:
         """
@@ -120,7 +156,7 @@ class AmoCRMClient(BaseAPIClient):
             raise AmoCRMAuthException(response)
 
         # Если все хорошо, сохраняем токены через менеджер.
-        json_data: dict[str, str] = response.json()
+        json_data: dict[str, str] = self.decode_json(response)
         new_tokens = Tokens(
             access_token=json_data["access_token"],
             refresh_token=json_data["refresh_token"],
@@ -1,3 +1,8 @@
+from bisect import insort
+from typing import (
+    Iterable,
+    Iterator,
+)
 from dataclasses import dataclass
 
 
@@ -15,3 +20,115 @@ class AmoCRMCommunicationChannelData:
     profile_id: int
     # ID чата.
     chat_id: str
+
+
+class AmoCRMContactChannels:
+    """
+    Каналы связи контакта, сгруппированные по источникам.
+
+    Внутри каждого источника каналы упорядочены по порядковому номеру, который
+    отражает хронологию чатов с контактом. Индекс строится за один проход по
+    каналам, поэтому вызывающему коду не нужно ни сортировать, ни группировать их.
+    """
+
+    def __init__(self, channels: Iterable[AmoCRMCommunicationChannelData] = ()) -> None:
+        """
+        Инициализатор класса.
+
+        :param channels: Каналы связи контакта в любом порядке.
+        """
+
+        self.__by_origin: dict[str, list[AmoCRMCommunicationChannelData]] = {}
+        self.__count = 0
+
+        for channel_data in channels:
+            self.add(channel_data)
+
+    def add(self, channel_data: AmoCRMCommunicationChannelData) -> None:
+        """
+        Добавление канала связи в индекс.
+
+        Каналы со страницы сделки приходят по возрастанию порядкового номера,
+        тогда добавление - это просто добавление в конец списка.
+
+        :param channel_data: Данные о канале связи.
+        """
+
+        origin_channels = self.__by_origin.setdefault(channel_data.origin, [])
+        if (
+            len(origin_channels) == 0
+            or origin_channels[-1].serial_number <= channel_data.serial_number
+        ):
+            origin_channels.append(channel_data)
+        else:
+            insort(
+                origin_channels,
+                channel_data,
+                key=lambda channel: channel.serial_number,
+            )
+        self.__count += 1
+
+    @property
+    def origins(self) -> list[str]:
+        """Источники каналов связи в порядке их первого появления"""
+
+        return list(self.__by_origin)
+
+    def get(self, origin: str) -> list[AmoCRMCommunicationChannelData]:
+        """
+        Получение каналов связи одного источника.
+
+        :param origin: Название источника.
+
+        :return: Каналы по возрастанию порядкового номера.
+        """
+
+        return list(self.__by_origin.get(origin, ()))
+
+    def latest(self, origin: str) -> AmoCRMCommunicationChannelData | None:
+        """Последний (актуальный) канал связи источника"""
+
+        origin_channels = self.__by_origin.get(origin)
+        return origin_channels[-1] if origin_channels else None
+
+    def stale(self, origin: str) -> list[AmoCRMCommunicationChannelData]:
+        """
+        Устаревшие каналы связи источника - все, кроме последнего.
+
+        :param origin: Название источника.
+        """
+
+        return list(self.__by_origin.get(origin, ())[:-1])
+
+    @property
+    def stale_by_origin(self) -> dict[str, list[AmoCRMCommunicationChannelData]]:
+        """Устаревшие каналы связи по источникам, у которых они есть"""
+
+        return {
+            origin: origin_channels[:-1]
+            for origin, origin_channels in self.__by_origin.items()
+            if len(origin_channels) > 1
+        }
+
+    @property
+    def stale_channels(self) -> list[AmoCRMCommunicationChannelData]:
+        """Все устаревшие каналы связи контакта"""
+
+        return [
+            channel_data
+            for origin_channels in self.__by_origin.values()
+            for channel_data in origin_channels[:-1]
+        ]
+
+    @property
+    def has_duplicates(self) -> bool:
+        """Есть ли у контакта несколько каналов связи одного источника"""
+
+        return any(len(channels) > 1 for channels in self.__by_origin.values())
+
+    def __iter__(self) -> Iterator[AmoCRMCommunicationChannelData]:
+        for origin_channels in self.__by_origin.values():
+            yield from origin_channels
+
+    def __len__(self) -> int:
+        return self.__count
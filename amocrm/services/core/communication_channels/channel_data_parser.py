@@ -1,13 +1,22 @@
-from bs4 import (
-    Tag,
-    ResultSet,
-    BeautifulSoup,
-)
+from typing import TYPE_CHECKING
+
+from ...utils.request_status import HTTPStatus
 
 from ..client import AmoCRMClient
 from ..endpoints import AmoCRMResources
+from ..exceptions import AmoCRMResponseException
+
+from .channel_data import (
+    AmoCRMContactChannels,
+    AmoCRMCommunicationChannelData,
+)
+
 
-from .channel_data import AmoCRMCommunicationChannelData
+if TYPE_CHECKING:
+    from bs4 import (
+        Tag,
+        ResultSet,
+    )
 
 
 class AmoCRMCommunicationChannelsDataParser:
@@ -28,9 +37,7 @@ class AmoCRMCommunicationChannelsDataParser:
 
         self.__amocrm_client = amocrm_client
 
-    def parse(
-        self, lead_id: int, contact_id: int
-    ) -> list[AmoCRMCommunicationChannelData]:
+    def parse(self, lead_id: int, contact_id: int) -> AmoCRMContactChannels:
         """
         Парсинг данных о канале связи для контакта.
 
@@ -41,20 +48,56 @@ class AmoCRMCommunicationChannelsDataParser:
             ID контакта, у которого нужно брать информацию по чатам.
             На странице сделки может быть несколько контактов.
 
-        :return: Список данных о каналах связи с контактом.
+        :return: Каналы связи контакта, сгруппированные по источникам.
+        """
+
+        return self.parse_page(self.get_lead_page(lead_id), contact_id)
+
+    def get_lead_page(self, lead_id: int) -> str:
+        """
+        Получение HTML-страницы сделки.
+
+        :param lead_id: ID сделки.
+
+        :raise AmoCRMResponseException: Если страница не получена.
+
+        :return: Текст HTML-страницы.
         """
 
-        # Запрашиваем HTML-страницу сделки.
         response = self.__amocrm_client.request(
             method="get",
-            url_postfix=AmoCRMResources.LEAD_DETAIL.format(lead_id=lead_id),  # type: ignore
+            url_postfix=AmoCRMResources.LEAD_DETAIL,
+            path_params={"lead_id": lead_id},
         )
+        # Страница ошибки или лимита запросов тоже HTML, но каналов на ней нет.
+        if response.status_code != HTTPStatus.HTTP_200_OK:
+            raise AmoCRMResponseException(
+                message=f"Ошибка получения страницы сделки {lead_id}",
+                response=response,
+            )
+
+        return response.content.decode()
+
+    def parse_page(self, lead_page: str, contact_id: int) -> AmoCRMContactChannels:
+        """
+        Парсинг данных о каналах связи контакта из уже полученной страницы сделки.
+
+        :param lead_page: Текст HTML-страницы сделки.
+        :param contact_id: ID контакта, у которого нужно брать информацию по чатам.
+
+        :return: Каналы связи контакта, сгруппированные по источникам.
+        """
+
+        # BeautifulSoup импортируется долго, а большинству процессов разбор
+        # страницы не нужен (см. `AmoCRMCommunicationChannelsScreener`),
+        # поэтому импортируем его при первом разборе.
+        from bs4 import BeautifulSoup
 
         # Начинаем парсинг. Создадим парсер.
-        html_parser = BeautifulSoup(response.content.decode(), "html.parser")
+        html_parser = BeautifulSoup(lead_page, "html.parser")
 
-        # Результирующий список.
-        channels_data_list: list[AmoCRMCommunicationChannelData] = []
+        # Результат: каналы сразу раскладываются по источникам.
+        contact_channels = AmoCRMContactChannels()
 
         # Получаем все элементы с каналов связи на странице.
         channel_buttons: ResultSet[Tag] = html_parser.find_all(
@@ -76,7 +119,7 @@ class AmoCRMCommunicationChannelsDataParser:
                 channel_button.find(attrs={"data-type": "unlink_profile"})["data-value"]
             )
 
-            channels_data_list.append(
+            contact_channels.add(
                 AmoCRMCommunicationChannelData(
                     serial_number=i,
                     origin=origin,
@@ -86,4 +129,4 @@ class AmoCRMCommunicationChannelsDataParser:
                 )
             )
 
-        return channels_data_list
+        return contact_channels
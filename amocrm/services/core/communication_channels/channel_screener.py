@@ -0,0 +1,170 @@
+import re
+from dataclasses import (
+    field,
+    dataclass,
+)
+
+from ..client import AmoCRMClient
+
+from ...utils.ttl_cache import TTLCache
+
+from .channel_data_parser import AmoCRMCommunicationChannelsDataParser
+
+
+# Открывающий тег элемента канала связи на странице сделки. Класс ищется
+# целым словом: `-` для `\b` - граница слова, и `\b` совпал бы с классами
+# вида `profile_messengers-item-*`.
+_CHANNEL_ITEM_TAG_RE = re.compile(
+    r"<[^>]*(?<![\w-])profile_messengers-item(?![\w-])[^>]*>"
+)
+_DATA_ENTITY_RE = re.compile(r"""\bdata-entity=["']?(\d+)""")
+_DATA_ORIGIN_RE = re.compile(r"""\bdata-origin=["']([^"']*)""")
+
+
+def extract_channel_origins(lead_page: str, contact_id: int) -> list[str]:
+    """
+    Быстрое извлечение источников каналов связи контакта со страницы сделки.
+
+    В отличие от `AmoCRMCommunicationChannelsDataParser`, не строит дерево
+    документа, а ищет нужные атрибуты регулярными выражениями. Этого
+    достаточно, чтобы понять, есть ли у контакта дубли каналов.
+
+    :param lead_page: Текст HTML-страницы сделки.
+    :param contact_id: ID контакта, каналы которого нужны.
+
+    :return: Источники каналов связи контакта в порядке их следования на странице.
+    """
+
+    items = list(_CHANNEL_ITEM_TAG_RE.finditer(lead_page))
+    contact_id_str = str(contact_id)
+
+    origins: list[str] = []
+    for i, item in enumerate(items):
+        entity = _DATA_ENTITY_RE.search(item.group(0))
+        if entity is None or entity.group(1) != contact_id_str:
+            continue
+
+        # Источник ищем только внутри текущего элемента канала.
+        end = items[i + 1].start() if i + 1 < len(items) else len(lead_page)
+        origin = _DATA_ORIGIN_RE.search(lead_page, item.end(), end)
+        if origin is not None:
+            origins.append(origin.group(1))
+
+    return origins
+
+
+@dataclass
+class AmoCRMChannelsScreeningResult:
+    """Результат предварительной проверки каналов связи контакта"""
+
+    # Есть ли у контакта несколько каналов связи одного источника.
+    has_duplicates: bool
+    # Количество каналов связи по источникам.
+    origins: dict[str, int] = field(default_factory=dict)
+    # Полученная при проверке страница сделки, чтобы не запрашивать ее повторно.
+    # None, если результат взят из кэша.
+    lead_page: str | None = None
+    # Взят ли результат из кэша.
+    from_cache: bool = False
+
+
+class AmoCRMCommunicationChannelsScreener:
+    """
+    Класс для дешевой предварительной проверки каналов связи контакта.
+
+    Определяет, есть ли у контакта дубли каналов связи одного источника,
+    не разбирая страницу сделки полностью. Контакты без дублей можно
+    не обрабатывать вовсе.
+
+    Результаты кэшируются по ID контакта вместе с временем последнего
+    изменения контакта, поэтому повторные обходы не проверяют заново
+    контакты, которые не менялись.
+    """
+
+    def __init__(
+        self,
+        amocrm_client: AmoCRMClient,
+        cache: (
+            TTLCache[int, tuple[int | None, AmoCRMChannelsScreeningResult]] | None
+        ) = None,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param amocrm_client: Объект для работы с API amoCRM.
+        :param cache:
+            Кэш результатов проверки. Может быть общим для нескольких объектов.
+            Если None, результаты не кэшируются.
+        """
+
+        self.__parser = AmoCRMCommunicationChannelsDataParser(amocrm_client)
+        self.__cache = cache
+
+    def screen(
+        self,
+        contact_id: int,
+        lead_id: int,
+        contact_updated_at: int | None = None,
+    ) -> AmoCRMChannelsScreeningResult:
+        """
+        Проверка наличия дублей каналов связи у контакта.
+
+        :param contact_id: ID контакта.
+        :param lead_id: ID любой сделки контакта, со страницы которой берутся каналы.
+        :param contact_updated_at:
+            Время последнего изменения контакта (`updated_at` из API).
+            Результат из кэша используется, только если контакт с тех пор
+            не менялся. Если None, кэш не используется.
+
+        :raise AmoCRMResponseException:
+            Если страница сделки не получена. Такой результат не кэшируется.
+
+        :return: Результат проверки.
+        """
+
+        if self.__cache is not None and contact_updated_at is not None:
+            cached = self.__cache.get(contact_id)
+            if cached is not None and cached[0] == contact_updated_at:
+                return AmoCRMChannelsScreeningResult(
+                    has_duplicates=cached[1].has_duplicates,
+                    origins=cached[1].origins,
+                    from_cache=True,
+                )
+
+        lead_page = self.__parser.get_lead_page(lead_id)
+
+        origins: dict[str, int] = {}
+        for origin in extract_channel_origins(lead_page, contact_id):
+            origins[origin] = origins.get(origin, 0) + 1
+
+        result = AmoCRMChannelsScreeningResult(
+            has_duplicates=any(count > 1 for count in origins.values()),
+            origins=origins,
+            lead_page=lead_page,
+        )
+
+        if self.__cache is not None and contact_updated_at is not None:
+            # Страницу в кэше не храним, она занимает сотни килобайт.
+            self.__cache.set(
+                contact_id,
+                (
+                    contact_updated_at,
+                    AmoCRMChannelsScreeningResult(
+                        has_duplicates=result.has_duplicates, origins=origins
+                    ),
+                ),
+            )
+
+        return result
+
+    def invalidate(self, contact_id: int) -> None:
+        """
+        Удаление результата проверки контакта из кэша.
+
+        Нужно вызывать после изменения каналов связи контакта.
+
+        :param contact_id: ID контакта.
+        """
+
+        if self.__cache is not None:
+            self.__cache.pop(contact_id)
@@ -1,3 +1,7 @@
+from typing import Callable
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
 from ..exceptions import (
     AmoCRMResponseException,
     AmoCRMUnlinkChatException,
@@ -9,27 +13,115 @@ from ...utils.request_status import HTTPStatus
 from .channel_data import AmoCRMCommunicationChannelData
 
 
+@dataclass
+class AmoCRMUnlinkResult:
+    """Результат открепления одного канала связи"""
+
+    channel_data: AmoCRMCommunicationChannelData
+    # Канал уже был откреплен, например, при предыдущей попытке.
+    already_unlinked: bool = False
+    # Ошибка открепления. None, если канал откреплен.
+    error: Exception | None = None
+
+    @property
+    def is_success(self) -> bool:
+        return self.error is None
+
+
 class AmoCRMCommunicationChannelUnlinker:
     """
     Класс для корректного открепления канала связи от контакта.
 
-    Перед откреплением чата закрывает в нем все беседы.
+    Открепление идемпотентно: канал, который уже откреплен (amoCRM отвечает
+    404), считается успешно открепленным, поэтому его можно повторять.
     """
 
-    def __init__(self, amocrm_client: AmoCRMClient) -> None:
+    def __init__(
+        self,
+        amocrm_client: AmoCRMClient,
+        max_workers: int = 16,
+        thread_cleanup: Callable[[], None] | None = None,
+    ) -> None:
         """
         Инициализатор класса.
 
         :param amocrm_client: Объект для работы с API amoCRM.
+        :param max_workers:
+            Максимальное количество одновременных запросов в `unlink_chats`.
+            Частоту запросов дополнительно ограничивает ограничитель клиента.
+        :param thread_cleanup:
+            Функция, вызываемая в потоке `unlink_chats` после каждого
+            открепления, например, для закрытия соединений потока с БД,
+            открытых менеджером токенов при повторной авторизации. В
+            вызывающем потоке не вызывается.
         """
 
         self.__amocrm_client = amocrm_client
+        self.__max_workers = max_workers
+        self.__thread_cleanup = thread_cleanup
 
     def unlink_chat(self, channel_data: AmoCRMCommunicationChannelData) -> None:
         """
-        Откерпление канала связи от контакта с закрытием всех бесед.
+        Откерпление канала связи от контакта.
 
         :param channel_data: Данные о канале связи контакта.
+
+        :raise AmoCRMUnlinkChatException: В случае ошибки запроса.
+        :raise AmoCRMResponseException: Если amoCRM ответил ошибкой.
+        """
+
+        self.__unlink(channel_data)
+
+    def unlink_chats(
+        self, channels: list[AmoCRMCommunicationChannelData]
+    ) -> list[AmoCRMUnlinkResult]:
+        """
+        Одновременное открепление нескольких каналов связи.
+
+        Ошибка открепления одного канала не прерывает открепление остальных.
+
+        :param channels: Данные о каналах связи.
+
+        :return: Результаты открепления в порядке `channels`.
+        """
+
+        if len(channels) <= 1 or self.__max_workers <= 1:
+            return [self.__unlink_safely(channel_data) for channel_data in channels]
+
+        with ThreadPoolExecutor(
+            max_workers=min(len(channels), self.__max_workers),
+            thread_name_prefix="amocrm-unlink",
+        ) as executor:
+            return list(executor.map(self.__unlink_in_thread, channels))
+
+    def __unlink_in_thread(
+        self, channel_data: AmoCRMCommunicationChannelData
+    ) -> AmoCRMUnlinkResult:
+        """Открепление канала связи в потоке пула с очисткой ресурсов потока"""
+
+        try:
+            return self.__unlink_safely(channel_data)
+        finally:
+            if self.__thread_cleanup is not None:
+                self.__thread_cleanup()
+
+    def __unlink_safely(
+        self, channel_data: AmoCRMCommunicationChannelData
+    ) -> AmoCRMUnlinkResult:
+        """Открепление канала связи с ошибкой в результате вместо исключения"""
+
+        try:
+            already_unlinked = self.__unlink(channel_data)
+        except Exception as e:
+            return AmoCRMUnlinkResult(channel_data, error=e)
+
+        return AmoCRMUnlinkResult(channel_data, already_unlinked=already_unlinked)
+
+    def __unlink(self, channel_data: AmoCRMCommunicationChannelData) -> bool:
+        """
+        Запрос на открепление канала связи.
+
+        :return: True, если канал уже был откреплен.
         """
 
         # Открепляем канал связи от контакта.
@@ -47,8 +139,13 @@ class AmoCRMCommunicationChannelUnlinker:
         except Exception as e:
             raise AmoCRMUnlinkChatException(channel_data.chat_id) from e
 
+        # Связи контакта и чата уже нет.
+        if response.status_code == HTTPStatus.HTTP_404_NOT_FOUND:
+            return True
         if response.status_code != HTTPStatus.HTTP_200_OK:
             raise AmoCRMResponseException(
                 message=f"Ошибка при отключении канала связи {channel_data.chat_id}",
                 response=response,
             )
+
+        return False
@@ -4,6 +4,11 @@ from enum import StrEnum
 from ..utils.request_status import HTTPStatus
 
 from .client import AmoCRMClient
+from .schemas import (
+    AmoCRMLead,
+    AmoCRMContact,
+    AmoCRMContactsPage,
+)
 from .exceptions import AmoCRMResponseException
 from .endpoints import AmoCRMOpenEndpoints
 
@@ -11,6 +16,9 @@ from .endpoints import AmoCRMOpenEndpoints
 class AmoCRMContacts:
     """Класс для работы с контактами в amoCRM"""
 
+    # Максимальное количество сущностей на странице в API amoCRM.
+    MAX_PAGE_SIZE = 250
+
     class EmbeddedEntities(StrEnum):
         """Типы вложенных сущностей"""
 
@@ -52,7 +60,8 @@ class AmoCRMContacts:
         # Делаем запрос на получение данных.
         response = self.__amocrm_client.request(
             method="get",
-            url_postfix=AmoCRMOpenEndpoints.CONTACT_DETAIL.format(contact_id=contact_id),  # type: ignore
+            url_postfix=AmoCRMOpenEndpoints.CONTACT_DETAIL,
+            path_params={"contact_id": contact_id},
             params=request_params,
         )
         if response.status_code != HTTPStatus.HTTP_200_OK:
@@ -61,17 +70,110 @@ class AmoCRMContacts:
                 response=response,
             )
 
-        return response.json()
+        return self.__amocrm_client.decode_json(response)
+
+    def get_contact_with_leads(self, contact_id: int) -> AmoCRMContact:
+        """
+        Получение контакта вместе с его сделками.
+
+        :param contact_id: ID контакта.
+
+        :raise JSONSchemaException: Если ответ не соответствует схеме.
 
-    def get_leads_by_contact(self, contact_id: int) -> list[dict[str, Any]]:
+        :return: Контакт.
+        """
+
+        response = self.__amocrm_client.request(
+            method="get",
+            url_postfix=AmoCRMOpenEndpoints.CONTACT_DETAIL,
+            path_params={"contact_id": contact_id},
+            params={"with": self.EmbeddedEntities.LEADS},
+        )
+        if response.status_code != HTTPStatus.HTTP_200_OK:
+            raise AmoCRMResponseException(
+                message=f"Ошибка получения контакта {contact_id}",
+                response=response,
+            )
+
+        return self.__amocrm_client.decode_json(response, AmoCRMContact)
+
+    def get_leads_by_contact(self, contact_id: int) -> list[AmoCRMLead]:
         """
         Получение сделок контакта.
 
         :param contact_id: ID контакта, у которого нужно получить сделки.
 
-        :return: Список словарей с данными по сделкам.
+        :return: Список сделок.
+        """
+
+        return self.get_contact_with_leads(contact_id).leads
+
+    def get_contacts_by_ids(
+        self,
+        contact_ids: list[int],
+        embedded_entities: list[EmbeddedEntities] | None = None,
+    ) -> list[AmoCRMContact]:
+        """
+        Получение данных о нескольких контактах за минимум запросов.
+
+        Контакты запрашиваются пачками по `MAX_PAGE_SIZE` штук.
+
+        :param contact_ids: Список ID контактов.
+        :param embedded_entities:
+            Список связанных сущностей, которые необходимо получить в ответе.
+
+        :raise JSONSchemaException: Если ответ не соответствует схеме.
+
+        :return: Список найденных контактов.
+        """
+
+        contacts: list[AmoCRMContact] = []
+
+        for i in range(0, len(contact_ids), self.MAX_PAGE_SIZE):
+            chunk = contact_ids[i : i + self.MAX_PAGE_SIZE]
+
+            request_params: dict[str, Any] = {
+                "filter[id][]": chunk,
+                "limit": self.MAX_PAGE_SIZE,
+            }
+            if embedded_entities is not None and len(embedded_entities) > 0:
+                request_params["with"] = ",".join(embedded_entities)
+
+            response = self.__amocrm_client.request(
+                method="get",
+                url_postfix=AmoCRMOpenEndpoints.CONTACTS,
+                params=request_params,
+            )
+            # Если ни одного контакта не нашлось, amoCRM отвечает 204.
+            if response.status_code == HTTPStatus.HTTP_204_NO_CONTENT:
+                continue
+            if response.status_code != HTTPStatus.HTTP_200_OK:
+                raise AmoCRMResponseException(
+                    message=f"Ошибка получения контактов {chunk[0]}..{chunk[-1]}",
+                    response=response,
+                )
+
+            contacts.extend(
+                self.__amocrm_client.decode_json(
+                    response, AmoCRMContactsPage
+                )._embedded.contacts
+            )
+
+        return contacts
+
+    def get_leads_by_contacts(
+        self, contact_ids: list[int]
+    ) -> dict[int, list[AmoCRMLead]]:
+        """
+        Получение сделок нескольких контактов.
+
+        :param contact_ids: Список ID контактов.
+
+        :return:
+            Словарь "ID контакта -> список сделок". Контактов, которых нет
+            в amoCRM, в словаре не будет.
         """
 
-        contact_data = self.get_contact_by_id(contact_id, [self.EmbeddedEntities.LEADS])
+        contacts = self.get_contacts_by_ids(contact_ids, [self.EmbeddedEntities.LEADS])
 
-        return contact_data["_embedded"]["leads"]
+        return {contact.id: contact.leads for contact in contacts}
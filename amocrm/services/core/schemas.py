@@ -0,0 +1,71 @@
+"""
+Схемы ответов API amoCRM, которые разбираются сразу в объекты.
+
+Схемы содержат только используемые поля, остальные поля ответов отбрасываются
+при разборе. Разбор выполняется `JSONCodec.decode` за один проход.
+"""
+
+from dataclasses import (
+    field,
+    dataclass,
+)
+
+
+@dataclass(slots=True)
+class AmoCRMLead:
+    """Сделка, вложенная в контакт"""
+
+    id: int
+
+
+@dataclass(slots=True)
+class AmoCRMContactEmbedded:
+    """Вложенные сущности контакта"""
+
+    leads: list[AmoCRMLead] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class AmoCRMContact:
+    """Контакт"""
+
+    id: int
+    updated_at: int | None = None
+    _embedded: AmoCRMContactEmbedded = field(default_factory=AmoCRMContactEmbedded)
+
+    @property
+    def leads(self) -> list[AmoCRMLead]:
+        return self._embedded.leads
+
+
+@dataclass(slots=True)
+class AmoCRMContactsPageEmbedded:
+    """Вложенные сущности страницы контактов"""
+
+    contacts: list[AmoCRMContact]
+
+
+@dataclass(slots=True)
+class AmoCRMContactsPage:
+    """Страница списка контактов"""
+
+    _embedded: AmoCRMContactsPageEmbedded
+
+
+@dataclass(slots=True)
+class AmoCRMTalk:
+    """Беседа чата"""
+
+    # Статус закрытой беседы.
+    CLOSED_STATUS = 1
+
+    talk_id: int
+    status: int
+
+    @property
+    def is_closed(self) -> bool:
+        return self.status == self.CLOSED_STATUS
+
+
+# Ответ со списком бесед: "ID чата -> беседы чата".
+AmoCRMTalksByChat = dict[str, list[AmoCRMTalk]]
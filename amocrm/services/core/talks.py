@@ -1,8 +1,3 @@
-from typing import (
-    Any,
-    Final,
-)
-
 from .exceptions import (
     AmoCRMGetTalksException,
     AmoCRMResponseException,
@@ -12,6 +7,10 @@ from .endpoints import (
     AmoCRMAjaxEndpoints,
 )
 from .client import AmoCRMClient
+from .schemas import (
+    AmoCRMTalk,
+    AmoCRMTalksByChat,
+)
 
 from ..utils.request_status import HTTPStatus
 
@@ -19,6 +18,9 @@ from ..utils.request_status import HTTPStatus
 class AmoCRMTalks:
     """Класс для работы с беседами amoCRM"""
 
+    # Максимальное количество чатов в одном запросе бесед.
+    MAX_CHATS_PER_REQUEST = 50
+
     def __init__(self, amocrm_client: AmoCRMClient) -> None:
         """
         Инициализатор класса.
@@ -28,12 +30,15 @@ class AmoCRMTalks:
 
         self.__amocrm_client = amocrm_client
 
-    def get_talks_by_chat_id(self, chat_id: str) -> list[dict[str, Any]]:
+    def get_talks_by_chat_id(self, chat_id: str) -> list[AmoCRMTalk]:
         """
-        Получение списка данных о беседах у конкретного чата.
+        Получение списка бесед у конкретного чата.
 
         :param chat_id: ID чата.
-        :return: Список словарей с данными по беседам.
+
+        :raise JSONSchemaException: Если ответ не соответствует схеме.
+
+        :return: Список бесед.
         """
 
         try:
@@ -51,34 +56,92 @@ class AmoCRMTalks:
                 response=response,
             )
 
-        return response.json()[chat_id]
+        return self.__amocrm_client.decode_json(response, AmoCRMTalksByChat)[chat_id]
 
-    def close_talks_by_chat_id(self, chat_id: str) -> None:
+    def get_talks_by_chats_ids(self, chats_ids: list[str]) -> AmoCRMTalksByChat:
+        """
+        Получение бесед нескольких чатов за минимум запросов.
+
+        Чаты запрашиваются пачками по `MAX_CHATS_PER_REQUEST` штук.
+
+        :param chats_ids: Список ID чатов.
+
+        :raise JSONSchemaException: Если ответ не соответствует схеме.
+
+        :return: Словарь "ID чата -> список бесед". Чаты без бесед получают
+            пустой список.
+        """
+
+        talks_by_chat: AmoCRMTalksByChat = {chat_id: [] for chat_id in chats_ids}
+
+        for i in range(0, len(chats_ids), self.MAX_CHATS_PER_REQUEST):
+            chunk = chats_ids[i : i + self.MAX_CHATS_PER_REQUEST]
+
+            try:
+                response = self.__amocrm_client.request(
+                    method="get",
+                    url_postfix=AmoCRMAjaxEndpoints.TALKS,
+                    params={"chats_ids[]": chunk},
+                )
+            except Exception as e:
+                raise AmoCRMGetTalksException(chunk[0]) from e
+
+            if response.status_code != 200:
+                raise AmoCRMResponseException(
+                    message=f"Ошибка при получении бесед чатов {chunk[0]}..{chunk[-1]}",
+                    response=response,
+                )
+
+            talks_by_chat.update(
+                self.__amocrm_client.decode_json(response, AmoCRMTalksByChat)
+            )
+
+        return talks_by_chat
+
+    def close_talks_by_chat_id(self, chat_id: str) -> int:
         """
         Закрытие бесед у чата.
 
         :param chat_id: ID чата.
+
+        :return: Количество бесед, которые пришлось закрывать.
+        """
+
+        # Получаем список всех бесед для чата и закрываем незакрытые.
+        return self.close_talks(
+            chat_id,
+            [
+                talk.talk_id
+                for talk in self.get_talks_by_chat_id(chat_id)
+                if not talk.is_closed
+            ],
+        )
+
+    def close_talks(self, chat_id: str, talks_ids: list[int]) -> int:
         """
+        Закрытие уже известных бесед чата без повторного запроса их списка.
+
+        Уже закрытые беседы ошибкой не считаются.
 
-        # Получаем список всех бесед для чата.
-        talks = self.get_talks_by_chat_id(chat_id)
+        :param chat_id: ID чата, которому принадлежат беседы.
+        :param talks_ids: ID бесед, которые нужно закрыть.
+
+        :return: Количество бесед, которые пришлось закрывать.
+        """
 
         # Сюда будем собирать ошибки закрытия бесед у чата.
         close_talk_errors: list[Exception] = []
 
-        # Закрываем все незакрытые беседы у контакта в этом чате.
-        CLOSED_TALK: Final[int] = 1
-        for talk in talks:
-            if talk["status"] == CLOSED_TALK:
-                continue
-
+        # Закрываем все переданные беседы у контакта в этом чате.
+        for talk_id in talks_ids:
             # Делаем запрос на закрытие беседы. Если при запросе была ошибка, или же если
             # сервер вернул не 200 ответ, то сохраним ошибку при обработке этой беседы в
             # список.
             try:
                 response = self.__amocrm_client.request(
                     method="post",
-                    url_postfix=AmoCRMOpenEndpoints.CLOSE_TALK.format(talk_id=talk["talk_id"]),  # type: ignore
+                    url_postfix=AmoCRMOpenEndpoints.CLOSE_TALK,
+                    path_params={"talk_id": talk_id},
                     data={"force_close": True},
                 )
             except Exception as e:
@@ -95,3 +158,5 @@ class AmoCRMTalks:
                 f"Ошибки при закрытии бесед чата {chat_id}",
                 close_talk_errors,
             )
+
+        return len(talks_ids)
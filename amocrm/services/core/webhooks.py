@@ -0,0 +1,124 @@
+"""
+Разбор вебхуков amoCRM.
+
+amoCRM отправляет вебхуки как форму `application/x-www-form-urlencoded` с
+вложенными ключами вида `contacts[update][0][id]`. Модуль не зависит от
+веб-фреймворка: на вход принимаются пары "ключ - значение" из тела запроса.
+"""
+
+import re
+from enum import StrEnum
+from typing import (
+    Any,
+    Iterable,
+)
+from dataclasses import dataclass
+
+
+class AmoCRMWebhookEventType(StrEnum):
+    """Типы событий вебхуков, после которых у контакта могут появиться дубли чатов"""
+
+    # Контакт изменен. В том числе так приходит контакт, оставшийся после
+    # объединения дублей: объединенные в него контакты приходят как удаленные.
+    CONTACT_UPDATED = "contact_updated"
+    # У контакта началась новая беседа, в том числе в новом чате.
+    TALK_ADDED = "talk_added"
+
+
+@dataclass(frozen=True, slots=True)
+class AmoCRMWebhookEvent:
+    """Событие вебхука, затрагивающее контакт"""
+
+    type: AmoCRMWebhookEventType
+    contact_id: int
+    # ID чата и источник канала для событий бесед.
+    chat_id: str | None = None
+    origin: str | None = None
+
+
+# Вложенная часть ключа формы: `[update]`, `[0]`.
+_KEY_PART_RE = re.compile(r"\[([^\[\]]*)\]")
+
+
+def parse_form_data(items: Iterable[tuple[str, str]]) -> dict[str, Any]:
+    """
+    Сборка вложенных словарей из ключей формы вида `contacts[update][0][id]`.
+
+    Индексы списков остаются строковыми ключами словарей.
+
+    :param items: Пары "ключ - значение" из тела запроса.
+
+    :return: Вложенные словари.
+    """
+
+    result: dict[str, Any] = {}
+    for key, value in items:
+        head, bracket, rest = key.partition("[")
+        parts = [head, *_KEY_PART_RE.findall(bracket + rest)]
+
+        node: Any = result
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+            if not isinstance(node, dict):
+                # Ключ одновременно и значение, и вложенный объект: пропускаем.
+                break
+        else:
+            node[parts[-1]] = value
+
+    return result
+
+
+def parse_webhook(items: Iterable[tuple[str, str]]) -> list[AmoCRMWebhookEvent]:
+    """
+    Получение событий, затрагивающих контакты, из тела вебхука.
+
+    События других типов и записи без ID контакта пропускаются.
+
+    :param items: Пары "ключ - значение" из тела запроса.
+
+    :return: События изменения контактов, затем события новых бесед.
+    """
+
+    data = parse_form_data(items)
+    events: list[AmoCRMWebhookEvent] = []
+
+    for contact in _entries(data, "contacts", "update"):
+        contact_id = _to_int(contact.get("id"))
+        if contact_id is not None:
+            events.append(
+                AmoCRMWebhookEvent(AmoCRMWebhookEventType.CONTACT_UPDATED, contact_id)
+            )
+
+    for talk in _entries(data, "talk", "add"):
+        contact_id = _to_int(talk.get("contact_id"))
+        if contact_id is not None:
+            events.append(
+                AmoCRMWebhookEvent(
+                    AmoCRMWebhookEventType.TALK_ADDED,
+                    contact_id,
+                    chat_id=talk.get("chat_id") or None,
+                    origin=talk.get("origin") or None,
+                )
+            )
+
+    return events
+
+
+def _entries(data: dict[str, Any], entity: str, action: str) -> list[dict[str, Any]]:
+    """Записи сущности `entity` с действием `action` в порядке следования в теле"""
+
+    entries = data.get(entity)
+    if not isinstance(entries, dict):
+        return []
+    entries = entries.get(action)
+    if not isinstance(entries, dict):
+        return []
+
+    return [entry for entry in entries.values() if isinstance(entry, dict)]
+
+
+def _to_int(value: Any) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
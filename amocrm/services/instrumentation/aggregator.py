@@ -0,0 +1,128 @@
+import threading
+from dataclasses import (
+    field,
+    dataclass,
+)
+
+from .histogram import LatencyHistogram
+from .request_info import RequestInfo
+from .interfaces.request_hook import IRequestHook
+
+
+@dataclass
+class EndpointStats:
+    """Накопленная статистика по одному эндпоинту"""
+
+    method: str
+    endpoint: str
+    latency: LatencyHistogram
+    requests_count: int = 0
+    errors_count: int = 0
+    retries_count: int = 0
+    response_bytes: int = 0
+    # Количество ответов по кодам ответа.
+    status_codes: dict[int, int] = field(default_factory=dict)
+
+
+class EndpointMetricsAggregator(IRequestHook):
+    """
+    Хук, собирающий статистику запросов по шаблонам эндпоинтов.
+
+    Для каждой пары "метод + шаблон эндпоинта" хранит гистограмму задержек,
+    количество запросов, ошибок, повторов и принятых байт.
+    """
+
+    def __init__(self, significant_figures: int = 2) -> None:
+        """
+        Инициализатор класса.
+
+        :param significant_figures: Точность гистограмм задержек.
+        """
+
+        self.__significant_figures = significant_figures
+        self.__stats: dict[tuple[str, str], EndpointStats] = {}
+        self.__lock = threading.Lock()
+
+    def before_request(self, request_info: RequestInfo) -> None:
+        pass
+
+    def after_request(self, request_info: RequestInfo) -> None:
+        key = (request_info.method.upper(), request_info.endpoint)
+
+        with self.__lock:
+            stats = self.__stats.get(key)
+            if stats is None:
+                stats = EndpointStats(
+                    method=key[0],
+                    endpoint=key[1],
+                    latency=LatencyHistogram(self.__significant_figures),
+                )
+                self.__stats[key] = stats
+
+            stats.latency.record(request_info.latency)
+            stats.requests_count += 1
+            stats.retries_count += request_info.retries
+            stats.response_bytes += request_info.response_bytes
+            if request_info.error is not None:
+                stats.errors_count += 1
+            if request_info.status_code is not None:
+                stats.status_codes[request_info.status_code] = (
+                    stats.status_codes.get(request_info.status_code, 0) + 1
+                )
+
+    def snapshot(self) -> list[EndpointStats]:
+        """
+        Получение копии накопленной статистики.
+
+        :return: Список статистик по эндпоинтам.
+        """
+
+        with self.__lock:
+            return [
+                EndpointStats(
+                    method=stats.method,
+                    endpoint=stats.endpoint,
+                    latency=stats.latency.copy(),
+                    requests_count=stats.requests_count,
+                    errors_count=stats.errors_count,
+                    retries_count=stats.retries_count,
+                    response_bytes=stats.response_bytes,
+                    status_codes=dict(stats.status_codes),
+                )
+                for stats in self.__stats.values()
+            ]
+
+    def reset(self) -> None:
+        """Сброс накопленной статистики"""
+
+        with self.__lock:
+            self.__stats.clear()
+
+    def format_report(self) -> str:
+        """
+        Формирование текстового отчета по эндпоинтам.
+
+        :return: Таблица со статистикой, отсортированная по суммарному времени.
+        """
+
+        rows = sorted(
+            self.snapshot(),
+            key=lambda stats: stats.latency.mean * stats.requests_count,
+            reverse=True,
+        )
+
+        lines = [
+            f"{'METHOD':<6} {'ENDPOINT':<40} {'COUNT':>7} {'ERR':>5} {'RETRY':>5} "
+            f"{'P50, ms':>9} {'P99, ms':>9} {'MAX, ms':>9} {'KB':>9}"
+        ]
+        for stats in rows:
+            lines.append(
+                f"{stats.method:<6} {stats.endpoint:<40} {stats.requests_count:>7} "
+                f"{stats.errors_count:>5} {stats.retries_count:>5} "
+                f"{stats.latency.percentile(50) * 1000:>9.1f} "
+                f"{stats.latency.percentile(99) * 1000:>9.1f} "
+                f"{stats.latency.max * 1000:>9.1f} "
+                f"{stats.response_bytes / 1024:>9.1f}"
+            )
+
+        return "\n".join(lines)
@@ -0,0 +1,59 @@
+"""
+Экспорт метрик запросов в OpenTelemetry.
+
+Требует установленного пакета `opentelemetry-api`.
+"""
+
+from opentelemetry import metrics
+
+from ..request_info import RequestInfo
+from ..interfaces.request_hook import IRequestHook
+
+
+class OpenTelemetryRequestHook(IRequestHook):
+    """Хук, записывающий метрики запросов через OpenTelemetry Metrics API"""
+
+    def __init__(self, meter: metrics.Meter | None = None) -> None:
+        """
+        Инициализатор класса.
+
+        :param meter:
+            Объект для создания инструментов. Если None, берется из
+            глобального `MeterProvider`.
+        """
+
+        meter = meter or metrics.get_meter("amocrm.services")
+
+        self.__latency = meter.create_histogram(
+            "amocrm.request.duration",
+            unit="s",
+            description="Время выполнения запросов к API",
+        )
+        self.__response_bytes = meter.create_counter(
+            "amocrm.response.size",
+            unit="By",
+            description="Объем тел ответов API",
+        )
+        self.__retries = meter.create_counter(
+            "amocrm.request.retries",
+            description="Количество повторов запросов к API",
+        )
+
+    def before_request(self, request_info: RequestInfo) -> None:
+        pass
+
+    def after_request(self, request_info: RequestInfo) -> None:
+        attributes: dict[str, str | int] = {
+            "server.address": request_info.base_url,
+            "http.request.method": request_info.method.upper(),
+            "url.template": request_info.endpoint,
+        }
+        if request_info.status_code is not None:
+            attributes["http.response.status_code"] = request_info.status_code
+        if request_info.error is not None:
+            attributes["error.type"] = type(request_info.error).__name__
+
+        self.__latency.record(request_info.latency, attributes)
+        self.__response_bytes.add(request_info.response_bytes, attributes)
+        if request_info.retries > 0:
+            self.__retries.add(request_info.retries, attributes)
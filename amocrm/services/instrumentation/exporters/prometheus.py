@@ -0,0 +1,90 @@
+"""
+Экспорт метрик запросов в Prometheus.
+
+Требует установленного пакета `prometheus-client`.
+"""
+
+from prometheus_client import (
+    Counter,
+    Histogram,
+    CollectorRegistry,
+    REGISTRY,
+)
+
+from ..request_info import RequestInfo
+from ..interfaces.request_hook import IRequestHook
+
+
+class PrometheusRequestHook(IRequestHook):
+    """Хук, публикующий метрики запросов в реестр Prometheus"""
+
+    DEFAULT_BUCKETS = (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+    )  # fmt: skip
+
+    def __init__(
+        self,
+        namespace: str = "amocrm",
+        registry: CollectorRegistry = REGISTRY,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param namespace: Префикс имен метрик.
+        :param registry: Реестр, в котором регистрируются метрики.
+        :param buckets: Границы корзин гистограммы задержек в секундах.
+        """
+
+        labels = ("base_url", "method", "endpoint")
+
+        self.__latency = Histogram(
+            "request_duration_seconds",
+            "Время выполнения запросов к API",
+            labelnames=labels,
+            namespace=namespace,
+            registry=registry,
+            buckets=buckets,
+        )
+        self.__responses = Counter(
+            "responses",
+            "Количество ответов API по кодам ответа",
+            labelnames=(*labels, "status"),
+            namespace=namespace,
+            registry=registry,
+        )
+        self.__response_bytes = Counter(
+            "response_bytes",
+            "Объем тел ответов API",
+            labelnames=labels,
+            namespace=namespace,
+            registry=registry,
+        )
+        self.__retries = Counter(
+            "request_retries",
+            "Количество повторов запросов к API",
+            labelnames=labels,
+            namespace=namespace,
+            registry=registry,
+        )
+
+    def before_request(self, request_info: RequestInfo) -> None:
+        pass
+
+    def after_request(self, request_info: RequestInfo) -> None:
+        labels = (
+            request_info.base_url,
+            request_info.method.upper(),
+            request_info.endpoint,
+        )
+        status = (
+            str(request_info.status_code)
+            if request_info.status_code is not None
+            else "error"
+        )
+
+        self.__latency.labels(*labels).observe(request_info.latency)
+        self.__responses.labels(*labels, status).inc()
+        self.__response_bytes.labels(*labels).inc(request_info.response_bytes)
+        if request_info.retries > 0:
+            self.__retries.labels(*labels).inc(request_info.retries)
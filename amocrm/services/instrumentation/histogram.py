@@ -0,0 +1,165 @@
+import math
+from typing import Self
+
+
+class LatencyHistogram:
+    """
+    Гистограмма задержек в стиле HdrHistogram.
+
+    Значения хранятся в целых микросекундах в лог-линейных корзинах:
+    каждая степень двойки разбита на одинаковое количество подкорзин, поэтому
+    относительная погрешность любого перцентиля не превышает заданной точности,
+    а память не зависит от количества записанных значений.
+    """
+
+    def __init__(self, significant_figures: int = 2) -> None:
+        """
+        Инициализатор класса.
+
+        :param significant_figures:
+            Количество значащих цифр, которые гистограмма сохраняет для
+            каждого значения. Допустимы значения от 1 до 5.
+        """
+
+        if not 1 <= significant_figures <= 5:
+            raise ValueError(
+                f"Количество значащих цифр должно быть от 1 до 5, "
+                f"передано {significant_figures}"
+            )
+
+        self.__significant_figures = significant_figures
+        self.__sub_bucket_bits = math.ceil(math.log2(2 * 10**significant_figures))
+        self.__sub_bucket_count = 1 << self.__sub_bucket_bits
+        self.__sub_bucket_half_count = self.__sub_bucket_count >> 1
+
+        # Разреженное хранение: индекс корзины -> количество значений.
+        self.__counts: dict[int, int] = {}
+        self.__total_count = 0
+        self.__total_sum = 0
+        self.__min = 0
+        self.__max = 0
+
+    @property
+    def count(self) -> int:
+        return self.__total_count
+
+    @property
+    def min(self) -> float:
+        """Минимальное значение в секундах"""
+
+        return self.__min / 1_000_000
+
+    @property
+    def max(self) -> float:
+        """Максимальное значение в секундах"""
+
+        return self.__max / 1_000_000
+
+    @property
+    def mean(self) -> float:
+        """Среднее значение в секундах"""
+
+        if self.__total_count == 0:
+            return 0.0
+
+        return self.__total_sum / self.__total_count / 1_000_000
+
+    def record(self, seconds: float) -> None:
+        """
+        Запись значения задержки.
+
+        :param seconds: Задержка в секундах.
+        """
+
+        value = max(int(seconds * 1_000_000), 0)
+        index = self.__get_index(value)
+        self.__counts[index] = self.__counts.get(index, 0) + 1
+
+        if self.__total_count == 0 or value < self.__min:
+            self.__min = value
+        if value > self.__max:
+            self.__max = value
+        self.__total_count += 1
+        self.__total_sum += value
+
+    def percentile(self, percent: float) -> float:
+        """
+        Получение значения перцентиля.
+
+        :param percent: Перцентиль в диапазоне от 0 до 100.
+
+        :return: Значение перцентиля в секундах.
+        """
+
+        if self.__total_count == 0:
+            return 0.0
+
+        percent = min(max(percent, 0.0), 100.0)
+        target = max(math.ceil(self.__total_count * percent / 100), 1)
+
+        accumulated = 0
+        for index in sorted(self.__counts):
+            accumulated += self.__counts[index]
+            if accumulated >= target:
+                value = min(self.__get_highest_equivalent_value(index), self.__max)
+                return max(value, self.__min) / 1_000_000
+
+        return self.max
+
+    def merge(self, other: Self) -> None:
+        """
+        Добавление значений другой гистограммы в текущую.
+
+        :param other: Гистограмма с той же точностью.
+        """
+
+        if other.__significant_figures != self.__significant_figures:
+            raise ValueError("Нельзя объединять гистограммы с разной точностью")
+        if other.__total_count == 0:
+            return
+
+        for index, count in other.__counts.items():
+            self.__counts[index] = self.__counts.get(index, 0) + count
+
+        if self.__total_count == 0 or other.__min < self.__min:
+            self.__min = other.__min
+        self.__max = max(self.__max, other.__max)
+        self.__total_count += other.__total_count
+        self.__total_sum += other.__total_sum
+
+    def copy(self) -> "LatencyHistogram":
+        """Получение независимой копии гистограммы"""
+
+        histogram = LatencyHistogram(self.__significant_figures)
+        histogram.merge(self)
+
+        return histogram
+
+    def __get_index(self, value: int) -> int:
+        """Получение индекса корзины для значения в микросекундах"""
+
+        if value < self.__sub_bucket_count:
+            return value
+
+        shift = value.bit_length() - self.__sub_bucket_bits
+        sub_bucket = value >> shift
+
+        return (
+            self.__sub_bucket_count
+            + (shift - 1) * self.__sub_bucket_half_count
+            + (sub_bucket - self.__sub_bucket_half_count)
+        )
+
+    def __get_highest_equivalent_value(self, index: int) -> int:
+        """Получение наибольшего значения, попадающего в корзину"""
+
+        if index < self.__sub_bucket_count:
+            return index
+
+        offset = index - self.__sub_bucket_count
+        shift = offset // self.__sub_bucket_half_count + 1
+        sub_bucket = (
+            offset % self.__sub_bucket_half_count + self.__sub_bucket_half_count
+        )
+
+        return ((sub_bucket + 1) << shift) - 1
@@ -0,0 +1,30 @@
+from abc import (
+    ABC,
+    abstractmethod,
+)
+
+from ..request_info import RequestInfo
+
+
+class IRequestHook(ABC):
+    """Интерфейс хука, вызываемого до и после запроса к внешнему API"""
+
+    @abstractmethod
+    def before_request(self, request_info: RequestInfo) -> None:
+        """
+        Вызывается перед отправкой запроса.
+
+        :param request_info: Данные о запросе. Поля ответа еще не заполнены.
+        """
+
+        raise NotImplementedError()
+
+    @abstractmethod
+    def after_request(self, request_info: RequestInfo) -> None:
+        """
+        Вызывается после завершения запроса, в том числе с ошибкой.
+
+        :param request_info: Данные о запросе с заполненными полями ответа.
+        """
+
+        raise NotImplementedError()
@@ -0,0 +1,33 @@
+from dataclasses import (
+    field,
+    dataclass,
+)
+
+
+@dataclass(slots=True)
+class RequestInfo:
+    """Данные о запросе к внешнему API для хуков инструментирования"""
+
+    # HTTP-метод запроса.
+    method: str
+    # Шаблон эндпоинта, например `/leads/detail/{lead_id}`. Именно шаблон, а не
+    # отформатированный URL, чтобы метрики не разрастались по ID сущностей.
+    endpoint: str
+    # Базовый URL клиента, через который делается запрос.
+    base_url: str
+    # Код ответа. None, пока ответ не получен или если запрос упал с ошибкой.
+    status_code: int | None = None
+    # Размер тела ответа в байтах.
+    response_bytes: int = 0
+    # Время выполнения запроса вместе с повторами в секундах.
+    latency: float = 0.0
+    # Количество повторов запроса (например, после переавторизации).
+    retries: int = 0
+    # Ответ получен одним запросом на несколько одинаковых одновременных
+    # (см. `SingleFlight`). Время такого запроса - время ожидания общего ответа.
+    coalesced: bool = False
+    # Исключение, если запрос завершился ошибкой.
+    error: BaseException | None = None
+    # Произвольные данные, которые хуки могут передать сами себе между
+    # `before_request` и `after_request`.
+    context: dict[str, object] = field(default_factory=dict)
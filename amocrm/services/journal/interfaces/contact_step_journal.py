@@ -0,0 +1,71 @@
+from abc import (
+    ABC,
+    abstractmethod,
+)
+
+from ...planning.action_plan import AmoCRMOperationType
+
+
+class IContactStepJournal(ABC):
+    """
+    Интерфейс журнала выполненных шагов обработки каналов контакта.
+
+    Шаг (выгрузка переписки, закрытие бесед, открепление) записывается в
+    журнал после того, как его результат сохранен. При повторной обработке
+    контакта после ошибки выполненные шаги пропускаются.
+    """
+
+    @abstractmethod
+    def get_completed_steps(
+        self, contact_id: int
+    ) -> set[tuple[str, AmoCRMOperationType]]:
+        """
+        Получение выполненных шагов контакта.
+
+        :param contact_id: ID контакта.
+
+        :return: Пары (ID чата, шаг).
+        """
+
+        raise NotImplementedError()
+
+    @abstractmethod
+    def mark_completed(
+        self,
+        contact_id: int,
+        chat_id: str,
+        steps: list[AmoCRMOperationType],
+    ) -> None:
+        """
+        Запись выполненных шагов канала. Повторная запись шага ничего не меняет.
+
+        :param contact_id: ID контакта.
+        :param chat_id: ID чата канала.
+        :param steps: Выполненные шаги.
+        """
+
+        raise NotImplementedError()
+
+    @abstractmethod
+    def clear(self, contact_id: int) -> None:
+        """
+        Удаление всех шагов контакта, например после успешной обработки.
+
+        :param contact_id: ID контакта.
+        """
+
+        raise NotImplementedError()
+
+    def clear_many(self, contact_ids: list[int]) -> None:
+        """
+        Удаление всех шагов нескольких контактов.
+
+        Нужно, например, при удалении контактов из очереди обработки: шаги
+        контакта, отсеянного проверкой после частичной обработки, иначе
+        остались бы в журнале. По умолчанию удаляет шаги по одному контакту.
+
+        :param contact_ids: ID контактов.
+        """
+
+        for contact_id in contact_ids:
+            self.clear(contact_id)
@@ -0,0 +1,41 @@
+import threading
+
+from ..planning.action_plan import AmoCRMOperationType
+
+from .interfaces.contact_step_journal import IContactStepJournal
+
+
+class MemoryContactStepJournal(IContactStepJournal):
+    """
+    Журнал шагов, хранящий их в ОЗУ процесса.
+
+    Подходит для повторов внутри одного процесса, например в тестах
+    или при повторе задачи тем же воркером. Потокобезопасен.
+    """
+
+    def __init__(self) -> None:
+        """Инициализатор класса"""
+
+        self.__lock = threading.Lock()
+        self.__steps: dict[int, set[tuple[str, AmoCRMOperationType]]] = {}
+
+    def get_completed_steps(
+        self, contact_id: int
+    ) -> set[tuple[str, AmoCRMOperationType]]:
+        with self.__lock:
+            return set(self.__steps.get(contact_id, ()))
+
+    def mark_completed(
+        self,
+        contact_id: int,
+        chat_id: str,
+        steps: list[AmoCRMOperationType],
+    ) -> None:
+        with self.__lock:
+            self.__steps.setdefault(contact_id, set()).update(
+                (chat_id, step) for step in steps
+            )
+
+    def clear(self, contact_id: int) -> None:
+        with self.__lock:
+            self.__steps.pop(contact_id, None)
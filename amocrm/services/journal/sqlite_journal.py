@@ -0,0 +1,96 @@
+import time
+import sqlite3
+from typing import Iterator
+from pathlib import Path
+from contextlib import contextmanager
+
+from ..planning.action_plan import AmoCRMOperationType
+
+from .interfaces.contact_step_journal import IContactStepJournal
+
+
+class SQLiteContactStepJournal(IContactStepJournal):
+    """
+    Журнал шагов, хранящий их в файле SQLite.
+
+    Подходит для нескольких процессов-воркеров на одной машине без общей БД:
+    повтор задачи другим воркером той же машины видит выполненные шаги.
+    Шаги одного канала записываются одной транзакцией.
+
+    На каждую операцию открывается свое соединение, поэтому объект можно
+    использовать из нескольких потоков.
+    """
+
+    def __init__(self, db_path: str | Path, busy_timeout: float = 30.0) -> None:
+        """
+        Инициализатор класса.
+
+        :param db_path: Путь к файлу БД. Создается, если его нет.
+        :param busy_timeout:
+            Сколько секунд ждать, пока другой процесс освободит БД.
+        """
+
+        self.__db_path = Path(db_path)
+        self.__busy_timeout = busy_timeout
+
+        self.__db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.__connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS amocrm_contact_steps ("
+                "contact_id INTEGER NOT NULL, "
+                "chat_id TEXT NOT NULL, "
+                "step TEXT NOT NULL, "
+                "completed_at REAL NOT NULL, "
+                "PRIMARY KEY (contact_id, chat_id, step)) WITHOUT ROWID"
+            )
+
+    def get_completed_steps(
+        self, contact_id: int
+    ) -> set[tuple[str, AmoCRMOperationType]]:
+        with self.__connect() as connection:
+            rows = connection.execute(
+                "SELECT chat_id, step FROM amocrm_contact_steps WHERE contact_id = ?",
+                (contact_id,),
+            ).fetchall()
+
+        return {(chat_id, AmoCRMOperationType(step)) for chat_id, step in rows}
+
+    def mark_completed(
+        self,
+        contact_id: int,
+        chat_id: str,
+        steps: list[AmoCRMOperationType],
+    ) -> None:
+        completed_at = time.time()
+        with self.__connect() as connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO amocrm_contact_steps "
+                "(contact_id, chat_id, step, completed_at) VALUES (?, ?, ?, ?)",
+                [(contact_id, chat_id, str(step), completed_at) for step in steps],
+            )
+
+    def clear(self, contact_id: int) -> None:
+        with self.__connect() as connection:
+            connection.execute(
+                "DELETE FROM amocrm_contact_steps WHERE contact_id = ?", (contact_id,)
+            )
+
+    def clear_many(self, contact_ids: list[int]) -> None:
+        with self.__connect() as connection:
+            connection.executemany(
+                "DELETE FROM amocrm_contact_steps WHERE contact_id = ?",
+                [(contact_id,) for contact_id in contact_ids],
+            )
+
+    @contextmanager
+    def __connect(self) -> Iterator[sqlite3.Connection]:
+        """Соединение с БД в транзакции, закрываемое по выходу из блока"""
+
+        connection = sqlite3.connect(self.__db_path, timeout=self.__busy_timeout)
+        try:
+            # Транзакция фиксируется или откатывается при ошибке.
+            with connection:
+                yield connection
+        finally:
+            connection.close()
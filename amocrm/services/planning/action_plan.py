@@ -0,0 +1,249 @@
+from enum import StrEnum
+from typing import Any
+from dataclasses import (
+    field,
+    dataclass,
+)
+
+from ..scheduling.work_item import EndpointClass
+from ..core.communication_channels.channel_data import AmoCRMCommunicationChannelData
+
+
+class AmoCRMOperationType(StrEnum):
+    """Типы изменяющих операций плана"""
+
+    # Выгрузка переписки чата в хранилище.
+    UNLOAD = "unload"
+    # Закрытие открытых бесед чата.
+    CLOSE_TALKS = "close_talks"
+    # Открепление канала связи от контакта.
+    UNLINK = "unlink"
+
+
+class AmoCRMSkipReason(StrEnum):
+    """Причины, по которым контакт не требует операций"""
+
+    # Контакта нет в amoCRM.
+    NOT_FOUND = "not_found"
+    # У контакта нет сделок, со страницы которых берутся каналы.
+    NO_LEADS = "no_leads"
+    # У контакта нет нескольких каналов связи одного источника.
+    NO_DUPLICATES = "no_duplicates"
+
+
+@dataclass
+class AmoCRMPlannedOperation:
+    """Операция плана с оценкой ее стоимости"""
+
+    type: AmoCRMOperationType
+    # Класс эндпоинта, к которому обращается операция.
+    endpoint_class: EndpointClass
+    # Оценка количества запросов. None, если оценить не удалось.
+    estimated_requests: int | None
+
+
+@dataclass
+class AmoCRMChannelPlan:
+    """План обработки одного устаревшего канала связи"""
+
+    channel: AmoCRMCommunicationChannelData
+    # ID открытых бесед чата на момент планирования.
+    open_talks_ids: list[int] = field(default_factory=list)
+    # Оценка количества страниц переписки. None, если размер чата не проверялся.
+    estimated_pages: int | None = None
+    # Размер страницы переписки.
+    page_size: int = 100
+    # Чат может быть больше оценки.
+    pages_is_lower_bound: bool = False
+
+    @property
+    def operations(self) -> list[AmoCRMPlannedOperation]:
+        """Операции над каналом в порядке выполнения"""
+
+        operations = [
+            AmoCRMPlannedOperation(
+                AmoCRMOperationType.UNLOAD,
+                EndpointClass.AMOJO_PAGING,
+                # Выгрузка заканчивается запросом пустой страницы.
+                None if self.estimated_pages is None else self.estimated_pages + 1,
+            )
+        ]
+        if len(self.open_talks_ids) > 0:
+            operations.append(
+                AmoCRMPlannedOperation(
+                    AmoCRMOperationType.CLOSE_TALKS,
+                    EndpointClass.QUICK_WRITE,
+                    len(self.open_talks_ids),
+                )
+            )
+        operations.append(
+            AmoCRMPlannedOperation(
+                AmoCRMOperationType.UNLINK, EndpointClass.QUICK_WRITE, 1
+            )
+        )
+
+        return operations
+
+    @property
+    def estimated_requests(self) -> int:
+        """Оценка количества запросов. Неоцененная выгрузка считается за один"""
+
+        return sum(
+            1 if operation.estimated_requests is None else operation.estimated_requests
+            for operation in self.operations
+        )
+
+    @property
+    def estimated_messages(self) -> int | None:
+        """Оценка количества сообщений сверху (с точностью до страницы)"""
+
+        if self.estimated_pages is None:
+            return None
+
+        return self.estimated_pages * self.page_size
+
+
+@dataclass
+class AmoCRMContactPlan:
+    """План обработки одного контакта"""
+
+    contact_id: int
+    # Сделка, со страницы которой взяты каналы.
+    lead_id: int | None = None
+    # Причина, по которой контакт не требует операций.
+    skip_reason: AmoCRMSkipReason | None = None
+    # Ошибка при планировании. Такой контакт не выполняется.
+    error: BaseException | None = None
+    channels: list[AmoCRMChannelPlan] = field(default_factory=list)
+
+
+@dataclass
+class AmoCRMActionPlan:
+    """
+    Полный план изменений для набора контактов.
+
+    Составляется до первой изменяющей операции, поэтому по нему можно
+    оценить объем работы, ничего не меняя в amoCRM.
+    """
+
+    contacts: list[AmoCRMContactPlan] = field(default_factory=list)
+    # Количество запросов, сделанных при планировании, по классам эндпоинтов.
+    planning_requests: dict[EndpointClass, int] = field(default_factory=dict)
+
+    @property
+    def channels(self) -> list[AmoCRMChannelPlan]:
+        """Все каналы плана"""
+
+        return [channel for contact in self.contacts for channel in contact.channels]
+
+    @property
+    def failed(self) -> dict[int, BaseException]:
+        """Контакты, которые не удалось спланировать"""
+
+        return {
+            contact.contact_id: contact.error
+            for contact in self.contacts
+            if contact.error is not None
+        }
+
+    def cost(self) -> dict[EndpointClass, int]:
+        """
+        Оценка количества запросов выполнения плана по классам эндпоинтов.
+
+        Выгрузка чата, размер которого не проверялся, считается за один запрос.
+        """
+
+        cost = {endpoint_class: 0 for endpoint_class in EndpointClass}
+        for channel in self.channels:
+            for operation in channel.operations:
+                cost[operation.endpoint_class] += (
+                    1
+                    if operation.estimated_requests is None
+                    else operation.estimated_requests
+                )
+
+        return cost
+
+    def estimate_duration(
+        self,
+        latencies: dict[EndpointClass, float],
+        concurrency: dict[EndpointClass, int],
+        rate_limit: float | None = None,
+    ) -> float:
+        """
+        Нижняя оценка времени выполнения плана.
+
+        Время выполнения ограничено снизу и самым загруженным классом
+        эндпоинтов, и общим ограничением частоты запросов.
+
+        :param latencies: Среднее время запроса по классам эндпоинтов, в секундах.
+        :param concurrency: Лимиты одновременных запросов по классам эндпоинтов.
+        :param rate_limit: Ограничение частоты запросов в секунду. None - без ограничения.
+
+        :return: Оценка в секундах.
+        """
+
+        cost = self.cost()
+        duration = max(
+            (
+                requests_count
+                * latencies.get(endpoint_class, 0.0)
+                / max(1, concurrency.get(endpoint_class, 1))
+                for endpoint_class, requests_count in cost.items()
+            ),
+            default=0.0,
+        )
+        if rate_limit is not None and rate_limit > 0:
+            duration = max(duration, sum(cost.values()) / rate_limit)
+
+        return duration
+
+    def to_dict(self) -> dict[str, Any]:
+        """Представление плана, которое можно сериализовать в JSON"""
+
+        channels = self.channels
+        return {
+            "contacts": [
+                {
+                    "contact_id": contact.contact_id,
+                    "lead_id": contact.lead_id,
+                    "skip_reason": contact.skip_reason,
+                    "error": None if contact.error is None else repr(contact.error),
+                    "channels": [
+                        {
+                            "origin": channel.channel.origin,
+                            "chat_id": channel.channel.chat_id,
+                            "profile_id": channel.channel.profile_id,
+                            "open_talks_ids": channel.open_talks_ids,
+                            "estimated_pages": channel.estimated_pages,
+                            "pages_is_lower_bound": channel.pages_is_lower_bound,
+                            "operations": [
+                                {
+                                    "type": operation.type,
+                                    "endpoint_class": operation.endpoint_class,
+                                    "estimated_requests": operation.estimated_requests,
+                                }
+                                for operation in channel.operations
+                            ],
+                        }
+                        for channel in contact.channels
+                    ],
+                }
+                for contact in self.contacts
+            ],
+            "summary": {
+                "contacts": len(self.contacts),
+                "contacts_to_process": sum(
+                    1 for contact in self.contacts if len(contact.channels) > 0
+                ),
+                "failed": len(self.failed),
+                "channels": len(channels),
+                "talks_to_close": sum(len(c.open_talks_ids) for c in channels),
+                "estimated_messages": sum(c.estimated_messages or 0 for c in channels),
+                "unestimated_chats": sum(
+                    1 for c in channels if c.estimated_pages is None
+                ),
+                "planning_requests": self.planning_requests,
+                "execution_requests": self.cost(),
+            },
+        }
@@ -0,0 +1,282 @@
+import threading
+from typing import Any
+from concurrent.futures import Future
+
+from ..core.talks import AmoCRMTalks
+from ..core.client import AmoCRMClient
+from ..core.contacts import AmoCRMContacts
+from ..core.schemas import (
+    AmoCRMContact,
+    AmoCRMTalksByChat,
+)
+from ..core.communication_channels.channel_data import AmoCRMCommunicationChannelData
+from ..core.communication_channels.channel_data_parser import (
+    AmoCRMCommunicationChannelsDataParser,
+)
+from ..core.communication_channels.channel_screener import (
+    AmoCRMCommunicationChannelsScreener,
+)
+from ..amojo.client import AmoJoClient
+from ..amojo.chat_unloader import AmoJoChatUnloader
+from ..scheduling.work_item import (
+    WorkItem,
+    EndpointClass,
+)
+from ..scheduling.work_scheduler import WorkScheduler
+
+from .action_plan import (
+    AmoCRMSkipReason,
+    AmoCRMActionPlan,
+    AmoCRMChannelPlan,
+    AmoCRMContactPlan,
+)
+
+
+class AmoCRMContactsPlanner:
+    """
+    Класс для составления плана обработки контактов без изменений в amoCRM.
+
+    Все чтения выполняются до первой изменяющей операции, поэтому их можно
+    объединять в пачки и выполнять параллельно:
+
+        1. Контакты со сделками запрашиваются пачками по 250 контактов.
+        2. Страницы сделок запрашиваются параллельно, контакты без дублей
+        каналов отсеиваются предварительной проверкой.
+        3. Беседы всех устаревших чатов запрашиваются пачками по нескольку
+        десятков чатов в одном запросе.
+        4. Размер каждого устаревшего чата оценивается пробными запросами
+        одного сообщения (см. `AmoJoChatUnloader.probe_size`).
+
+    Чтения выполняются в `WorkScheduler` с классами эндпоинтов, поэтому
+    подчиняются его лимитам. Ошибка чтения по контакту не прерывает
+    планирование остальных контактов и сохраняется в плане контакта.
+    """
+
+    def __init__(
+        self,
+        amocrm_client: AmoCRMClient,
+        scheduler: WorkScheduler,
+        amojo_client: AmoJoClient | None = None,
+        screener: AmoCRMCommunicationChannelsScreener | None = None,
+        max_probe_pages: int = 64,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param amocrm_client: Объект для работы с API amoCRM.
+        :param scheduler: Планировщик, в котором выполняются чтения.
+        :param amojo_client:
+            Объект для работы с API amojo. Если None, размеры чатов
+            не оцениваются.
+        :param screener:
+            Объект предварительной проверки каналов, например, с общим кэшем.
+            По умолчанию создается без кэша.
+        :param max_probe_pages:
+            Сколько страниц переписки проверять при оценке размера чата не больше.
+        """
+
+        self.__amocrm_client = amocrm_client
+        self.__amojo_client = amojo_client
+        self.__scheduler = scheduler
+        self.__screener = screener or AmoCRMCommunicationChannelsScreener(amocrm_client)
+        self.__parser = AmoCRMCommunicationChannelsDataParser(amocrm_client)
+        self.__talks = AmoCRMTalks(amocrm_client)
+        self.__max_probe_pages = max_probe_pages
+
+        self.__requests_lock = threading.Lock()
+        self.__requests: dict[EndpointClass, int] = {}
+
+    def plan(
+        self,
+        contact_ids: list[int],
+        contacts: list[AmoCRMContact] | None = None,
+    ) -> AmoCRMActionPlan:
+        """
+        Составление плана обработки контактов.
+
+        :param contact_ids: ID контактов.
+        :param contacts:
+            Уже полученные контакты со сделками. Если None, запрашиваются.
+
+        :raise Exception: Если не удалось получить контакты.
+
+        :return: План. Контакты в нем в порядке `contact_ids`.
+        """
+
+        self.__requests = {}
+        contact_ids = list(dict.fromkeys(contact_ids))
+
+        if contacts is None:
+            contacts = AmoCRMContacts(self.__amocrm_client).get_contacts_by_ids(
+                contact_ids, [AmoCRMContacts.EmbeddedEntities.LEADS]
+            )
+            self.__count(
+                EndpointClass.READ, -(-len(contact_ids) // AmoCRMContacts.MAX_PAGE_SIZE)
+            )
+        contacts_by_id = {contact.id: contact for contact in contacts}
+
+        # Каналы связи всех контактов со сделками.
+        plan = AmoCRMActionPlan()
+        channels_futures: dict[int, Future[Any]] = {}
+        for contact_id in contact_ids:
+            contact_plan = AmoCRMContactPlan(contact_id)
+            plan.contacts.append(contact_plan)
+
+            contact = contacts_by_id.get(contact_id)
+            if contact is None:
+                contact_plan.skip_reason = AmoCRMSkipReason.NOT_FOUND
+            elif len(contact.leads) == 0:
+                contact_plan.skip_reason = AmoCRMSkipReason.NO_LEADS
+            else:
+                contact_plan.lead_id = contact.leads[0].id
+                channels_futures[contact_id] = self.__scheduler.submit(
+                    WorkItem(
+                        EndpointClass.HTML_PAGE,
+                        self.__get_stale_channels,
+                        (contact_id, contact_plan.lead_id, contact.updated_at),
+                        group_id=contact_id,
+                    )
+                )
+
+        contact_plans = {
+            contact_plan.contact_id: contact_plan for contact_plan in plan.contacts
+        }
+        for contact_id, future in channels_futures.items():
+            contact_plan = contact_plans[contact_id]
+            try:
+                stale_channels = future.result()
+            except Exception as e:
+                contact_plan.error = e
+                continue
+
+            if len(stale_channels) == 0:
+                contact_plan.skip_reason = AmoCRMSkipReason.NO_DUPLICATES
+            contact_plan.channels = [
+                AmoCRMChannelPlan(channel) for channel in stale_channels
+            ]
+
+        self.__plan_channels(plan)
+
+        plan.planning_requests = dict(self.__requests)
+        return plan
+
+    def __plan_channels(self, plan: AmoCRMActionPlan) -> None:
+        """
+        Получение открытых бесед и оценка размеров всех устаревших чатов плана.
+
+        :param plan: План с найденными каналами. Дополняется на месте.
+        """
+
+        channels_by_chat: dict[str, tuple[AmoCRMContactPlan, AmoCRMChannelPlan]] = {
+            channel_plan.channel.chat_id: (contact_plan, channel_plan)
+            for contact_plan in plan.contacts
+            for channel_plan in contact_plan.channels
+        }
+        chats_ids = list(channels_by_chat)
+
+        talks_futures = [
+            (
+                chunk,
+                self.__scheduler.submit(
+                    WorkItem(
+                        EndpointClass.READ,
+                        self.__get_talks,
+                        (chunk,),
+                    )
+                ),
+            )
+            for chunk in (
+                chats_ids[i : i + AmoCRMTalks.MAX_CHATS_PER_REQUEST]
+                for i in range(0, len(chats_ids), AmoCRMTalks.MAX_CHATS_PER_REQUEST)
+            )
+        ]
+
+        probe_futures: dict[str, Future[Any]] = {}
+        if self.__amojo_client is not None:
+            for chat_id, (contact_plan, _) in channels_by_chat.items():
+                probe_futures[chat_id] = self.__scheduler.submit(
+                    WorkItem(
+                        EndpointClass.AMOJO_PAGING,
+                        self.__probe_chat_size,
+                        (chat_id,),
+                        group_id=contact_plan.contact_id,
+                    )
+                )
+
+        for chunk, future in talks_futures:
+            try:
+                talks_by_chat = future.result()
+            except Exception as e:
+                for chat_id in chunk:
+                    channels_by_chat[chat_id][0].error = e
+                continue
+
+            for chat_id in chunk:
+                channels_by_chat[chat_id][1].open_talks_ids = [
+                    talk.talk_id
+                    for talk in talks_by_chat.get(chat_id, [])
+                    if not talk.is_closed
+                ]
+
+        for chat_id, future in probe_futures.items():
+            contact_plan, channel_plan = channels_by_chat[chat_id]
+            try:
+                size = future.result()
+            except Exception as e:
+                contact_plan.error = e
+                continue
+
+            channel_plan.estimated_pages = size.pages
+            channel_plan.page_size = size.page_size
+            channel_plan.pages_is_lower_bound = size.is_lower_bound
+
+    def __get_stale_channels(
+        self,
+        contact_id: int,
+        lead_id: int,
+        contact_updated_at: int | None,
+    ) -> list[AmoCRMCommunicationChannelData]:
+        """
+        Получение устаревших каналов связи контакта.
+
+        :return: Устаревшие каналы или пустой список, если дублей каналов нет.
+        """
+
+        screening = self.__screener.screen(contact_id, lead_id, contact_updated_at)
+        if not screening.from_cache:
+            self.__count(EndpointClass.HTML_PAGE)
+        if not screening.has_duplicates:
+            return []
+
+        if screening.lead_page is not None:
+            contact_channels = self.__parser.parse_page(screening.lead_page, contact_id)
+        else:
+            contact_channels = self.__parser.parse(lead_id, contact_id)
+            self.__count(EndpointClass.HTML_PAGE)
+
+        return contact_channels.stale_channels
+
+    def __get_talks(self, chats_ids: list[str]) -> AmoCRMTalksByChat:
+        """Получение бесед пачки чатов"""
+
+        self.__count(EndpointClass.READ)
+        return self.__talks.get_talks_by_chats_ids(chats_ids)
+
+    def __probe_chat_size(self, chat_id: str) -> AmoJoChatUnloader.SizeEstimate:
+        """Оценка размера чата"""
+
+        assert self.__amojo_client is not None
+        size = AmoJoChatUnloader(self.__amojo_client, chat_id).probe_size(
+            self.__max_probe_pages
+        )
+        self.__count(EndpointClass.AMOJO_PAGING, size.probes)
+
+        return size
+
+    def __count(self, endpoint_class: EndpointClass, requests_count: int = 1) -> None:
+        """Учет запросов, сделанных при планировании"""
+
+        with self.__requests_lock:
+            self.__requests[endpoint_class] = (
+                self.__requests.get(endpoint_class, 0) + requests_count
+            )
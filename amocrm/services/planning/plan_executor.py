@@ -0,0 +1,196 @@
+from typing import (
+    Any,
+    Callable,
+)
+from contextlib import (
+    nullcontext,
+    AbstractContextManager,
+)
+from dataclasses import (
+    field,
+    dataclass,
+)
+from concurrent.futures import Future
+
+from ..core.talks import AmoCRMTalks
+from ..core.client import AmoCRMClient
+from ..core.communication_channels.channel_unlinker import (
+    AmoCRMCommunicationChannelUnlinker,
+)
+from ..amojo.client import AmoJoClient
+from ..amojo.chat_unloader import AmoJoChatUnloader
+from ..archive.interfaces.chat_messages_sink import IChatMessagesSink
+from ..archive.interfaces.raw_chat_pages_sink import IRawChatPagesSink
+from ..scheduling.work_item import (
+    WorkItem,
+    EndpointClass,
+)
+from ..scheduling.work_scheduler import WorkScheduler
+
+from .action_plan import (
+    AmoCRMActionPlan,
+    AmoCRMChannelPlan,
+)
+
+
+@dataclass
+class AmoCRMPlanExecutionResult:
+    """Результат выполнения плана"""
+
+    # Контакты, все каналы которых обработаны.
+    processed: list[int] = field(default_factory=list)
+    # Контакты, при обработке каналов которых возникли ошибки.
+    failed: dict[int, BaseException] = field(default_factory=dict)
+    # Количество выгруженных страниц переписки.
+    pages: int = 0
+    # Количество закрытых бесед.
+    talks: int = 0
+
+
+class AmoCRMPlanExecutor:
+    """
+    Класс для выполнения плана, составленного `AmoCRMContactsPlanner`.
+
+    Каналы всех контактов плана обрабатываются параллельно в `WorkScheduler`,
+    каждый канал - одной работой: выгрузка переписки, закрытие бесед из
+    плана и открепление канала. Беседы заново не запрашиваются. Каналы с
+    наибольшей оценкой запросов ставятся первыми, чтобы самые долгие чаты
+    не оказались в конце очереди.
+
+    Открытые беседы берутся из плана, поэтому план нужно выполнять вскоре
+    после составления: беседы, открытые после планирования, не закрываются.
+    """
+
+    def __init__(
+        self,
+        amocrm_client: AmoCRMClient,
+        amojo_client: AmoJoClient,
+        chat_sink: IChatMessagesSink,
+        scheduler: WorkScheduler,
+        channel_context: (
+            Callable[[AmoCRMChannelPlan], AbstractContextManager[Any]] | None
+        ) = None,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param amocrm_client: Объект для работы с API amoCRM.
+        :param amojo_client: Объект для работы с API amojo.
+        :param chat_sink: Хранилище выгруженных переписок.
+        :param scheduler: Планировщик, в котором обрабатываются каналы.
+        :param channel_context:
+            Фабрика контекста, в котором обрабатывается канал, например,
+            транзакции БД. Контекст входит и выходит в потоке работы канала.
+        """
+
+        self.__amojo_client = amojo_client
+        self.__chat_sink = chat_sink
+        self.__scheduler = scheduler
+        self.__channel_context = channel_context or (lambda _: nullcontext())
+        self.__talks = AmoCRMTalks(amocrm_client)
+        self.__unlinker = AmoCRMCommunicationChannelUnlinker(amocrm_client)
+
+    def execute(self, plan: AmoCRMActionPlan) -> AmoCRMPlanExecutionResult:
+        """
+        Выполнение плана.
+
+        Контакты, которые не удалось спланировать, и контакты без каналов
+        не выполняются и в результат не попадают. Ошибка канала не прерывает
+        обработку остальных каналов.
+
+        :param plan: План.
+
+        :return: Результат выполнения.
+        """
+
+        result = AmoCRMPlanExecutionResult()
+
+        channels = [
+            (contact_plan.contact_id, channel_plan)
+            for contact_plan in plan.contacts
+            if contact_plan.error is None
+            for channel_plan in contact_plan.channels
+        ]
+        channels.sort(key=lambda item: item[1].estimated_requests, reverse=True)
+
+        futures: list[tuple[int, Future[Any]]] = [
+            (
+                contact_id,
+                self.__scheduler.submit(
+                    WorkItem(
+                        EndpointClass.AMOJO_PAGING,
+                        self.__execute_channel,
+                        (channel_plan,),
+                        group_id=contact_id,
+                    )
+                ),
+            )
+            for contact_id, channel_plan in channels
+        ]
+
+        errors: dict[int, list[Exception]] = {}
+        for contact_id, future in futures:
+            errors.setdefault(contact_id, [])
+            try:
+                pages, talks = future.result()
+            except Exception as e:
+                errors[contact_id].append(e)
+            else:
+                result.pages += pages
+                result.talks += talks
+
+        for contact_id, contact_errors in errors.items():
+            if len(contact_errors) == 0:
+                result.processed.append(contact_id)
+            else:
+                result.failed[contact_id] = ExceptionGroup(
+                    f"Ошибки при обработке каналов контакта {contact_id}",
+                    contact_errors,
+                )
+
+        return result
+
+    def __execute_channel(self, channel_plan: AmoCRMChannelPlan) -> tuple[int, int]:
+        """
+        Обработка одного канала по плану.
+
+        :return: Количество выгруженных страниц и закрытых бесед.
+        """
+
+        channel_data = channel_plan.channel
+        chat_sink = self.__chat_sink
+
+        try:
+            with self.__channel_context(channel_plan):
+                pages = 0
+                chat_unloader = AmoJoChatUnloader(
+                    self.__amojo_client, channel_data.chat_id
+                )
+                # Хранилищу сырых страниц сообщения не разбираем.
+                if isinstance(chat_sink, IRawChatPagesSink):
+                    for page in chat_unloader.iter_raw_pages():
+                        chat_sink.write_page(
+                            channel_data.chat_id, channel_data.origin, page
+                        )
+                        pages += 1
+                    chat_sink.finish_chat(channel_data.chat_id)
+                else:
+                    for messages in chat_unloader:
+                        chat_sink.write(
+                            channel_data.chat_id, channel_data.origin, messages
+                        )
+                        pages += 1
+
+                # Канал открепляется, только когда переписка надежно
+                # сохранена, а не лежит в буферах хранилища.
+                chat_sink.flush_chat(channel_data.chat_id)
+
+                talks = self.__talks.close_talks(
+                    channel_data.chat_id, channel_plan.open_talks_ids
+                )
+                self.__unlinker.unlink_chat(channel_data)
+        except Exception:
+            chat_sink.rollback_chat(channel_data.chat_id)
+            raise
+
+        return pages, talks
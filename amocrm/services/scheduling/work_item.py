@@ -0,0 +1,60 @@
+from enum import StrEnum
+from typing import (
+    Any,
+    Hashable,
+    Callable,
+)
+from dataclasses import (
+    field,
+    dataclass,
+)
+
+from ..core.endpoints import (
+    AmoCRMResources,
+    AmoCRMOpenEndpoints,
+    AmoCRMAjaxEndpoints,
+)
+from ..amojo.endpoints import AmoJoClosedEndpoints
+
+
+class EndpointClass(StrEnum):
+    """Классы эндпоинтов по характеру нагрузки"""
+
+    # Тяжелые HTML-страницы (страница сделки).
+    HTML_PAGE = "html_page"
+    # Постраничная выгрузка сообщений из amojo.
+    AMOJO_PAGING = "amojo_paging"
+    # Легкие чтения JSON API.
+    READ = "read"
+    # Быстрые изменяющие запросы, которые завершают обработку контакта.
+    QUICK_WRITE = "quick_write"
+
+
+# Классы известных эндпоинтов.
+ENDPOINT_CLASSES: dict[str, EndpointClass] = {
+    AmoCRMResources.LEAD_DETAIL: EndpointClass.HTML_PAGE,
+    AmoJoClosedEndpoints.GET_CHAT_MESSAGES: EndpointClass.AMOJO_PAGING,
+    AmoCRMOpenEndpoints.CONTACTS: EndpointClass.READ,
+    AmoCRMOpenEndpoints.CONTACT_DETAIL: EndpointClass.READ,
+    AmoCRMOpenEndpoints.ACCOUNT_PARAMS: EndpointClass.READ,
+    AmoCRMAjaxEndpoints.TALKS: EndpointClass.READ,
+    AmoCRMOpenEndpoints.CLOSE_TALK: EndpointClass.QUICK_WRITE,
+    AmoCRMAjaxEndpoints.UNLINK_CONTACTS_CHAT: EndpointClass.QUICK_WRITE,
+}
+
+
+@dataclass
+class WorkItem:
+    """Единица работы для `WorkScheduler`"""
+
+    # Класс эндпоинта, к которому обращается работа.
+    endpoint_class: EndpointClass
+    # Выполняемая функция.
+    fn: Callable[..., Any]
+    args: tuple[Any, ...] = ()
+    kwargs: dict[str, Any] = field(default_factory=dict)
+    # Группа, к которой относится работа, например ID контакта. Работы уже
+    # начатых групп выполняются раньше работ новых групп.
+    group_id: Hashable | None = None
+    # Аккаунт amoCRM, к которому относится работа.
+    account_id: str | None = None
@@ -0,0 +1,343 @@
+import heapq
+import itertools
+import threading
+from typing import (
+    Any,
+    Hashable,
+)
+from dataclasses import dataclass
+from concurrent.futures import Future
+
+from .work_item import (
+    WorkItem,
+    EndpointClass,
+)
+
+
+# Ранг работ групп, которые еще не начаты. Больше любого порядкового номера
+# начатой группы, поэтому такие работы выполняются после работ начатых групп.
+_NOT_STARTED_RANK = 1 << 62
+
+
+@dataclass
+class SchedulerMetrics:
+    """Срез состояния планировщика"""
+
+    # Количество ожидающих работ по классам эндпоинтов.
+    queued: dict[EndpointClass, int]
+    # Количество выполняемых работ по классам эндпоинтов.
+    in_flight: dict[EndpointClass, int]
+    # Количество начатых, но не завершенных групп (например, контактов).
+    groups_in_progress: int
+    # Количество групп, ни одна работа которых еще не начиналась.
+    groups_waiting: int
+    # Количество завершенных работ.
+    completed: int
+
+
+class _Entry:
+    """Работа в очереди планировщика"""
+
+    __slots__ = ("item", "future", "seq", "version")
+
+    def __init__(self, item: WorkItem, future: Future[Any], seq: int) -> None:
+        self.item = item
+        self.future = future
+        self.seq = seq
+        self.version = 0
+
+
+class _Group:
+    """Учет работ одной группы"""
+
+    __slots__ = ("started_seq", "pending", "in_flight")
+
+    def __init__(self) -> None:
+        self.started_seq: int | None = None
+        self.pending: dict[int, _Entry] = {}
+        self.in_flight = 0
+
+
+class WorkScheduler:
+    """
+    Пул потоков для типизированных работ с лимитами по классам эндпоинтов.
+
+    Особенности:
+
+        1. Для каждого класса эндпоинтов (`EndpointClass`) свой лимит
+        одновременно выполняемых работ. Медленные классы (страницы сделок,
+        выгрузка из amojo) не могут занять все потоки, поэтому быстрые запросы,
+        завершающие обработку контакта, не ждут их.
+        2. Работы групп, которые уже начаты (например, контактов, по которым
+        уже что-то запрошено), выполняются раньше работ новых групп, причем
+        раньше начатые группы - в первую очередь. Так сокращается количество
+        одновременно незавершенных контактов и время обработки одного контакта.
+        3. Опционально ограничивается количество одновременных работ одного аккаунта.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        endpoint_limits: dict[EndpointClass, int] | None = None,
+        per_account_concurrency: int | None = None,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param max_workers: Количество потоков.
+        :param endpoint_limits:
+            Лимиты одновременно выполняемых работ по классам эндпоинтов.
+            По умолчанию страницы сделок занимают не больше четверти потоков,
+            выгрузка из amojo - не больше половины, остальные классы не ограничены.
+        :param per_account_concurrency:
+            Максимальное количество одновременных работ одного аккаунта.
+            None - без ограничения.
+        """
+
+        self.__limits = {
+            EndpointClass.HTML_PAGE: max(1, max_workers // 4),
+            EndpointClass.AMOJO_PAGING: max(1, max_workers // 2),
+            EndpointClass.READ: max_workers,
+            EndpointClass.QUICK_WRITE: max_workers,
+        }
+        self.__limits.update(endpoint_limits or {})
+        self.__per_account_concurrency = per_account_concurrency
+
+        self.__condition = threading.Condition()
+        self.__seq = itertools.count()
+        self.__group_seq = itertools.count()
+        self.__heaps: dict[EndpointClass, list[tuple[int, int, int, _Entry]]] = {
+            endpoint_class: [] for endpoint_class in EndpointClass
+        }
+        self.__queued = {endpoint_class: 0 for endpoint_class in EndpointClass}
+        self.__in_flight = {endpoint_class: 0 for endpoint_class in EndpointClass}
+        self.__account_in_flight: dict[str, int] = {}
+        self.__groups: dict[Hashable, _Group] = {}
+        self.__completed = 0
+        self.__is_shutdown = False
+
+        self.__workers = [
+            threading.Thread(
+                target=self.__work, name=f"work-scheduler-{i}", daemon=True
+            )
+            for i in range(max_workers)
+        ]
+        for worker in self.__workers:
+            worker.start()
+
+    def submit(self, item: WorkItem) -> Future[Any]:
+        """
+        Постановка работы в очередь.
+
+        Работы можно ставить и из выполняемых работ, например, после
+        получения страницы сделки поставить выгрузку чатов того же контакта.
+
+        :param item: Работа.
+
+        :return: Объект `Future` с результатом выполнения.
+        """
+
+        future: Future[Any] = Future()
+
+        with self.__condition:
+            if self.__is_shutdown:
+                raise RuntimeError("Планировщик остановлен")
+
+            entry = _Entry(item, future, next(self.__seq))
+
+            rank = _NOT_STARTED_RANK
+            if item.group_id is not None:
+                group = self.__groups.get(item.group_id)
+                if group is None:
+                    group = self.__groups[item.group_id] = _Group()
+                group.pending[entry.seq] = entry
+                if group.started_seq is not None:
+                    rank = group.started_seq
+
+            self.__push(entry, rank)
+            self.__queued[item.endpoint_class] += 1
+            self.__condition.notify()
+
+        return future
+
+    def metrics(self) -> SchedulerMetrics:
+        """Получение среза состояния планировщика"""
+
+        with self.__condition:
+            groups_in_progress = sum(
+                1 for group in self.__groups.values() if group.started_seq is not None
+            )
+            return SchedulerMetrics(
+                queued=dict(self.__queued),
+                in_flight=dict(self.__in_flight),
+                groups_in_progress=groups_in_progress,
+                groups_waiting=len(self.__groups) - groups_in_progress,
+                completed=self.__completed,
+            )
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Остановка планировщика.
+
+        Уже поставленные работы, в том числе поставленные ими новые работы,
+        будут выполнены.
+
+        :param wait: Дождаться завершения всех работ.
+        """
+
+        with self.__condition:
+            self.__is_shutdown = True
+            self.__condition.notify_all()
+
+        if wait:
+            for worker in self.__workers:
+                worker.join()
+
+    def __enter__(self) -> "WorkScheduler":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.shutdown()
+
+    def __work(self) -> None:
+        """Цикл потока"""
+
+        while True:
+            with self.__condition:
+                while True:
+                    entry = self.__take_next()
+                    if entry is not None:
+                        break
+                    if self.__is_shutdown and self.__is_idle():
+                        # Будим остальные потоки, чтобы они тоже завершились.
+                        self.__condition.notify_all()
+                        return
+                    self.__condition.wait()
+                self.__start(entry)
+
+            item = entry.item
+            if entry.future.set_running_or_notify_cancel():
+                try:
+                    entry.future.set_result(item.fn(*item.args, **item.kwargs))
+                except BaseException as e:
+                    entry.future.set_exception(e)
+
+            with self.__condition:
+                self.__finish(entry)
+                self.__condition.notify_all()
+
+    def __is_idle(self) -> bool:
+        """Нет ни ожидающих, ни выполняемых работ. Вызывать под блокировкой"""
+
+        return sum(self.__queued.values()) == 0 and sum(self.__in_flight.values()) == 0
+
+    def __push(self, entry: _Entry, rank: int) -> None:
+        heapq.heappush(
+            self.__heaps[entry.item.endpoint_class],
+            (rank, entry.seq, entry.version, entry),
+        )
+
+    def __take_next(self) -> _Entry | None:
+        """
+        Выбор следующей работы среди всех классов эндпоинтов.
+
+        Вызывать под блокировкой.
+        """
+
+        best: tuple[tuple[int, int], _Entry] | None = None
+
+        for endpoint_class, heap in self.__heaps.items():
+            if self.__in_flight[endpoint_class] >= self.__limits[endpoint_class]:
+                continue
+
+            candidate = self.__pop_eligible(heap)
+            if candidate is None:
+                continue
+
+            if best is None or candidate[0] < best[0]:
+                if best is not None:
+                    self.__push(best[1], best[0][0])
+                best = candidate
+            else:
+                self.__push(candidate[1], candidate[0][0])
+
+        return best[1] if best is not None else None
+
+    def __pop_eligible(
+        self, heap: list[tuple[int, int, int, _Entry]]
+    ) -> tuple[tuple[int, int], _Entry] | None:
+        """
+        Извлечение лучшей работы класса, аккаунт которой не превысил лимит.
+
+        Вызывать под блокировкой.
+        """
+
+        skipped: list[tuple[int, int, int, _Entry]] = []
+        result: tuple[tuple[int, int], _Entry] | None = None
+
+        while heap:
+            rank, seq, version, entry = heapq.heappop(heap)
+            # Устаревшая запись: работа уже переставлена с другим рангом.
+            if version != entry.version:
+                continue
+
+            account_id = entry.item.account_id
+            if (
+                self.__per_account_concurrency is not None
+                and account_id is not None
+                and self.__account_in_flight.get(account_id, 0)
+                >= self.__per_account_concurrency
+            ):
+                skipped.append((rank, seq, version, entry))
+                continue
+
+            result = ((rank, seq), entry)
+            break
+
+        for skipped_item in skipped:
+            heapq.heappush(heap, skipped_item)
+
+        return result
+
+    def __start(self, entry: _Entry) -> None:
+        """Учет начала выполнения работы. Вызывать под блокировкой"""
+
+        item = entry.item
+        self.__queued[item.endpoint_class] -= 1
+        self.__in_flight[item.endpoint_class] += 1
+        if item.account_id is not None:
+            self.__account_in_flight[item.account_id] = (
+                self.__account_in_flight.get(item.account_id, 0) + 1
+            )
+
+        if item.group_id is None:
+            return
+
+        group = self.__groups[item.group_id]
+        del group.pending[entry.seq]
+        group.in_flight += 1
+
+        # Группа начата впервые: поднимаем приоритет остальных ее работ.
+        if group.started_seq is None:
+            group.started_seq = next(self.__group_seq)
+            for pending_entry in group.pending.values():
+                pending_entry.version += 1
+                self.__push(pending_entry, group.started_seq)
+
+    def __finish(self, entry: _Entry) -> None:
+        """Учет завершения работы. Вызывать под блокировкой"""
+
+        item = entry.item
+        self.__in_flight[item.endpoint_class] -= 1
+        self.__completed += 1
+
+        if item.account_id is not None:
+            self.__account_in_flight[item.account_id] -= 1
+            if self.__account_in_flight[item.account_id] == 0:
+                del self.__account_in_flight[item.account_id]
+
+        if item.group_id is not None:
+            group = self.__groups[item.group_id]
+            group.in_flight -= 1
+            if group.in_flight == 0 and len(group.pending) == 0:
+                del self.__groups[item.group_id]
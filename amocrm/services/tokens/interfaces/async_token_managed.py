@@ -0,0 +1,66 @@
+from abc import (
+    ABC,
+    abstractmethod,
+)
+from contextlib import (
+    nullcontext,
+    AbstractAsyncContextManager,
+)
+
+from ..tokens import Tokens
+
+
+class IAsyncTokenManaged(ABC):
+    """
+    Асинхронный интерфейс для управления токенами.
+
+    Аналог `ITokenManaged` для асинхронных клиентов: получение и сохранение
+    токенов не должно блокировать цикл событий.
+    """
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """
+        Получение уникального имени менеджера токенов.
+
+        :return: Имя в виде строки.
+        """
+
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_tokens(self) -> Tokens | None:
+        """
+        Получение токенов доступа.
+
+        :return: Объект с токенами доступа.
+        """
+
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def save_tokens(self, tokens: Tokens) -> Tokens:
+        """
+        Сохранение токенов доступа.
+
+        :param tokens: Объект с новыми токенами доступа.
+        """
+
+        raise NotImplementedError()
+
+    def refresh_lock(self) -> AbstractAsyncContextManager[None]:
+        """
+        Блокировка на время обновления токенов.
+
+        Асинхронный аналог `ITokenManaged.refresh_lock`: клиент берет ее через
+        `async with` перед обновлением токенов и под ней заново читает
+        сохраненные токены. Ожидание блокировки не должно блокировать цикл
+        событий.
+
+        :return:
+            Асинхронный контекстный менеджер блокировки. По умолчанию ничего
+            не блокирует.
+        """
+
+        return nullcontext()
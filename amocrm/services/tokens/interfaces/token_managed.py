@@ -2,6 +2,10 @@ from abc import (
     ABC,
     abstractmethod,
 )
+from contextlib import (
+    nullcontext,
+    AbstractContextManager,
+)
 
 from ..tokens import Tokens
 
@@ -39,3 +43,17 @@ class ITokenManaged(ABC):
         """
 
         raise NotImplementedError()
+
+    def refresh_lock(self) -> AbstractContextManager[None]:
+        """
+        Блокировка на время обновления токенов.
+
+        Клиент берет ее перед обновлением токенов и под ней заново читает
+        сохраненные токены: если их уже обновил другой клиент, повторное
+        обновление не нужно. Менеджеры токенов, общих для нескольких процессов,
+        могут переопределить ее, чтобы токены обновлял только один процесс.
+
+        :return: Контекстный менеджер блокировки. По умолчанию ничего не блокирует.
+        """
+
+        return nullcontext()
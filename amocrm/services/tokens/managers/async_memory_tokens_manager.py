@@ -0,0 +1,22 @@
+from ..tokens import Tokens
+from ..interfaces.async_token_managed import IAsyncTokenManaged
+
+
+class AsyncMemoryTokensManager(IAsyncTokenManaged):
+    """Асинхронный менеджер токенов, хранящий их в ОЗУ компьютера"""
+
+    def __init__(self) -> None:
+        """Инициализатор класса"""
+
+        self.__tokens: Tokens | None = None
+
+    @property
+    def name(self) -> str:
+        return self.__class__.__name__
+
+    async def get_tokens(self) -> Tokens | None:
+        return self.__tokens
+
+    async def save_tokens(self, tokens: Tokens) -> Tokens:
+        self.__tokens = tokens
+        return self.__tokens
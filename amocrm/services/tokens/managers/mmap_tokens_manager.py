@@ -0,0 +1,309 @@
+"""
+Менеджер токенов в отображаемом в память файле, общем для процессов одной машины.
+
+Использует `fcntl.flock`, поэтому работает только в POSIX-системах.
+"""
+
+import os
+import mmap
+import time
+import zlib
+import fcntl
+import struct
+import weakref
+import threading
+from typing import Iterator
+from pathlib import Path
+from contextlib import (
+    contextmanager,
+    AbstractContextManager,
+)
+
+from ..tokens import Tokens
+from ..interfaces.token_managed import ITokenManaged
+
+
+class MmapTokensManager(ITokenManaged):
+    """
+    Менеджер токенов, хранящий их в небольшом файле, отображенном в память.
+
+    Все процессы-воркеры одной машины отображают один и тот же файл, поэтому
+    токены, сохраненные одним воркером, сразу видны остальным без запросов к БД.
+
+    Файл устроен как seqlock: в заголовке хранится счетчик версий, который
+    писатель делает нечетным перед записью и четным после нее. Читатель
+    читает счетчик, данные и снова счетчик, и принимает данные, только если
+    счетчик не изменился и четный. Дополнительно данные проверяются по CRC32.
+    Чтение не делает системных вызовов, а если версия не менялась, возвращает
+    уже разобранные токены.
+
+    Писатели исключают друг друга блокировкой `flock` на файл, она же
+    используется как `refresh_lock`: пока один воркер обновляет токены,
+    остальные ждут и затем берут уже обновленные токены.
+
+    Блокировка `flock` принадлежит открытому файлу, а не процессу, поэтому
+    менеджер, созданный до `fork` (например, в главном процессе Celery),
+    в дочернем процессе открывает файл заново. Иначе все дочерние процессы
+    делили бы одну блокировку и не исключали бы друг друга.
+    """
+
+    MAGIC = b"AMTK"
+    LAYOUT_VERSION = 1
+
+    # Заголовок: магия, версия формата, счетчик версий, CRC32 данных,
+    # длины access- и refresh-токена.
+    __HEADER = struct.Struct("<4sIQIII")
+    __SEQ = struct.Struct("<Q")
+    __SEQ_OFFSET = 8
+    __DATA_OFFSET = 32
+    # Длина отсутствующего токена.
+    __NONE_LENGTH = 0xFFFFFFFF
+    # Сколько раз читатель повторяет чтение, прежде чем заподозрить, что
+    # писатель завершился посреди записи.
+    __MAX_READ_ATTEMPTS = 10_000
+
+    def __init__(
+        self,
+        path: str | Path,
+        name: str,
+        account_id: str | None = None,
+        size: int = 8192,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param path: Путь к файлу токенов. Создается, если его нет.
+        :param name: Уникальное название менеджера.
+        :param account_id:
+            ID аккаунта amoCRM. Токены разных аккаунтов должны храниться в
+            разных файлах, ID нужен для имени менеджера.
+        :param size: Размер файла, ограничивает суммарную длину токенов.
+        """
+
+        self.__name = name if account_id is None else f"{account_id}:{name}"
+        self.__size = size
+        self.__is_closed = False
+
+        self.__thread_lock = threading.RLock()
+        self.__lock_depth = 0
+        # Последние прочитанные токены и их версия.
+        self.__cached: tuple[int, Tokens | None] = (-1, None)
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.__path = path
+        self.__fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            with self.__locked():
+                if os.fstat(self.__fd).st_size < size:
+                    os.ftruncate(self.__fd, size)
+                self.__mmap = mmap.mmap(self.__fd, size)
+
+                magic, layout_version = struct.unpack_from("<4sI", self.__mmap)
+                if magic == b"\0\0\0\0":
+                    self.__HEADER.pack_into(
+                        self.__mmap, 0, self.MAGIC, self.LAYOUT_VERSION, 0, 0, 0, 0
+                    )
+                elif magic != self.MAGIC or layout_version != self.LAYOUT_VERSION:
+                    raise ValueError(f"Файл {path} не является файлом токенов")
+        except BaseException:
+            os.close(self.__fd)
+            raise
+
+        # Ссылка слабая: регистрацию нельзя отменить, а менеджер не должен
+        # жить дольше, чем им пользуются.
+        reopen = weakref.WeakMethod(self.__reopen_after_fork)
+        os.register_at_fork(
+            after_in_child=lambda: (method := reopen()) is not None and method()
+        )
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    def get_tokens(self) -> Tokens | None:
+        for _ in range(self.__MAX_READ_ATTEMPTS):
+            seq = self.__SEQ.unpack_from(self.__mmap, self.__SEQ_OFFSET)[0]
+            cached_seq, cached_tokens = self.__cached
+            if seq == cached_seq:
+                return cached_tokens
+            if seq & 1:
+                # Идет запись.
+                time.sleep(0)
+                continue
+
+            consistent, tokens = self.__read_tokens(seq)
+            if consistent:
+                self.__cached = (seq, tokens)
+                return tokens
+
+        # Писатель так и не закончил запись: скорее всего, процесс завершился
+        # посреди нее. Восстанавливаем заголовок под блокировкой писателя.
+        with self.__locked():
+            seq = self.__SEQ.unpack_from(self.__mmap, self.__SEQ_OFFSET)[0]
+            if seq & 1:
+                consistent, _ = self.__read_tokens(seq)
+                if not consistent:
+                    self.__write(seq + 2, None)
+                else:
+                    self.__SEQ.pack_into(self.__mmap, self.__SEQ_OFFSET, seq + 1)
+
+        return self.get_tokens()
+
+    def save_tokens(self, tokens: Tokens) -> Tokens:
+        with self.__locked():
+            seq = self.__SEQ.unpack_from(self.__mmap, self.__SEQ_OFFSET)[0]
+            # Нечетная версия осталась от писателя, завершившегося посреди
+            # записи. Данные все равно перезаписываются.
+            self.__write(seq + 1 + (seq & 1), tokens)
+            self.__mmap.flush()
+
+        return Tokens(tokens.access_token, tokens.refresh_token)
+
+    def refresh_lock(self) -> AbstractContextManager[None]:
+        return self.__locked()
+
+    def close(self) -> None:
+        """Закрытие отображения и файла"""
+
+        self.__is_closed = True
+        self.__mmap.close()
+        os.close(self.__fd)
+
+    def __reopen_after_fork(self) -> None:
+        """
+        Открытие файла и отображения заново в дочернем процессе.
+
+        Вызывается сразу после `fork`, когда в процессе работает только один
+        поток, поэтому блокировка потоков пересоздается: ее мог держать поток
+        родителя, которого в дочернем процессе нет.
+        """
+
+        if self.__is_closed:
+            return
+
+        self.__thread_lock = threading.RLock()
+        self.__lock_depth = 0
+
+        fd = os.open(self.__path, os.O_RDWR)
+        self.__mmap.close()
+        os.close(self.__fd)
+        self.__fd = fd
+        self.__mmap = mmap.mmap(self.__fd, self.__size)
+
+    def __read_tokens(self, seq: int) -> tuple[bool, Tokens | None]:
+        """
+        Чтение данных версии `seq`.
+
+        :return: Пара из признака целостности данных и токенов. Признак равен
+            False, если данные были изменены во время чтения или повреждены,
+            токены в этом случае None. Токены None также, если их нет: токены
+            без access- и refresh-токена считаются отсутствующими.
+        """
+
+        # Версия 0 - файл только создан, токенов еще не было.
+        if seq == 0:
+            return True, None
+
+        _, _, _, crc, access_length, refresh_length = self.__HEADER.unpack_from(
+            self.__mmap
+        )
+        data_length = sum(
+            length
+            for length in (access_length, refresh_length)
+            if length != self.__NONE_LENGTH
+        )
+        if self.__DATA_OFFSET + data_length > self.__size:
+            return False, None
+
+        data = self.__mmap[self.__DATA_OFFSET : self.__DATA_OFFSET + data_length]
+        if self.__SEQ.unpack_from(self.__mmap, self.__SEQ_OFFSET)[0] != seq:
+            return False, None
+        if self.__checksum(data, access_length, refresh_length) != crc:
+            return False, None
+
+        if access_length == refresh_length == self.__NONE_LENGTH:
+            return True, None
+
+        access_token, refresh_token = None, None
+        offset = 0
+        if access_length != self.__NONE_LENGTH:
+            access_token = data[:access_length].decode()
+            offset = access_length
+        if refresh_length != self.__NONE_LENGTH:
+            refresh_token = data[offset : offset + refresh_length].decode()
+
+        return True, Tokens(access_token, refresh_token)
+
+    def __write(self, odd_seq: int, tokens: Tokens | None) -> None:
+        """
+        Запись токенов с версией `odd_seq + 1`. Вызывать под блокировкой.
+
+        :param odd_seq: Нечетная версия, которой помечается идущая запись.
+        :param tokens: Токены. None, если сохраненные токены нужно сбросить.
+        """
+
+        access = (
+            tokens.access_token.encode()
+            if tokens is not None and tokens.access_token is not None
+            else None
+        )
+        refresh = (
+            tokens.refresh_token.encode()
+            if tokens is not None and tokens.refresh_token is not None
+            else None
+        )
+        data = (access or b"") + (refresh or b"")
+        if self.__DATA_OFFSET + len(data) > self.__size:
+            raise ValueError(
+                f"Токены длиной {len(data)} байт не помещаются в файл "
+                f"размером {self.__size} байт"
+            )
+
+        access_length = self.__NONE_LENGTH if access is None else len(access)
+        refresh_length = self.__NONE_LENGTH if refresh is None else len(refresh)
+        crc = self.__checksum(data, access_length, refresh_length)
+
+        self.__SEQ.pack_into(self.__mmap, self.__SEQ_OFFSET, odd_seq)
+        self.__mmap[self.__DATA_OFFSET : self.__DATA_OFFSET + len(data)] = data
+        self.__HEADER.pack_into(
+            self.__mmap,
+            0,
+            self.MAGIC,
+            self.LAYOUT_VERSION,
+            odd_seq,
+            crc,
+            access_length,
+            refresh_length,
+        )
+        self.__SEQ.pack_into(self.__mmap, self.__SEQ_OFFSET, odd_seq + 1)
+
+    @staticmethod
+    def __checksum(data: bytes, access_length: int, refresh_length: int) -> int:
+        """CRC32 длин токенов и данных"""
+
+        return zlib.crc32(
+            data, zlib.crc32(struct.pack("<II", access_length, refresh_length))
+        )
+
+    @contextmanager
+    def __locked(self) -> Iterator[None]:
+        """
+        Блокировка писателя: между потоками процесса и между процессами.
+
+        `flock` не различает потоки одного процесса, поэтому сначала берется
+        блокировка потоков. Блокировка повторно входима.
+        """
+
+        with self.__thread_lock:
+            self.__lock_depth += 1
+            try:
+                if self.__lock_depth == 1:
+                    fcntl.flock(self.__fd, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if self.__lock_depth == 1:
+                        fcntl.flock(self.__fd, fcntl.LOCK_UN)
+            finally:
+                self.__lock_depth -= 1
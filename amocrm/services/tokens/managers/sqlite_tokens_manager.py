@@ -0,0 +1,237 @@
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import (
+    Iterator,
+    AsyncIterator,
+)
+from pathlib import Path
+from contextlib import (
+    contextmanager,
+    asynccontextmanager,
+    AbstractContextManager,
+)
+
+from ...utils.thread_bound_lock import ThreadBoundLock
+from ..tokens import Tokens
+from ..interfaces.token_managed import ITokenManaged
+from ..interfaces.async_token_managed import IAsyncTokenManaged
+
+
+class SQLiteTokensManager(ITokenManaged):
+    """
+    Менеджер токенов, хранящий их в файле SQLite.
+
+    Подходит для нескольких процессов-воркеров на одной машине без общей БД.
+    Запись выполняется одной транзакцией, поэтому читатели видят либо старую,
+    либо новую пару токенов целиком, а оборванная запись не портит файл.
+    Журнал WAL позволяет читать токены, пока другой процесс их записывает.
+
+    `refresh_lock` открывает транзакцию `BEGIN IMMEDIATE`, которая исключает
+    других писателей во всех процессах. Чтение и сохранение токенов в потоке,
+    держащем блокировку, выполняются в этой же транзакции, поэтому токены
+    обновляет только один воркер, а остальные после ожидания читают уже
+    обновленные.
+
+    На каждую операцию открывается свое соединение, поэтому объект можно
+    использовать из нескольких потоков.
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        name: str,
+        account_id: str | None = None,
+        busy_timeout: float = 30.0,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param db_path: Путь к файлу БД. Создается, если его нет.
+        :param name: Уникальное название менеджера.
+        :param account_id:
+            ID аккаунта amoCRM. Токены разных аккаунтов хранятся под разными
+            именами вида `<account_id>:<name>`.
+        :param busy_timeout:
+            Сколько секунд ждать, пока другой процесс освободит БД.
+        """
+
+        self.__db_path = Path(db_path)
+        self.__name = name if account_id is None else f"{account_id}:{name}"
+        self.__busy_timeout = busy_timeout
+        # Соединение с транзакцией `refresh_lock` потока, который ее держит.
+        self.__local = threading.local()
+
+        self.__db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.__connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS amocrm_tokens ("
+                "manager_name TEXT PRIMARY KEY, "
+                "access_token TEXT, "
+                "refresh_token TEXT, "
+                "updated_at REAL NOT NULL)"
+            )
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    def get_tokens(self) -> Tokens | None:
+        with self.__connect() as connection:
+            row = connection.execute(
+                "SELECT access_token, refresh_token FROM amocrm_tokens "
+                "WHERE manager_name = ?",
+                (self.__name,),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return Tokens(row[0], row[1])
+
+    def save_tokens(self, tokens: Tokens) -> Tokens:
+        with self.__connect() as connection:
+            connection.execute(
+                "INSERT INTO amocrm_tokens "
+                "(manager_name, access_token, refresh_token, updated_at) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (manager_name) DO UPDATE SET "
+                "access_token = excluded.access_token, "
+                "refresh_token = excluded.refresh_token, "
+                "updated_at = excluded.updated_at",
+                (self.__name, tokens.access_token, tokens.refresh_token, time.time()),
+            )
+
+        return Tokens(tokens.access_token, tokens.refresh_token)
+
+    @contextmanager
+    def refresh_lock(self) -> Iterator[None]:
+        """
+        Блокировка БД для записи на время обновления токенов.
+
+        Токены, сохраненные под блокировкой, фиксируются при выходе из блока,
+        в том числе если блок завершился ошибкой: старый refresh-токен к этому
+        времени уже недействителен.
+
+        :return: Контекстный менеджер блокировки.
+        """
+
+        if getattr(self.__local, "connection", None) is not None:
+            yield
+            return
+
+        # Транзакцией управляем сами, без неявных BEGIN модуля sqlite3.
+        connection = sqlite3.connect(
+            self.__db_path, timeout=self.__busy_timeout, isolation_level=None
+        )
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            self.__local.connection = connection
+            try:
+                yield
+            finally:
+                self.__local.connection = None
+                connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+    @contextmanager
+    def __connect(self) -> Iterator[sqlite3.Connection]:
+        """
+        Соединение с БД в транзакции, закрываемое по выходу из блока.
+
+        Под `refresh_lock` возвращается соединение блокировки, транзакцию
+        которого фиксирует сама блокировка.
+        """
+
+        lock_connection = getattr(self.__local, "connection", None)
+        if lock_connection is not None:
+            yield lock_connection
+            return
+
+        connection = sqlite3.connect(self.__db_path, timeout=self.__busy_timeout)
+        try:
+            # Транзакция фиксируется или откатывается при ошибке.
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+
+class AsyncSQLiteTokensManager(IAsyncTokenManaged):
+    """
+    Асинхронный менеджер токенов, хранящий их в файле SQLite.
+
+    Операции `SQLiteTokensManager` выполняются в пуле потоков, чтобы не
+    блокировать цикл событий. Транзакция `refresh_lock` держится в отдельном
+    потоке, и пока она открыта, чтение и сохранение токенов задачи,
+    держащей блокировку, выполняются в том же потоке.
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        name: str,
+        account_id: str | None = None,
+        busy_timeout: float = 30.0,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        Параметры те же, что у `SQLiteTokensManager`. Файл БД создается
+        при первом обращении к токенам.
+        """
+
+        self.__db_path = db_path
+        self.__manager_name = name
+        self.__account_id = account_id
+        self.__busy_timeout = busy_timeout
+        self.__name = name if account_id is None else f"{account_id}:{name}"
+
+        self.__manager: SQLiteTokensManager | None = None
+        self.__manager_lock = asyncio.Lock()
+        self.__refresh_lock = ThreadBoundLock(
+            self.__create_refresh_lock, name="amocrm-tokens-lock"
+        )
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    async def get_tokens(self) -> Tokens | None:
+        manager = await self.__get_manager()
+        return await self.__refresh_lock.acall(manager.get_tokens)
+
+    async def save_tokens(self, tokens: Tokens) -> Tokens:
+        manager = await self.__get_manager()
+        return await self.__refresh_lock.acall(manager.save_tokens, tokens)
+
+    @asynccontextmanager
+    async def refresh_lock(self) -> AsyncIterator[None]:
+        await self.__get_manager()
+        async with self.__refresh_lock.ahold():
+            yield
+
+    async def __get_manager(self) -> SQLiteTokensManager:
+        """Синхронный менеджер, создаваемый в потоке при первом обращении"""
+
+        if self.__manager is None:
+            async with self.__manager_lock:
+                if self.__manager is None:
+                    self.__manager = await asyncio.to_thread(
+                        SQLiteTokensManager,
+                        self.__db_path,
+                        self.__manager_name,
+                        self.__account_id,
+                        self.__busy_timeout,
+                    )
+
+        return self.__manager
+
+    def __create_refresh_lock(self) -> AbstractContextManager[None]:
+        """Блокировка синхронного менеджера. Вызывать после `__get_manager`"""
+
+        assert self.__manager is not None
+        return self.__manager.refresh_lock()
@@ -1,8 +1,50 @@
+import time
+import threading
 import requests
-from typing import Any
-
+from typing import (
+    Any,
+    TypeVar,
+    Callable,
+    overload,
+)
+
+from .rate_limiter import RateLimiter
+from .circuit_breaker import CircuitBreakerRegistry
+from .json_codec import (
+    JSONCodec,
+    get_json_codec,
+)
+from .single_flight import SingleFlight
 from .request_status import HTTPStatus
 
+from ..instrumentation.request_info import RequestInfo
+from ..instrumentation.interfaces.request_hook import IRequestHook
+
+
+T = TypeVar("T")
+
+# Атрибут ответа, в котором хранятся результаты его разбора, общие для всех
+# получивших ответ вызовов.
+_DECODED_RESULTS_ATTR = "_amocrm_decoded_results"
+
+
+class _DecodedResults:
+    """Результаты разбора ответа, общего для нескольких одинаковых запросов"""
+
+    __slots__ = ("lock", "results")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.results: dict[Any, Any] = {}
+
+    def get(self, key: Any, decode: Callable[[], Any]) -> Any:
+        """Результат разбора, выполняемого один раз на ключ"""
+
+        with self.lock:
+            if key not in self.results:
+                self.results[key] = decode()
+            return self.results[key]
+
 
 class BaseAPIClient:
     """
@@ -12,20 +54,115 @@ class BaseAPIClient:
     """
 
     _REQUESTS_THAT_HAVE_BODY = ("post", "put", "putch")
+    # Методы, одинаковые одновременные запросы которых объединяются.
+    _COALESCED_METHODS = ("get", "head")
 
-    def __init__(self, base_url: str) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        request_hooks: list[IRequestHook] | None = None,
+        session: requests.Session | None = None,
+        rate_limiter: RateLimiter | None = None,
+        circuit_breakers: CircuitBreakerRegistry | None = None,
+        json_codec: JSONCodec | None = None,
+        single_flight: SingleFlight | None = None,
+    ) -> None:
         """
         Инициализатор класса.
 
         :param base_url: Базовый URL внешнего сервиса.
+        :param request_hooks:
+            Хуки, вызываемые до и после каждого запроса. Если хуков нет,
+            запросы не замеряются вовсе.
+        :param session:
+            HTTP-сессия с пулом соединений. Одну сессию можно разделять между
+            несколькими клиентами. Если None, клиент создает свою.
+        :param rate_limiter:
+            Ограничитель частоты запросов. Может быть общим для нескольких
+            клиентов и потоков.
+        :param circuit_breakers:
+            Реестр предохранителей по хостам. Если передан, запросы к хосту,
+            для которого разомкнут предохранитель, сразу завершаются
+            исключением `CircuitBreakerOpenException`.
+        :param json_codec:
+            Кодек для разбора ответов. По умолчанию самый быстрый из
+            установленных, см. `get_json_codec`.
+        :param single_flight:
+            Объединение одинаковых одновременных GET-запросов. Если передано,
+            потоки, одновременно запрашивающие один и тот же URL с теми же
+            параметрами и заголовками, получают один ответ на всех, а его
+            разбор через `decode_json` выполняется один раз. Такие ответы и
+            результаты их разбора общие, изменять их нельзя. Запросы с телом
+            не объединяются никогда.
         """
 
         self._base_url = base_url
+        self._request_hooks: list[IRequestHook] = list(request_hooks or [])
+        self._session = session or requests.Session()
+        self._rate_limiter = rate_limiter
+        self._circuit_breaker = (
+            circuit_breakers.get(base_url) if circuit_breakers is not None else None
+        )
+        self._json_codec = json_codec or get_json_codec()
+        self._single_flight = single_flight
 
     @property
     def base_url(self) -> str:
         return self._base_url
 
+    @property
+    def session(self) -> requests.Session:
+        return self._session
+
+    @property
+    def json_codec(self) -> JSONCodec:
+        return self._json_codec
+
+    @overload
+    def decode_json(self, response: requests.Response) -> Any: ...
+
+    @overload
+    def decode_json(self, response: requests.Response, type_: type[T]) -> T: ...
+
+    def decode_json(self, response: requests.Response, type_: Any = None) -> Any:
+        """
+        Разбор тела ответа из JSON кодеком клиента.
+
+        :param response: Объект ответа.
+        :param type_:
+            Тип, в который разбирается тело ответа. Если None, тело
+            разбирается в словари и списки.
+
+        :return: Разобранное тело ответа. Для ответа, общего для нескольких
+            одинаковых запросов (см. `single_flight`), - общий результат разбора.
+        """
+
+        decoded_results: _DecodedResults | None = getattr(
+            response, _DECODED_RESULTS_ATTR, None
+        )
+        if decoded_results is not None:
+            return decoded_results.get(
+                (self._json_codec, type_),
+                lambda: self.__decode(response.content, type_),
+            )
+
+        return self.__decode(response.content, type_)
+
+    def __decode(self, content: bytes, type_: Any) -> Any:
+        if type_ is None:
+            return self._json_codec.loads(content)
+
+        return self._json_codec.decode(content, type_)
+
+    def add_request_hook(self, hook: IRequestHook) -> None:
+        """
+        Добавление хука, вызываемого до и после каждого запроса.
+
+        :param hook: Объект хука.
+        """
+
+        self._request_hooks.append(hook)
+
     def request(
         self,
         method: str,
@@ -34,6 +171,7 @@ class BaseAPIClient:
         is_json: bool = True,
         params: dict[str, Any] | None = None,
         headers: dict[str, Any] | None = None,
+        path_params: dict[str, Any] | None = None,
     ) -> requests.Response:
         """
         Метод отправки запроса на указанный эндпоинт.
@@ -42,7 +180,9 @@ class BaseAPIClient:
         повторяет запрос.
 
         :param method: HTTP-метод запроса.
-        :param url_postfix: Маршрут эндпоинта.
+        :param url_postfix:
+            Маршрут эндпоинта. Может быть шаблоном, например
+            `/leads/detail/{lead_id}`, тогда значения подставляются из `path_params`.
         :param data: Данные для тела запроса.
         :param is_json:
             Флаг, указывающий, что данные являются `applicaiton/json`.
@@ -50,10 +190,110 @@ class BaseAPIClient:
             запроса применять обработку как для JSON.
         :param params: GET-параметры запроса.
         :param headers: Дополнительные заголовки запроса.
+        :param path_params: Значения для подстановки в шаблон `url_postfix`.
 
         :return: Объект ответа `requests.Response`.
         """
 
+        url = url_postfix if path_params is None else url_postfix.format(**path_params)
+
+        # Без хуков не тратим время на замеры.
+        if not self._request_hooks:
+            return self._request_coalesced(method, url, data, is_json, params, headers)[
+                0
+            ]
+
+        request_info = RequestInfo(
+            method=method,
+            endpoint=str(url_postfix),
+            base_url=self._base_url,
+        )
+        for hook in self._request_hooks:
+            hook.before_request(request_info)
+
+        start = time.perf_counter()
+        try:
+            response, request_info.retries, request_info.coalesced = (
+                self._request_coalesced(method, url, data, is_json, params, headers)
+            )
+        except BaseException as e:
+            request_info.error = e
+            raise
+        else:
+            request_info.status_code = response.status_code
+            request_info.response_bytes = len(response.content)
+        finally:
+            request_info.latency = time.perf_counter() - start
+            for hook in self._request_hooks:
+                hook.after_request(request_info)
+
+        return response
+
+    def _request_coalesced(
+        self,
+        method: str,
+        url_postfix: str,
+        data: dict[str, Any] | None = None,
+        is_json: bool = True,
+        params: dict[str, Any] | None = None,
+        headers: dict[str, Any] | None = None,
+    ) -> tuple[requests.Response, int, bool]:
+        """
+        Отправка запроса с объединением одинаковых одновременных запросов.
+
+        :return: Объект ответа, количество сделанных повторов и признак того,
+            что ответ общий для нескольких запросов.
+        """
+
+        if (
+            self._single_flight is None
+            or data is not None
+            or method.lower() not in self._COALESCED_METHODS
+        ):
+            return (
+                *self._request_with_reauth(
+                    method, url_postfix, data, is_json, params, headers
+                ),
+                False,
+            )
+
+        # Заголовки клиента (токен доступа) входят в ключ, чтобы объединять
+        # только запросы, которые сервер обработал бы одинаково.
+        key = (
+            self._base_url,
+            method.lower(),
+            url_postfix,
+            repr(sorted((params or {}).items())),
+            repr(sorted((headers or {}).items())),
+            repr(sorted(self._get_request_headers().items())),
+        )
+
+        def send() -> tuple[requests.Response, int]:
+            response, retries = self._request_with_reauth(
+                method, url_postfix, data, is_json, params, headers
+            )
+            setattr(response, _DECODED_RESULTS_ATTR, _DecodedResults())
+            return response, retries
+
+        (response, retries), is_shared = self._single_flight.do(key, send)
+
+        return response, retries, is_shared
+
+    def _request_with_reauth(
+        self,
+        method: str,
+        url_postfix: str,
+        data: dict[str, Any] | None = None,
+        is_json: bool = True,
+        params: dict[str, Any] | None = None,
+        headers: dict[str, Any] | None = None,
+    ) -> tuple[requests.Response, int]:
+        """
+        Отправка запроса с повтором после переавторизации.
+
+        :return: Объект ответа и количество сделанных повторов.
+        """
+
         # Делаем запрос.
         response = self._request(method, url_postfix, data, is_json, params, headers)
 
@@ -64,8 +304,9 @@ class BaseAPIClient:
             response = self._request(
                 method, url_postfix, data, is_json, params, headers
             )
+            return response, 1
 
-        return response
+        return response, 0
 
     def _request(
         self,
@@ -107,13 +348,52 @@ class BaseAPIClient:
         # Получаем полный URL-адрес до эндпоинта во внешнем сервисе.
         full_url = self._get_full_url(url_postfix)
 
-        return requests.request(
-            method=method,
-            url=full_url,
-            params=get_params,
-            headers=request_headers,
-            **request_body_param,  # type: ignore[arg-type]
+        # Проверяем предохранитель до ограничителя частоты, чтобы не тратить
+        # лимит запросов на недоступный хост.
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.before_call()
+
+        if self._rate_limiter is not None:
+            try:
+                self._rate_limiter.acquire()
+            except BaseException:
+                # Например, таймаут задачи во время ожидания лимита.
+                if self._circuit_breaker is not None:
+                    self._circuit_breaker.cancel_call()
+                raise
+
+        if self._circuit_breaker is None:
+            return self._session.request(
+                method=method,
+                url=full_url,
+                params=get_params,
+                headers=request_headers,
+                **request_body_param,  # type: ignore[arg-type]
+            )
+
+        start = time.perf_counter()
+        try:
+            response = self._session.request(
+                method=method,
+                url=full_url,
+                params=get_params,
+                headers=request_headers,
+                **request_body_param,  # type: ignore[arg-type]
+            )
+        except requests.RequestException:
+            self._circuit_breaker.record(True, time.perf_counter() - start)
+            raise
+        except BaseException:
+            # Запрос прервался без ответа и без ошибки соединения: результат
+            # неизвестен, но место пробного запроса нужно освободить.
+            self._circuit_breaker.cancel_call()
+            raise
+
+        self._circuit_breaker.record(
+            response.status_code >= HTTPStatus.HTTP_500_INTERNAL_SERVER_ERROR,
+            time.perf_counter() - start,
         )
+        return response
 
     def _get_request_params(self) -> dict[str, Any]:
         """
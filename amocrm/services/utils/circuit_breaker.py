@@ -0,0 +1,266 @@
+import time
+import threading
+from enum import StrEnum
+from collections import deque
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from .exceptions import CircuitBreakerOpenException
+
+
+class CircuitState(StrEnum):
+    """Состояния предохранителя"""
+
+    # Запросы идут как обычно, результаты учитываются.
+    CLOSED = "closed"
+    # Запросы не отправляются до истечения `open_timeout`.
+    OPEN = "open"
+    # Пропускается ограниченное количество пробных запросов.
+    HALF_OPEN = "half_open"
+
+
+@dataclass(frozen=True)
+class CircuitBreakerSettings:
+    """Настройки предохранителя"""
+
+    # Доля неуспешных запросов в окне, при которой предохранитель размыкается.
+    failure_rate_threshold: float = 0.5
+    # Время ответа в секундах, начиная с которого запрос считается медленным.
+    # None - время ответа не учитывается.
+    slow_call_duration: float | None = None
+    # Доля медленных запросов в окне, при которой предохранитель размыкается.
+    slow_call_rate_threshold: float = 0.8
+    # Количество последних запросов, по которым считаются доли.
+    window_size: int = 20
+    # Минимальное количество запросов в окне, после которого считаются доли.
+    min_calls: int = 10
+    # Время в секундах, на которое предохранитель размыкается.
+    open_timeout: float = 30.0
+    # Количество пробных запросов в полуразомкнутом состоянии.
+    half_open_max_calls: int = 1
+
+
+class CircuitBreaker:
+    """
+    Потокобезопасный предохранитель для запросов к одному хосту.
+
+    Учитывает результаты последних запросов. Если доля ошибок или медленных
+    ответов превышает порог, предохранитель размыкается, и запросы сразу
+    завершаются исключением `CircuitBreakerOpenException`, не дожидаясь
+    таймаутов. Через `open_timeout` секунд пропускаются пробные запросы:
+    если они успешны, предохранитель замыкается, иначе снова размыкается.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        settings: CircuitBreakerSettings | None = None,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param host: Хост, запросы к которому защищает предохранитель.
+        :param settings: Настройки предохранителя.
+        """
+
+        self.__host = host
+        self.__settings = settings or CircuitBreakerSettings()
+
+        self.__lock = threading.Lock()
+        self.__state = CircuitState.CLOSED
+        # Результаты последних запросов: (неуспешный, медленный).
+        self.__window: deque[tuple[bool, bool]] = deque(
+            maxlen=self.__settings.window_size
+        )
+        self.__failures = 0
+        self.__slow_calls = 0
+        self.__opened_at = 0.0
+        self.__half_open_calls = 0
+        self.__half_open_successes = 0
+
+    @property
+    def host(self) -> str:
+        return self.__host
+
+    @property
+    def state(self) -> CircuitState:
+        with self.__lock:
+            self.__update_state(time.monotonic())
+            return self.__state
+
+    def before_call(self) -> None:
+        """
+        Проверка, можно ли сейчас отправить запрос.
+
+        :raise CircuitBreakerOpenException:
+            Если предохранитель разомкнут или все пробные запросы уже отправлены.
+        """
+
+        with self.__lock:
+            now = time.monotonic()
+            self.__update_state(now)
+
+            if self.__state == CircuitState.CLOSED:
+                return
+
+            if (
+                self.__state == CircuitState.HALF_OPEN
+                and self.__half_open_calls < self.__settings.half_open_max_calls
+            ):
+                self.__half_open_calls += 1
+                return
+
+            retry_after = max(
+                self.__opened_at + self.__settings.open_timeout - now, 0.0
+            )
+
+        raise CircuitBreakerOpenException(self.__host, retry_after)
+
+    def record(self, failed: bool, duration: float) -> None:
+        """
+        Учет результата запроса.
+
+        :param failed: Запрос завершился ошибкой соединения или ответом 5xx.
+        :param duration: Время выполнения запроса в секундах.
+        """
+
+        slow_call_duration = self.__settings.slow_call_duration
+        slow = slow_call_duration is not None and duration >= slow_call_duration
+
+        with self.__lock:
+            if self.__state == CircuitState.HALF_OPEN:
+                if failed or slow:
+                    self.__open(time.monotonic())
+                    return
+
+                self.__half_open_successes += 1
+                if self.__half_open_successes >= self.__settings.half_open_max_calls:
+                    self.__close()
+                return
+
+            if self.__state == CircuitState.OPEN:
+                # Запрос был отправлен до размыкания.
+                return
+
+            if len(self.__window) == self.__window.maxlen:
+                evicted_failed, evicted_slow = self.__window[0]
+                self.__failures -= evicted_failed
+                self.__slow_calls -= evicted_slow
+            self.__window.append((failed, slow))
+            self.__failures += failed
+            self.__slow_calls += slow
+
+            if self.__should_open():
+                self.__open(time.monotonic())
+
+    def cancel_call(self) -> None:
+        """
+        Отмена запроса, разрешенного `before_call`, без учета результата.
+
+        Нужна, если запрос прервался не ошибкой соединения и не ответом
+        (например, таймаутом задачи или прерыванием процесса): иначе занятое
+        место пробного запроса не освободится, и предохранитель навсегда
+        останется полуразомкнутым.
+        """
+
+        with self.__lock:
+            if self.__state == CircuitState.HALF_OPEN and self.__half_open_calls > 0:
+                self.__half_open_calls -= 1
+
+    def reset(self) -> None:
+        """Принудительное замыкание предохранителя"""
+
+        with self.__lock:
+            self.__close()
+
+    def __should_open(self) -> bool:
+        """Проверка порогов по окну запросов. Вызывать под блокировкой"""
+
+        calls = len(self.__window)
+        if calls < self.__settings.min_calls:
+            return False
+
+        return (
+            self.__failures / calls >= self.__settings.failure_rate_threshold
+            or self.__slow_calls / calls >= self.__settings.slow_call_rate_threshold
+        )
+
+    def __update_state(self, now: float) -> None:
+        """Переход в полуразомкнутое состояние по таймауту. Вызывать под блокировкой"""
+
+        if (
+            self.__state == CircuitState.OPEN
+            and now - self.__opened_at >= self.__settings.open_timeout
+        ):
+            self.__state = CircuitState.HALF_OPEN
+            self.__half_open_calls = 0
+            self.__half_open_successes = 0
+
+    def __open(self, now: float) -> None:
+        self.__state = CircuitState.OPEN
+        self.__opened_at = now
+
+    def __close(self) -> None:
+        self.__state = CircuitState.CLOSED
+        self.__window.clear()
+        self.__failures = 0
+        self.__slow_calls = 0
+
+
+class CircuitBreakerRegistry:
+    """
+    Реестр предохранителей по хостам.
+
+    Один реестр разделяется между клиентами и потоками процесса, тогда все
+    клиенты, обращающиеся к одному хосту, пользуются одним предохранителем.
+    """
+
+    def __init__(
+        self,
+        settings: CircuitBreakerSettings | None = None,
+        host_settings: dict[str, CircuitBreakerSettings] | None = None,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param settings: Настройки предохранителей по умолчанию.
+        :param host_settings: Настройки предохранителей отдельных хостов.
+        """
+
+        self.__settings = settings or CircuitBreakerSettings()
+        self.__host_settings = host_settings or {}
+
+        self.__breakers: dict[str, CircuitBreaker] = {}
+        self.__lock = threading.Lock()
+
+    def get(self, url: str) -> CircuitBreaker:
+        """
+        Получение предохранителя хоста.
+
+        :param url: URL-адрес или хост.
+
+        :return: Предохранитель хоста.
+        """
+
+        host = urlsplit(url).netloc or url
+
+        with self.__lock:
+            breaker = self.__breakers.get(host)
+            if breaker is None:
+                breaker = self.__breakers[host] = CircuitBreaker(
+                    host, self.__host_settings.get(host, self.__settings)
+                )
+
+            return breaker
+
+    def states(self) -> dict[str, CircuitState]:
+        """
+        Получение состояний предохранителей.
+
+        :return: Словарь "хост -> состояние предохранителя".
+        """
+
+        with self.__lock:
+            breakers = list(self.__breakers.values())
+
+        return {breaker.host: breaker.state for breaker in breakers}
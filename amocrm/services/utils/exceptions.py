@@ -0,0 +1,31 @@
+class CircuitBreakerOpenException(Exception):
+    """
+    Исключение при запросе к хосту, для которого разомкнут предохранитель.
+
+    Запрос при этом не отправляется. Вызывающий код может отложить работу
+    как минимум на `retry_after` секунд вместо того, чтобы ждать таймаутов.
+    """
+
+    def __init__(self, host: str, retry_after: float) -> None:
+        """Инициализатор класса"""
+
+        self.host = host
+        self.retry_after = retry_after
+        self.message = (
+            f"Хост {host} недоступен, запросы к нему приостановлены. "
+            f"Повторите через {retry_after:.1f} с"
+        )
+
+        super().__init__(self.message)
+
+
+class JSONSchemaException(ValueError):
+    """Исключение при разборе JSON, не соответствующего ожидаемой схеме"""
+
+    def __init__(self, message: str, path: str | None = None) -> None:
+        """Инициализатор класса"""
+
+        self.path = path
+        self.message = message if path is None else f"{message} - в `{path}`"
+
+        super().__init__(self.message)
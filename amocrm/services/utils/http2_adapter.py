@@ -0,0 +1,288 @@
+"""
+Транспорт `requests` с мультиплексированием запросов по HTTP/2.
+
+Требует установленного пакета `httpx` с поддержкой HTTP/2 (`httpx[http2]`).
+"""
+
+import socket
+import threading
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import (
+    BaseAdapter,
+    HTTPAdapter,
+)
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+if TYPE_CHECKING:
+    import httpx
+
+
+# Заголовки соединения HTTP/1.1, запрещенные в HTTP/2.
+_HOP_BY_HOP_HEADERS = frozenset(
+    ("connection", "keep-alive", "proxy-connection", "transfer-encoding", "upgrade")
+)
+# Методы, запросы которых можно безопасно повторить по HTTP/1.1.
+_IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+class HTTP2Adapter(BaseAdapter):
+    """
+    Транспорт `requests`, отправляющий запросы через `httpx` по HTTP/2.
+
+    Одновременные запросы к одному хосту мультиплексируются в одном
+    соединении, а не занимают по соединению из пула. Монтируется в сессию
+    как обычный транспорт, поэтому клиенты API работают с ним без изменений::
+
+        session.mount("https://", HTTP2Adapter())
+
+    Откат на HTTP/1.1:
+
+        1. По HTTPS протокол выбирается при установке соединения (ALPN):
+        если сервер не поддерживает HTTP/2, соединение работает по HTTP/1.1.
+        2. Если хост, еще не отвечавший по HTTP/2, ответил ошибкой протокола,
+        все следующие запросы к нему идут через обычный пул HTTP/1.1
+        `HTTPAdapter`. Оборвавшийся запрос повторяется через него же, если
+        метод идемпотентный, иначе завершается ошибкой соединения.
+
+    Ошибка протокола от хоста, уже отвечавшего по HTTP/2, означает сброс
+    отдельного потока (синхронный клиент `httpcore` при большом числе потоков
+    изредка отправляет заголовки потоков не по порядку). Такой запрос
+    идемпотентного метода один раз повторяется по HTTP/2.
+
+    По HTTP без TLS используется HTTP/1.1, если не включен `prior_knowledge`
+    (например, для локального сервера, заведомо поддерживающего HTTP/2).
+
+    Куки ответов в сессию не сохраняются: клиенты пакета ими не пользуются.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 10,
+        timeout: float | None = 30.0,
+        prior_knowledge: bool = False,
+        fallback: BaseAdapter | None = None,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param max_connections:
+            Максимальное количество соединений. По HTTP/2 на хост обычно
+            хватает одного соединения, остальные нужны для разных хостов.
+        :param timeout: Таймаут запроса по умолчанию в секундах.
+        :param prior_knowledge:
+            Использовать HTTP/2 без TLS, не согласовывая протокол.
+        :param fallback:
+            Транспорт HTTP/1.1 для хостов без HTTP/2. По умолчанию `HTTPAdapter`.
+
+        :raise ImportError: Если не установлен `httpx` или `h2`.
+        """
+
+        import h2  # noqa: F401 - без него httpx молча работает по HTTP/1.1
+        import httpx
+
+        super().__init__()
+
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self.__client: httpx.Client = httpx.Client(
+            transport=httpx.HTTPTransport(
+                http1=not prior_knowledge,
+                http2=True,
+                limits=limits,
+                # Кадры HTTP/2 мелкие: без этого алгоритм Нейгла вместе с
+                # отложенными ACK добавляет к запросам десятки миллисекунд.
+                socket_options=[(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)],
+            ),
+            timeout=timeout,
+            follow_redirects=False,
+        )
+        self.__fallback = fallback or HTTPAdapter(pool_maxsize=max_connections)
+
+        self.__lock = threading.Lock()
+        # Хосты, запросы к которым идут через транспорт HTTP/1.1.
+        self.__http1_hosts: set[str] = set()
+        # Хосты, уже ответившие по HTTP/2.
+        self.__http2_hosts: set[str] = set()
+        self.__responses_by_version: dict[str, int] = {}
+
+    @property
+    def responses_by_version(self) -> dict[str, int]:
+        """Количество ответов по версиям протокола, например `HTTP/2`"""
+
+        with self.__lock:
+            return dict(self.__responses_by_version)
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        stream: bool = False,
+        timeout: float | tuple[float | None, float | None] | None = None,
+        verify: bool | str = True,
+        cert: str | tuple[str, str] | None = None,
+        proxies: dict[str, str] | None = None,
+    ) -> requests.Response:
+        """
+        Отправка подготовленного запроса.
+
+        Параметры `verify`, `cert` и `proxies` задаются при создании
+        клиента `httpx` и на отдельные запросы не влияют. Тело ответа всегда
+        читается целиком, `stream` не поддерживается.
+
+        :raise requests.Timeout: Если истек таймаут.
+        :raise requests.ConnectionError: В случае ошибки соединения.
+        """
+
+        import httpx
+
+        url = request.url or ""
+        if isinstance(url, bytes):
+            url = url.decode()
+        host = urlsplit(url).netloc
+        if host in self.__http1_hosts:
+            return self.__fallback.send(request, stream, timeout, verify, cert, proxies)
+
+        headers = [
+            (name, value if isinstance(value, str) else value.decode("latin-1"))
+            for name, value in request.headers.items()
+            if name.lower() not in _HOP_BY_HOP_HEADERS
+        ]
+        content = self.__content(request.body)
+        retries = 1 if request.method in _IDEMPOTENT_METHODS else 0
+        while True:
+            try:
+                response = self.__client.request(
+                    method=request.method or "GET",
+                    url=url,
+                    headers=headers,
+                    content=content,
+                    **self.__timeout(timeout),
+                )
+                break
+            except httpx.TimeoutException as e:
+                raise requests.Timeout(e, request=request) from e
+            except (httpx.RemoteProtocolError, httpx.LocalProtocolError) as e:
+                if host in self.__http2_hosts:
+                    # Хост уже отвечал по HTTP/2, значит сброшен отдельный
+                    # поток, а не соединение: откатываться незачем.
+                    if retries > 0:
+                        retries -= 1
+                        continue
+                    raise requests.ConnectionError(e, request=request) from e
+
+                with self.__lock:
+                    self.__http1_hosts.add(host)
+                if request.method in _IDEMPOTENT_METHODS:
+                    return self.__fallback.send(
+                        request, stream, timeout, verify, cert, proxies
+                    )
+                raise requests.ConnectionError(e, request=request) from e
+            except httpx.TransportError as e:
+                raise requests.ConnectionError(e, request=request) from e
+
+        with self.__lock:
+            if response.http_version == "HTTP/2":
+                self.__http2_hosts.add(host)
+            self.__responses_by_version[response.http_version] = (
+                self.__responses_by_version.get(response.http_version, 0) + 1
+            )
+
+        return self.__build_response(request, response)
+
+    def close(self) -> None:
+        self.__client.close()
+        self.__fallback.close()
+
+    @staticmethod
+    def __timeout(
+        timeout: float | tuple[float | None, float | None] | None,
+    ) -> dict[str, Any]:
+        """Таймаут `requests` (число или пара "соединение, чтение") для `httpx`"""
+
+        import httpx
+
+        if timeout is None:
+            return {}
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return {"timeout": httpx.Timeout(read, connect=connect)}
+
+        return {"timeout": timeout}
+
+    @staticmethod
+    def __content(body: Any) -> bytes | str | None:
+        """
+        Тело запроса `requests` для `httpx`.
+
+        Клиенты пакета передают тело строкой или байтами. Файловые объекты и
+        итерируемые тела читаются целиком: `httpx` не принимает их в
+        синхронном клиенте в том же виде, что и `requests`.
+        """
+
+        if body is None or isinstance(body, (bytes, str)):
+            return body
+        if hasattr(body, "read"):
+            body = body.read()
+            return body if isinstance(body, (bytes, str)) else bytes(body)
+
+        return b"".join(
+            chunk.encode() if isinstance(chunk, str) else bytes(chunk) for chunk in body
+        )
+
+    def __build_response(
+        self, request: requests.PreparedRequest, response: "httpx.Response"
+    ) -> requests.Response:
+        """Ответ `requests` из ответа `httpx`"""
+
+        result = requests.Response()
+        result.status_code = response.status_code
+        result.headers = CaseInsensitiveDict(response.headers.items())
+        result.encoding = get_encoding_from_headers(result.headers)
+        result.reason = response.reason_phrase
+        result.url = request.url or ""
+        result.request = request
+        # В `requests` поле объявлено как `HTTPAdapter`, хотя используется только
+        # как транспорт, которым можно повторно отправить запрос (`send`).
+        result.connection = self  # type: ignore[assignment]
+        # Тело уже прочитано, сырого потока у ответа нет.
+        result._content = response.content
+        result._content_consumed = True
+
+        return result
+
+
+def create_http_adapter(
+    http2: bool = False,
+    max_connections: int = 10,
+    prior_knowledge: bool = False,
+) -> BaseAdapter:
+    """
+    Создание транспорта для сессии `requests`.
+
+    :param http2:
+        Использовать HTTP/2. Если `httpx` или `h2` не установлены,
+        используется обычный пул соединений HTTP/1.1.
+    :param max_connections: Размер пула соединений.
+    :param prior_knowledge: Использовать HTTP/2 без TLS, см. `HTTP2Adapter`.
+
+    :return: Транспорт.
+    """
+
+    if http2:
+        try:
+            return HTTP2Adapter(
+                max_connections=max_connections, prior_knowledge=prior_knowledge
+            )
+        except ImportError:
+            pass
+
+    return HTTPAdapter(pool_connections=2, pool_maxsize=max_connections)
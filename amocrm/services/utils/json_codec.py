@@ -0,0 +1,434 @@
+import os
+import re
+import json
+import types
+import threading
+import dataclasses
+from datetime import (
+    date,
+    datetime,
+)
+from abc import (
+    ABC,
+    abstractmethod,
+)
+from typing import (
+    Any,
+    Union,
+    TypeVar,
+    Callable,
+    ClassVar,
+    get_args,
+    get_origin,
+    get_type_hints,
+)
+
+from .exceptions import JSONSchemaException
+
+
+T = TypeVar("T")
+
+# Позиция ошибки в сообщении `msgspec.DecodeError`.
+_MSGSPEC_ERROR_POSITION_RE = re.compile(r"\(byte (\d+)\)")
+
+
+class JSONCodec(ABC):
+    """
+    Кодек JSON, используемый клиентами и сервисами.
+
+    Кроме разбора в словари и списки умеет разбирать данные сразу в типы:
+    dataclass-классы, `list[...]`, `dict[str, ...]` и их объединения с None.
+    """
+
+    # Имя кодека, по которому его можно выбрать в `get_json_codec`.
+    name: ClassVar[str]
+
+    @abstractmethod
+    def loads(self, data: bytes | str) -> Any:
+        """
+        Разбор JSON в словари и списки.
+
+        :param data: Данные в формате JSON.
+
+        :return: Разобранные данные.
+        """
+
+        raise NotImplementedError()
+
+    @abstractmethod
+    def dumps(self, obj: Any) -> bytes:
+        """
+        Сериализация данных в JSON.
+
+        :param obj: Данные.
+
+        :return: JSON в кодировке UTF-8.
+        """
+
+        raise NotImplementedError()
+
+    def decode(self, data: bytes | str, type_: type[T]) -> T:
+        """
+        Разбор JSON сразу в заданный тип.
+
+        Поля, которых нет в типе, отбрасываются, а типы остальных полей
+        проверяются.
+
+        :param data: Данные в формате JSON.
+        :param type_: Тип результата.
+
+        :raise JSONSchemaException: Если данные не соответствуют типу.
+
+        :return: Объект заданного типа.
+        """
+
+        return convert(self.loads(data), type_)
+
+
+class StdlibJSONCodec(JSONCodec):
+    """Кодек на стандартном модуле `json`"""
+
+    name = "stdlib"
+
+    def loads(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(
+            obj, ensure_ascii=False, separators=(",", ":"), default=self.__default
+        ).encode()
+
+    @staticmethod
+    def __default(obj: Any) -> Any:
+        """Сериализация даты и времени в ISO 8601, как у остальных кодеков"""
+
+        if isinstance(obj, (datetime, date)):
+            return obj.isoformat()
+
+        raise TypeError(f"Объект типа {type(obj).__name__} не сериализуется в JSON")
+
+
+class OrjsonJSONCodec(JSONCodec):
+    """Кодек на пакете `orjson`"""
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+
+        self.__orjson = orjson
+
+    def loads(self, data: bytes | str) -> Any:
+        return self.__orjson.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.__orjson.dumps(obj)
+
+
+class MsgspecJSONCodec(JSONCodec):
+    """
+    Кодек на пакете `msgspec`.
+
+    Разбирает данные в типы за один проход, без промежуточных словарей.
+    """
+
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        import msgspec
+
+        self.__msgspec = msgspec
+        self.__decoder = msgspec.json.Decoder()
+        self.__encoder = msgspec.json.Encoder()
+        self.__typed_decoders: dict[Any, Any] = {}
+
+    def loads(self, data: bytes | str) -> Any:
+        try:
+            return self.__decoder.decode(data)
+        except self.__msgspec.DecodeError as e:
+            raise self.__malformed(e, data) from e
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.__encoder.encode(obj)
+
+    def decode(self, data: bytes | str, type_: type[T]) -> T:
+        decoder = self.__typed_decoders.get(type_)
+        if decoder is None:
+            decoder = self.__typed_decoders[type_] = self.__msgspec.json.Decoder(type_)
+
+        try:
+            return decoder.decode(data)
+        except self.__msgspec.ValidationError as e:
+            raise JSONSchemaException(str(e)) from e
+        except self.__msgspec.DecodeError as e:
+            raise self.__malformed(e, data) from e
+
+    @staticmethod
+    def __malformed(error: Exception, data: bytes | str) -> json.JSONDecodeError:
+        """
+        Ошибка разбора некорректного JSON в том же виде, что у остальных кодеков.
+
+        :param error: Исключение `msgspec.DecodeError`.
+        :param data: Разбираемые данные.
+        """
+
+        document = data.decode(errors="replace") if isinstance(data, bytes) else data
+        position = _MSGSPEC_ERROR_POSITION_RE.search(str(error))
+        return json.JSONDecodeError(
+            str(error),
+            document,
+            # Без позиции ошибка в конце данных: они оборваны.
+            int(position.group(1)) if position is not None else len(document),
+        )
+
+
+# Кодеки в порядке предпочтения при автоматическом выборе.
+_CODEC_CLASSES: dict[str, type[JSONCodec]] = {
+    MsgspecJSONCodec.name: MsgspecJSONCodec,
+    OrjsonJSONCodec.name: OrjsonJSONCodec,
+    StdlibJSONCodec.name: StdlibJSONCodec,
+}
+
+_codecs: dict[str, JSONCodec] = {}
+_codecs_lock = threading.Lock()
+
+
+def get_json_codec(name: str | None = None) -> JSONCodec:
+    """
+    Получение кодека JSON.
+
+    :param name:
+        Имя кодека: `msgspec`, `orjson` или `stdlib`. Если None, берется из
+        переменной окружения `AMOCRM_JSON_CODEC`, а если и она не задана -
+        самый быстрый из установленных.
+
+    :raise ValueError: Если кодек с таким именем неизвестен.
+    :raise ImportError: Если пакет явно выбранного кодека не установлен.
+
+    :return: Объект кодека. Для одного имени всегда возвращается один объект.
+    """
+
+    name = name or os.environ.get("AMOCRM_JSON_CODEC") or "auto"
+
+    codec = _codecs.get(name)
+    if codec is not None:
+        return codec
+
+    with _codecs_lock:
+        codec = _codecs.get(name)
+        if codec is not None:
+            return codec
+
+        if name == "auto":
+            for codec_class in _CODEC_CLASSES.values():
+                try:
+                    codec = codec_class()
+                except ImportError:
+                    continue
+                break
+        else:
+            named_codec_class = _CODEC_CLASSES.get(name)
+            if named_codec_class is None:
+                raise ValueError(
+                    f"Неизвестный кодек JSON {name}, "
+                    f"доступны: {', '.join(_CODEC_CLASSES)}"
+                )
+            codec = named_codec_class()
+
+        assert codec is not None
+        _codecs[name] = codec
+
+    return codec
+
+
+def convert(obj: Any, type_: Any) -> Any:
+    """
+    Преобразование разобранного JSON в заданный тип с проверкой схемы.
+
+    Используется кодеками, которые не умеют разбирать JSON сразу в типы.
+    Для каждого типа один раз строится и кэшируется функция преобразования,
+    поэтому повторные вызовы не разбирают аннотации заново.
+
+    :param obj: Разобранные данные.
+    :param type_: Тип результата.
+
+    :raise JSONSchemaException: Если данные не соответствуют типу.
+
+    :return: Объект заданного типа.
+    """
+
+    try:
+        return _get_converter(type_)(obj)
+    except _ConversionError as e:
+        raise JSONSchemaException(e.message, "$" + "".join(reversed(e.path))) from None
+
+
+class _ConversionError(Exception):
+    """
+    Несоответствие данных типу внутри `convert`.
+
+    Путь к данным собирается при всплытии исключения, чтобы не строить его
+    для каждого поля при успешном разборе.
+    """
+
+    def __init__(self, message: str) -> None:
+        self.message = message
+        # Части пути от места ошибки к корню.
+        self.path: list[str] = []
+
+        super().__init__(message)
+
+
+_Converter = Callable[[Any], Any]
+
+_converters: dict[Any, _Converter] = {}
+# Построение вложенных типов рекурсивно берет ту же блокировку.
+_converters_lock = threading.RLock()
+
+
+def _get_converter(type_: Any) -> _Converter:
+    """Функция преобразования данных в тип, из кэша или построенная заново"""
+
+    converter = _converters.get(type_)
+    if converter is None:
+        with _converters_lock:
+            converter = _converters.get(type_)
+            if converter is None:
+                converter = _converters[type_] = _build_converter(type_)
+
+    return converter
+
+
+def _unexpected(expected: str, obj: Any) -> _ConversionError:
+    return _ConversionError(f"Ожидался {expected}, получен {type(obj).__name__}")
+
+
+def _build_converter(type_: Any) -> _Converter:
+    """Построение функции преобразования данных в тип"""
+
+    if type_ is Any:
+        return lambda obj: obj
+
+    # Сравниваются точные типы: JSON не порождает подклассов, а bool - подкласс
+    # int, хотя в JSON это разные типы.
+    if type_ in (str, int, bool):
+
+        def convert_primitive(obj: Any) -> Any:
+            if type(obj) is not type_:
+                raise _unexpected(type_.__name__, obj)
+            return obj
+
+        return convert_primitive
+
+    if type_ is float:
+
+        def convert_float(obj: Any) -> float:
+            if type(obj) is float:
+                return obj
+            if type(obj) is int:
+                return float(obj)
+            raise _unexpected("float", obj)
+
+        return convert_float
+
+    if isinstance(type_, type) and dataclasses.is_dataclass(type_):
+        return _build_dataclass_converter(type_)
+
+    origin = get_origin(type_)
+    if origin is list:
+        (item_type,) = get_args(type_)
+        convert_item = _get_converter(item_type)
+
+        def convert_list(obj: Any) -> list[Any]:
+            if type(obj) is not list:
+                raise _unexpected("массив", obj)
+            try:
+                return [convert_item(item) for item in obj]
+            except _ConversionError as e:
+                # Ошибки редки, индекс элемента ищется только при ошибке.
+                for index, item in enumerate(obj):
+                    try:
+                        convert_item(item)
+                    except _ConversionError:
+                        e.path.append(f"[{index}]")
+                        break
+                raise
+
+        return convert_list
+
+    if origin is dict:
+        _, value_type = get_args(type_)
+        convert_value = _get_converter(value_type)
+
+        def convert_dict(obj: Any) -> dict[str, Any]:
+            if type(obj) is not dict:
+                raise _unexpected("объект", obj)
+            result: dict[str, Any] = {}
+            for key, value in obj.items():
+                try:
+                    result[key] = convert_value(value)
+                except _ConversionError as e:
+                    e.path.append(f".{key}")
+                    raise
+            return result
+
+        return convert_dict
+
+    if origin is Union or origin is types.UnionType:
+        args = get_args(type_)
+        is_optional = type(None) in args
+        member_converters = [
+            _get_converter(arg) for arg in args if arg is not type(None)
+        ]
+
+        def convert_union(obj: Any) -> Any:
+            if obj is None and is_optional:
+                return None
+            error: _ConversionError | None = None
+            for convert_member in member_converters:
+                try:
+                    return convert_member(obj)
+                except _ConversionError as e:
+                    error = e
+            raise error or _unexpected(str(type_), obj)
+
+        return convert_union
+
+    # Прочие типы не проверяются.
+    return lambda obj: obj
+
+
+def _build_dataclass_converter(type_: type) -> _Converter:
+    """Построение функции преобразования объекта JSON в dataclass-класс"""
+
+    type_hints = get_type_hints(type_)
+    fields = [
+        (
+            field.name,
+            _get_converter(type_hints[field.name]),
+            field.default is dataclasses.MISSING
+            and field.default_factory is dataclasses.MISSING,
+        )
+        for field in dataclasses.fields(type_)
+        if field.init
+    ]
+
+    def convert_dataclass(obj: Any) -> Any:
+        if type(obj) is not dict:
+            raise _unexpected("объект", obj)
+
+        values: dict[str, Any] = {}
+        for field_name, convert_field, is_required in fields:
+            if field_name not in obj:
+                if is_required:
+                    raise _ConversionError(f"Нет обязательного поля `{field_name}`")
+                continue
+            try:
+                values[field_name] = convert_field(obj[field_name])
+            except _ConversionError as e:
+                e.path.append(f".{field_name}")
+                raise
+
+        return type_(**values)
+
+    return convert_dataclass
@@ -0,0 +1,75 @@
+import time
+import threading
+
+
+class RateLimiter:
+    """
+    Потокобезопасный ограничитель частоты запросов ("ведро токенов").
+
+    Один объект можно разделять между несколькими клиентами и потоками,
+    тогда ограничение будет общим для всех них. amoCRM, например, допускает
+    не более 7 запросов в секунду на интеграцию.
+    """
+
+    def __init__(self, rate: float, burst: int | None = None) -> None:
+        """
+        Инициализатор класса.
+
+        :param rate: Допустимое количество запросов в секунду.
+        :param burst:
+            Максимальное количество запросов, которые можно сделать подряд
+            без ожидания. По умолчанию равно `rate`, но не меньше 1.
+        """
+
+        if rate <= 0:
+            raise ValueError(f"Частота запросов должна быть больше 0, передано {rate}")
+
+        self.__rate = rate
+        self.__capacity = float(burst if burst is not None else max(int(rate), 1))
+        self.__tokens = self.__capacity
+        self.__updated_at = time.monotonic()
+        self.__lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self.__rate
+
+    def acquire(self) -> None:
+        """
+        Получение разрешения на один запрос.
+
+        Блокирует поток, пока запрос не станет допустимым. Порядок ожидающих
+        потоков сохраняется: каждый сразу резервирует себе место в очереди.
+        """
+
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(
+                self.__capacity,
+                self.__tokens + (now - self.__updated_at) * self.__rate,
+            )
+            self.__updated_at = now
+            self.__tokens -= 1
+            wait = -self.__tokens / self.__rate if self.__tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def try_acquire(self) -> bool:
+        """
+        Получение разрешения на один запрос без ожидания.
+
+        :return: True, если запрос можно делать сейчас, иначе False.
+        """
+
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(
+                self.__capacity,
+                self.__tokens + (now - self.__updated_at) * self.__rate,
+            )
+            self.__updated_at = now
+            if self.__tokens < 1:
+                return False
+            self.__tokens -= 1
+            return True
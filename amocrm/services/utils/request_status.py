@@ -13,4 +13,7 @@ class HTTPStatus(IntEnum):
 
     HTTP_401_UNAUTHORIZED = 401
     HTTP_403_FORBIDDEN = 403
+    HTTP_404_NOT_FOUND = 404
     HTTP_422_UNPROCESSABLE_ENTITY = 422
+
+    HTTP_500_INTERNAL_SERVER_ERROR = 500
@@ -0,0 +1,94 @@
+import threading
+from typing import (
+    Any,
+    Generic,
+    TypeVar,
+    Callable,
+    Hashable,
+)
+
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    """Выполняющийся вызов, результата которого ждут другие потоки"""
+
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: T | None = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Объединение одновременных одинаковых вызовов.
+
+    Пока вызов с некоторым ключом выполняется, потоки, вызвавшие `do` с тем же
+    ключом, не выполняют функцию сами, а ждут и получают тот же результат или
+    то же исключение. Результаты не кэшируются: после завершения вызова
+    следующий вызов с тем же ключом снова выполнит функцию.
+
+    Потокобезопасен. Один объект можно разделять между несколькими клиентами.
+    """
+
+    def __init__(self) -> None:
+        """Инициализатор класса"""
+
+        self.__calls: dict[Hashable, _Call[Any]] = {}
+        self.__lock = threading.Lock()
+        self.__coalesced = 0
+
+    @property
+    def coalesced(self) -> int:
+        """Количество вызовов, получивших результат чужого вызова"""
+
+        return self.__coalesced
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> tuple[T, bool]:
+        """
+        Выполнение функции или ожидание результата такого же вызова.
+
+        :param key: Ключ, по которому вызовы считаются одинаковыми.
+        :param func: Функция без аргументов.
+
+        :raise BaseException: Исключение, выброшенное функцией.
+
+        :return: Результат функции и признак того, что результат получили
+            несколько вызовов. Признак верен и для выполнившего функцию вызова:
+            по нему видно, что результат нельзя изменять.
+        """
+
+        with self.__lock:
+            call = self.__calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.__coalesced += 1
+                is_leader = False
+            else:
+                call = self.__calls[key] = _Call()
+                is_leader = True
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True  # type: ignore[return-value]
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # После удаления ключа новые вызовы уже не присоединятся к этому,
+            # поэтому количество ожидающих окончательно.
+            with self.__lock:
+                del self.__calls[key]
+                is_shared = call.waiters > 0
+            call.done.set()
+
+        return call.result, is_shared
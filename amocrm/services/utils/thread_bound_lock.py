@@ -0,0 +1,212 @@
+import asyncio
+from typing import (
+    Any,
+    TypeVar,
+    Callable,
+    Iterator,
+    AsyncIterator,
+)
+from contextlib import (
+    contextmanager,
+    asynccontextmanager,
+    AbstractContextManager,
+)
+from contextvars import ContextVar
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+)
+
+
+T = TypeVar("T")
+
+
+class ThreadBoundLock:
+    """
+    Блокировка, удерживаемая в собственном потоке.
+
+    Нужна для блокировок, привязанных к соединению с БД, которое принадлежит
+    потоку: транзакции с `SELECT ... FOR UPDATE` или `BEGIN IMMEDIATE`. Их
+    нельзя держать через `await` в асинхронной задаче, а в потоке с уже
+    открытой транзакцией они превращаются в точку сохранения, которая
+    фиксируется только вместе с внешней транзакцией.
+
+    Блокировка берется и отпускается в отдельном потоке со своим соединением,
+    и пока она удерживается, операции под ней (`call` и `acall`) выполняются в
+    том же потоке. Чей поток или задача держит блокировку, отслеживается через
+    `contextvars`, поэтому в остальных потоках и задачах `call` и `acall`
+    выполняют функции как обычно.
+    """
+
+    def __init__(
+        self,
+        lock_factory: Callable[[], AbstractContextManager[Any]],
+        cleanup: Callable[[], None] | None = None,
+        name: str = "lock",
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param lock_factory:
+            Фабрика контекстного менеджера блокировки. Менеджер входит и
+            выходит в потоке блокировки.
+        :param cleanup:
+            Функция, вызываемая в потоке блокировки перед его завершением,
+            например, для закрытия соединений потока с БД.
+        :param name: Имя для потока блокировки.
+        """
+
+        self.__lock_factory = lock_factory
+        self.__cleanup = cleanup
+        self.__name = name
+        self.__executor: ContextVar[ThreadPoolExecutor | None] = ContextVar(
+            f"thread_bound_lock_{name}_{id(self)}", default=None
+        )
+
+    @property
+    def is_held(self) -> bool:
+        """Удерживается ли блокировка текущим потоком или задачей"""
+
+        return self.__executor.get() is not None
+
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        """
+        Удержание блокировки из синхронного кода.
+
+        Повторный вход в потоке, уже держащем блокировку, ничего не делает.
+        """
+
+        if self.is_held:
+            yield
+            return
+
+        executor = self.__create_executor()
+        lock = self.__lock_factory()
+        entered = executor.submit(lock.__enter__)
+        try:
+            try:
+                entered.result()
+            except BaseException:
+                self.__release_if_entered(executor, entered, lock)
+                raise
+
+            token = self.__executor.set(executor)
+            try:
+                yield
+            except BaseException as error:
+                executor.submit(
+                    lock.__exit__, type(error), error, error.__traceback__
+                ).result()
+                raise
+            else:
+                executor.submit(lock.__exit__, None, None, None).result()
+            finally:
+                self.__executor.reset(token)
+        finally:
+            if self.__cleanup is not None:
+                executor.submit(self.__cleanup)
+            executor.shutdown(wait=False)
+
+    @asynccontextmanager
+    async def ahold(self) -> AsyncIterator[None]:
+        """
+        Удержание блокировки из асинхронного кода.
+
+        Цикл событий не блокируется, пока блокировка ожидается. Повторный
+        вход в задаче, уже держащей блокировку, ничего не делает.
+        """
+
+        if self.is_held:
+            yield
+            return
+
+        loop = asyncio.get_running_loop()
+        executor = self.__create_executor()
+        lock = self.__lock_factory()
+        entered = executor.submit(lock.__enter__)
+        try:
+            try:
+                await asyncio.wrap_future(entered)
+            except BaseException:
+                # Задачу могли отменить, пока поток брал блокировку.
+                self.__release_if_entered(executor, entered, lock)
+                raise
+
+            token = self.__executor.set(executor)
+            try:
+                yield
+            except BaseException as error:
+                await loop.run_in_executor(
+                    executor, lock.__exit__, type(error), error, error.__traceback__
+                )
+                raise
+            else:
+                await loop.run_in_executor(executor, lock.__exit__, None, None, None)
+            finally:
+                self.__executor.reset(token)
+        finally:
+            if self.__cleanup is not None:
+                executor.submit(self.__cleanup)
+            executor.shutdown(wait=False)
+
+    def call(self, function: Callable[..., T], *args: Any) -> T:
+        """
+        Вызов функции под блокировкой, если она удерживается.
+
+        :param function: Функция.
+        :param args: Аргументы функции.
+
+        :return: Результат функции.
+        """
+
+        executor = self.__executor.get()
+        if executor is None:
+            return function(*args)
+
+        return executor.submit(function, *args).result()
+
+    async def acall(self, function: Callable[..., T], *args: Any) -> T:
+        """
+        Вызов синхронной функции из асинхронного кода.
+
+        Если задача держит блокировку, функция выполняется в потоке
+        блокировки, иначе - в пуле потоков цикла событий.
+
+        :param function: Функция.
+        :param args: Аргументы функции.
+
+        :return: Результат функции.
+        """
+
+        executor = self.__executor.get()
+        if executor is None:
+            return await asyncio.to_thread(function, *args)
+
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, function, *args
+        )
+
+    def __create_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix=self.__name)
+
+    @staticmethod
+    def __release_if_entered(
+        executor: ThreadPoolExecutor,
+        entered: "Future[Any]",
+        lock: AbstractContextManager[Any],
+    ) -> None:
+        """
+        Отпускание блокировки, которую поток мог взять после отказа ее ждать.
+
+        Поток выполняет задачи по порядку, поэтому выход выполнится после входа.
+        """
+
+        if entered.cancel():
+            return
+
+        def release() -> None:
+            if entered.exception() is None:
+                lock.__exit__(None, None, None)
+
+        executor.submit(release)
@@ -0,0 +1,81 @@
+import time
+import threading
+from typing import (
+    Generic,
+    TypeVar,
+    Hashable,
+)
+from collections import OrderedDict
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Потокобезопасный кэш в памяти со временем жизни записей.
+
+    Количество записей ограничено: при переполнении вытесняются давно
+    не использованные записи (LRU).
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        """
+        Инициализатор класса.
+
+        :param maxsize: Максимальное количество записей.
+        :param ttl: Время жизни записи в секундах.
+        """
+
+        self.__maxsize = maxsize
+        self.__ttl = ttl
+        self.__data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        """
+        Получение значения по ключу.
+
+        :return: Значение или None, если записи нет или она устарела.
+        """
+
+        with self.__lock:
+            item = self.__data.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self.__data[key]
+                return None
+
+            self.__data.move_to_end(key)
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        """Сохранение значения по ключу"""
+
+        with self.__lock:
+            self.__data[key] = (time.monotonic() + self.__ttl, value)
+            self.__data.move_to_end(key)
+            while len(self.__data) > self.__maxsize:
+                self.__data.popitem(last=False)
+
+    def pop(self, key: K) -> V | None:
+        """Удаление записи по ключу"""
+
+        with self.__lock:
+            item = self.__data.pop(key, None)
+
+        return item[1] if item is not None else None
+
+    def clear(self) -> None:
+        """Удаление всех записей"""
+
+        with self.__lock:
+            self.__data.clear()
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__data)
@@ -0,0 +1,55 @@
+"""
+Этот модуль предоставляет журнал шагов обработки контактов, реализующий
+интерфейс `IContactStepJournal` на модели Django `AmoCRMContactStep`.
+
+Шаги хранятся в общей БД, поэтому повтор задачи любым воркером видит шаги,
+выполненные при предыдущей попытке.
+
+Модели импортируются в методах, а не при импорте модуля, как и в
+`tokens_managers`.
+"""
+
+from .services.planning.action_plan import AmoCRMOperationType
+from .services.journal.interfaces.contact_step_journal import IContactStepJournal
+
+
+class AmoCRMContactStepJournal(IContactStepJournal):
+    """Журнал шагов обработки контактов в БД"""
+
+    def get_completed_steps(
+        self, contact_id: int
+    ) -> set[tuple[str, AmoCRMOperationType]]:
+        from .models import AmoCRMContactStep
+
+        return {
+            (chat_id, AmoCRMOperationType(step))
+            for chat_id, step in AmoCRMContactStep.objects.filter(
+                contact_id=contact_id
+            ).values_list("chat_id", "step")
+        }
+
+    def mark_completed(
+        self,
+        contact_id: int,
+        chat_id: str,
+        steps: list[AmoCRMOperationType],
+    ) -> None:
+        from .models import AmoCRMContactStep
+
+        AmoCRMContactStep.objects.bulk_create(
+            [
+                AmoCRMContactStep(contact_id=contact_id, chat_id=chat_id, step=step)
+                for step in steps
+            ],
+            ignore_conflicts=True,
+        )
+
+    def clear(self, contact_id: int) -> None:
+        from .models import AmoCRMContactStep
+
+        AmoCRMContactStep.objects.filter(contact_id=contact_id).delete()
+
+    def clear_many(self, contact_ids: list[int]) -> None:
+        from .models import AmoCRMContactStep
+
+        AmoCRMContactStep.objects.filter(contact_id__in=contact_ids).delete()
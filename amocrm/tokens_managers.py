@@ -1,5 +1,6 @@
 """
-Этот модуль предоставляет классы, реализующие интерфейс `ITokenManaged`.
+Этот модуль предоставляет классы, реализующие интерфейсы `ITokenManaged`
+и `IAsyncTokenManaged`.
 
 Эти классы нужны, чтобы не привязывать модуль для работы с amoCRM к
 фреймворку Django, а именно - к моделям Django.
@@ -11,49 +12,217 @@
 Интерфейс `ITokenManaged` позволяет нам самим определять правила, по
 которым классы-клиенты будут получать и сохранять токены доступа.
 Это может быть файл, другой объект или же база данных.
+
+Модели импортируются в методах, а не при импорте модуля: так модуль можно
+импортировать до готовности реестра приложений Django, а процессы, которым
+токены из БД не нужны, не загружают ORM.
 """
 
+from typing import (
+    Iterator,
+    AsyncIterator,
+)
+from contextlib import (
+    contextmanager,
+    asynccontextmanager,
+    AbstractContextManager,
+)
+
 from .services.tokens import Tokens
+from .services.utils.thread_bound_lock import ThreadBoundLock
 from .services.tokens.interfaces.token_managed import ITokenManaged
+from .services.tokens.interfaces.async_token_managed import IAsyncTokenManaged
+
+
+@contextmanager
+def _lock_tokens_row(manager_name: str) -> Iterator[None]:
+    """
+    Транзакция с блокировкой строки токенов менеджера.
+
+    Если строки еще нет (токены не получены ни разу), блокировать нечего, и
+    первое получение токенов по авторизационному коду не сериализуется.
+    """
+
+    from django.db import transaction
+
+    from .models import AmoCRMTokens
+
+    with transaction.atomic():
+        AmoCRMTokens.objects.select_for_update().filter(
+            manager_name=manager_name
+        ).first()
+        yield
+
+
+def _close_db_connections() -> None:
+    """Закрытие соединений с БД текущего потока"""
 
-from .models import AmoCRMTokens
+    from django.db import connections
+
+    connections.close_all()
+
+
+def _create_refresh_lock(manager_name: str) -> ThreadBoundLock:
+    """
+    Блокировка обновления токенов менеджера.
+
+    Транзакция блокировки открывается в отдельном потоке со своим соединением
+    с БД. Иначе при обновлении токенов внутри чужой транзакции (например,
+    транзакции обработки канала) `transaction.atomic()` открыл бы лишь точку
+    сохранения: блокировка строки и новые токены оставались бы
+    незафиксированными до конца внешней транзакции, остальные воркеры ждали бы
+    все это время, а ее откат потерял бы токены, хотя старый refresh-токен
+    уже израсходован.
+    """
+
+    return ThreadBoundLock(
+        lambda: _lock_tokens_row(manager_name),
+        cleanup=_close_db_connections,
+        name="amocrm-tokens-lock",
+    )
 
 
 class AmoCRMTokensManager(ITokenManaged):
     """Класс для управления токенами для AmoCRM"""
 
-    def __init__(self, name: str) -> None:
+    def __init__(self, name: str, account_id: str | None = None) -> None:
         """
         Инициализатор класса.
 
         :param name: Уникальное название менеджера.
+        :param account_id:
+            ID аккаунта amoCRM. Нужен, когда один проект работает с несколькими
+            аккаунтами: токены разных аккаунтов хранятся под разными именами
+            вида `<account_id>:<name>`.
         """
 
-        self.__name = name
+        self.__name = name if account_id is None else f"{account_id}:{name}"
+        self.__refresh_lock = _create_refresh_lock(self.__name)
 
     @property
     def name(self) -> str:
         return self.__name
 
-    def get_tokens(self) -> Tokens | None:  # type: ignore[return]
+    def get_tokens(self) -> Tokens | None:
         """
         Получение токенов доступа из БД.
 
         :return: Объект с токенами доступа.
         """
 
+        return self.__refresh_lock.call(self.__get_tokens)
+
+    def save_tokens(self, tokens: Tokens) -> Tokens:
+        """
+        Сохранение токенов доступа в БД.
+
+        :param tokens: Объект с новыми токенами доступа.
+        """
+
+        return self.__refresh_lock.call(self.__save_tokens, tokens)
+
+    def refresh_lock(self) -> AbstractContextManager[None]:
+        """
+        Блокировка строки токенов на время их обновления.
+
+        Открывает транзакцию и блокирует строку менеджера через
+        `select_for_update()`: остальные процессы ждут на этой же строке, пока
+        транзакция не завершится, и затем читают уже обновленные токены.
+        Транзакция держится в отдельном потоке со своим соединением, поэтому
+        не зависит от транзакции вызывающего кода. Чтение и сохранение токенов
+        под блокировкой выполняются в этой транзакции, поэтому новые токены
+        фиксируются при выходе из блока, а при ошибке обновления транзакция
+        откатывается.
+
+        :return: Контекстный менеджер блокировки.
+        """
+
+        return self.__refresh_lock.hold()
+
+    def __get_tokens(self) -> Tokens | None:  # type: ignore[return]
+        from .models import AmoCRMTokens
+
         tokens_model = AmoCRMTokens.objects.filter(manager_name=self.name).first()
         if tokens_model is not None:
             return Tokens(tokens_model.access_token, tokens_model.refresh_token)
 
-    def save_tokens(self, tokens: Tokens) -> Tokens:
+    def __save_tokens(self, tokens: Tokens) -> Tokens:
+        from .models import AmoCRMTokens
+
+        tokens_model, _ = AmoCRMTokens.objects.update_or_create(
+            manager_name=self.name,
+            defaults={
+                "access_token": tokens.access_token,
+                "refresh_token": tokens.refresh_token,
+            },
+        )
+
+        return Tokens(tokens_model.access_token, tokens_model.refresh_token)
+
+
+class AsyncAmoCRMTokensManager(IAsyncTokenManaged):
+    """
+    Асинхронный менеджер токенов для AmoCRM.
+
+    Использует асинхронный интерфейс ORM Django, поэтому запросы к БД не
+    блокируют цикл событий. Хранит токены в той же модели и под теми же
+    именами, что и `AmoCRMTokensManager`, поэтому синхронные и асинхронные
+    клиенты разных воркеров видят одни и те же токены.
+
+    Транзакции асинхронный ORM Django не поддерживает, поэтому блокировка
+    обновления держится в отдельном потоке со своим соединением с БД, как и у
+    `AmoCRMTokensManager`.
+    """
+
+    def __init__(self, name: str, account_id: str | None = None) -> None:
+        """
+        Инициализатор класса.
+
+        :param name: Уникальное название менеджера.
+        :param account_id: ID аккаунта amoCRM (см. `AmoCRMTokensManager`).
+        """
+
+        self.__name = name if account_id is None else f"{account_id}:{name}"
+        self.__sync_manager = AmoCRMTokensManager(self.__name)
+        self.__refresh_lock = _create_refresh_lock(self.__name)
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    async def get_tokens(self) -> Tokens | None:  # type: ignore[return]
+        """
+        Получение токенов доступа из БД.
+
+        :return: Объект с токенами доступа.
+        """
+
+        if self.__refresh_lock.is_held:
+            return await self.__refresh_lock.acall(self.__sync_manager.get_tokens)
+
+        from .models import AmoCRMTokens
+
+        tokens_model = await AmoCRMTokens.objects.filter(
+            manager_name=self.name
+        ).afirst()
+        if tokens_model is not None:
+            return Tokens(tokens_model.access_token, tokens_model.refresh_token)
+
+    async def save_tokens(self, tokens: Tokens) -> Tokens:
         """
         Сохранение токенов доступа в БД.
 
         :param tokens: Объект с новыми токенами доступа.
         """
 
-        tokens_model, _ = AmoCRMTokens.objects.update_or_create(
+        if self.__refresh_lock.is_held:
+            return await self.__refresh_lock.acall(
+                self.__sync_manager.save_tokens, tokens
+            )
+
+        from .models import AmoCRMTokens
+
+        tokens_model, _ = await AmoCRMTokens.objects.aupdate_or_create(
             manager_name=self.name,
             defaults={
                 "access_token": tokens.access_token,
@@ -62,3 +231,21 @@ class AmoCRMTokensManager(ITokenManaged):
         )
 
         return Tokens(tokens_model.access_token, tokens_model.refresh_token)
+
+    @asynccontextmanager
+    async def refresh_lock(self) -> AsyncIterator[None]:
+        """
+        Блокировка строки токенов на время их обновления.
+
+        Транзакция с `select_for_update()` (см. `AmoCRMTokensManager.refresh_lock`)
+        открывается в отдельном потоке, и пока блокировка удерживается,
+        `get_tokens` и `save_tokens` этой задачи выполняются в том же потоке и
+        той же транзакции. Иначе сохранение из другого соединения ждало бы
+        блокировку, которую держит сама задача. Цикл событий при ожидании
+        блокировки не блокируется.
+
+        :return: Асинхронный контекстный менеджер блокировки.
+        """
+
+        async with self.__refresh_lock.ahold():
+            yield
@@ -0,0 +1,664 @@
+"""
+Локальная замена серверов amoCRM и amojo для бенчмарков.
+
+Эмулирует ровно те эндпоинты, которыми пользуются сервисы пакета, с
+настраиваемыми задержками, ограничением частоты запросов, внедрением ошибок
+и синтетическими чатами произвольного размера. Данные генерируются
+детерминированно из ID контакта, поэтому память сервера не растет с размером
+чатов.
+
+Логика ответов вынесена в `FakeAmoCRMBackend`, не зависящий от HTTP-сервера,
+а `FakeAmoCRMServer` поднимает ее на `ThreadingHTTPServer` в отдельном потоке.
+С `http2=True` сервер вместо HTTP/1.1 говорит на HTTP/2 без TLS с заранее
+известным протоколом (h2c), для этого нужен пакет `h2`.
+"""
+
+import re
+import json
+import zlib
+import time
+import socket
+import random
+import threading
+import socketserver
+from typing import Any
+from dataclasses import (
+    field,
+    dataclass,
+)
+from urllib.parse import (
+    parse_qs,
+    urlsplit,
+)
+from http.server import (
+    ThreadingHTTPServer,
+    BaseHTTPRequestHandler,
+)
+
+
+@dataclass
+class FakeServerConfig:
+    """Настройки поведения локального сервера"""
+
+    # Количество контактов в аккаунте. ID контактов: 1..contacts_count.
+    contacts_count: int = 1000
+    # Источники каналов связи, которые раздаются каналам контакта по кругу.
+    origins: tuple[str, ...] = ("whatsapp", "viber", "telegram")
+    # Количество каналов связи у каждого контакта.
+    channels_per_contact: int = 4
+    # Количество сообщений в каждом чате.
+    messages_per_chat: int = 250
+    # Количество бесед в каждом чате, из них `open_talks_per_chat` открытых.
+    talks_per_chat: int = 3
+    open_talks_per_chat: int = 1
+    # Объем "мусорной" разметки страницы сделки в КБ, чтобы она была похожа
+    # на настоящую по весу.
+    lead_page_padding_kb: int = 200
+
+    # Базовая задержка ответа и ее случайный разброс в секундах.
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    # Задержки для отдельных эндпоинтов (по имени из `FakeAmoCRMBackend.ROUTES`).
+    endpoint_latency: dict[str, float] = field(default_factory=dict)
+
+    # Ограничение частоты запросов в секунду. 0 - без ограничения.
+    # При превышении сервер отвечает 429.
+    rate_limit: float = 0.0
+    # Доля ответов с ошибкой 500 от 0 до 1.
+    error_rate: float = 0.0
+    # Доли ошибок для отдельных эндпоинтов.
+    endpoint_error_rate: dict[str, float] = field(default_factory=dict)
+
+    seed: int = 0
+
+
+class _TokenBucket:
+    """Потокобезопасное "ведро токенов" для ограничения частоты запросов"""
+
+    def __init__(self, rate: float) -> None:
+        self.__rate = rate
+        self.__capacity = max(rate, 1.0)
+        self.__tokens = self.__capacity
+        self.__updated_at = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(
+                self.__capacity,
+                self.__tokens + (now - self.__updated_at) * self.__rate,
+            )
+            self.__updated_at = now
+            if self.__tokens < 1:
+                return False
+            self.__tokens -= 1
+            return True
+
+
+@dataclass
+class FakeResponse:
+    """Ответ локального сервера"""
+
+    status: int
+    body: bytes = b""
+    content_type: str = "application/json"
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+def _parse_body(content_type: str, raw_body: str) -> dict[str, list[str]]:
+    """Разбор тела запроса: JSON или form-urlencoded"""
+
+    if content_type.startswith("application/json"):
+        return {
+            key: [str(value)] for key, value in json.loads(raw_body or "{}").items()
+        }
+
+    return parse_qs(raw_body)
+
+
+class FakeAmoCRMBackend:
+    """Логика ответов локального сервера, не зависящая от транспорта"""
+
+    AMOJO_ID = "fake-amojo-id"
+
+    ROUTES: tuple[tuple[str, str, re.Pattern[str]], ...] = (
+        ("oauth", "POST", re.compile(r"^/oauth2/access_token$")),
+        ("account", "GET", re.compile(r"^/api/v4/account$")),
+        ("contacts", "GET", re.compile(r"^/api/v4/contacts$")),
+        (
+            "contact_detail",
+            "GET",
+            re.compile(r"^/api/v4/contacts/(?P<contact_id>\d+)$"),
+        ),
+        ("amojo_session", "POST", re.compile(r"^/ajax/v1/chats/session$")),
+        ("talks", "GET", re.compile(r"^/ajax/v2/talks$")),
+        ("close_talk", "POST", re.compile(r"^/api/v4/talks/(?P<talk_id>\d+)/close$")),
+        ("unlink", "POST", re.compile(r"^/ajax/v2/profiles/unlink$")),
+        ("lead_detail", "GET", re.compile(r"^/leads/detail/(?P<lead_id>\d+)$")),
+        ("messages", "GET", re.compile(r"^/messages/(?P<amojo_id>[^/]+)/merge$")),
+    )
+
+    def __init__(self, config: FakeServerConfig | None = None) -> None:
+        """
+        Инициализатор класса.
+
+        :param config: Настройки поведения сервера.
+        """
+
+        self.config = config or FakeServerConfig()
+
+        self.__random = random.Random(self.config.seed)
+        self.__random_lock = threading.Lock()
+        self.__rate_limiter = (
+            _TokenBucket(self.config.rate_limit) if self.config.rate_limit > 0 else None
+        )
+
+        # Изменяемое состояние: открепленные профили и закрытые беседы.
+        self.__state_lock = threading.Lock()
+        self.__unlinked_profiles: set[int] = set()
+        self.__closed_talks: set[int] = set()
+
+        self.__requests_count: dict[str, int] = {}
+
+    @property
+    def requests_count(self) -> dict[str, int]:
+        with self.__state_lock:
+            return dict(self.__requests_count)
+
+    def reset(self) -> None:
+        """Сброс изменяемого состояния и счетчиков"""
+
+        with self.__state_lock:
+            self.__unlinked_profiles.clear()
+            self.__closed_talks.clear()
+            self.__requests_count.clear()
+
+    def handle(
+        self,
+        method: str,
+        path: str,
+        query: dict[str, list[str]],
+        body: dict[str, list[str]],
+    ) -> FakeResponse:
+        """
+        Обработка запроса.
+
+        :param method: HTTP-метод.
+        :param path: Путь запроса без GET-параметров.
+        :param query: GET-параметры.
+        :param body: Разобранное form-urlencoded тело запроса.
+
+        :return: Ответ сервера.
+        """
+
+        for name, route_method, pattern in self.ROUTES:
+            match = pattern.match(path)
+            if match is not None and route_method == method.upper():
+                break
+        else:
+            return self.__json(404, {"detail": f"{method} {path} не найден"})
+
+        with self.__state_lock:
+            self.__requests_count[name] = self.__requests_count.get(name, 0) + 1
+
+        if self.__rate_limiter is not None and not self.__rate_limiter.try_acquire():
+            return FakeResponse(status=429, headers={"Retry-After": "1"})
+
+        self.__sleep(name)
+
+        error_rate = self.config.endpoint_error_rate.get(name, self.config.error_rate)
+        if error_rate > 0 and self.__random_value() < error_rate:
+            return self.__json(500, {"detail": "Внедренная ошибка"})
+
+        handler = getattr(self, f"_handle_{name}")
+        return handler(query=query, body=body, **match.groupdict())
+
+    # Генерация данных.
+
+    def channels(self, contact_id: int) -> list[dict[str, Any]]:
+        """Каналы связи контакта, которые еще не откреплены"""
+
+        origins = self.config.origins
+        channels = []
+        for i in range(self.config.channels_per_contact):
+            profile_id = contact_id * 1000 + i
+            if profile_id in self.__unlinked_profiles:
+                continue
+            channels.append(
+                {
+                    "origin": origins[i % len(origins)],
+                    "chat_id": f"chat-{contact_id}-{i}",
+                    "profile_id": profile_id,
+                }
+            )
+
+        return channels
+
+    def _message(self, chat_id: str, index: int) -> dict[str, Any]:
+        return {
+            "id": f"{chat_id}-msg-{index}",
+            "chat_id": chat_id,
+            "created_at": 1_600_000_000 + index * 60,
+            "text": f"Сообщение {index} из чата {chat_id}",
+            "author": {"full_name": "Менеджер" if index % 2 else "Клиент"},
+            "recipient": {
+                "full_name": "Клиент" if index % 2 else "Менеджер",
+                "origin_profile": json.dumps({"profile": {"phone": "+70000000000"}}),
+            },
+            "message": {"media": ""},
+        }
+
+    def _contact(self, contact_id: int) -> dict[str, Any]:
+        return {
+            "id": contact_id,
+            "name": f"Контакт {contact_id}",
+            "updated_at": 1_600_000_000 + contact_id,
+            "_embedded": {"leads": [{"id": contact_id * 10}]},
+        }
+
+    # Обработчики эндпоинтов.
+
+    def _handle_oauth(self, **_: Any) -> FakeResponse:
+        return self.__json(
+            200, {"access_token": "fake-access", "refresh_token": "fake-refresh"}
+        )
+
+    def _handle_account(self, **_: Any) -> FakeResponse:
+        return self.__json(200, {"id": 1, "amojo_id": self.AMOJO_ID})
+
+    def _handle_amojo_session(self, **_: Any) -> FakeResponse:
+        session = {"access_token": "fake-amojo", "refresh_token": "fake-amojo"}
+        return self.__json(200, {"response": {"chats": {"session": session}}})
+
+    def _handle_contacts(self, query: dict[str, list[str]], **_: Any) -> FakeResponse:
+        ids = [int(value) for value in query.get("filter[id][]", [])]
+        contacts = [
+            self._contact(contact_id)
+            for contact_id in ids
+            if 1 <= contact_id <= self.config.contacts_count
+        ]
+        if len(contacts) == 0:
+            return FakeResponse(status=204)
+
+        return self.__json(200, {"_embedded": {"contacts": contacts}})
+
+    def _handle_contact_detail(self, contact_id: str, **_: Any) -> FakeResponse:
+        if not 1 <= int(contact_id) <= self.config.contacts_count:
+            return self.__json(404, {"detail": "Контакт не найден"})
+
+        return self.__json(200, self._contact(int(contact_id)))
+
+    def _handle_lead_detail(self, lead_id: str, **_: Any) -> FakeResponse:
+        contact_id = int(lead_id) // 10
+        parts = ["<html><body><div class='card'>"]
+        with self.__state_lock:
+            channels = self.channels(contact_id)
+        for channel in channels:
+            parts.append(
+                f'<div class="profile_messengers-item" data-entity="{contact_id}">'
+                f'<span data-type="send_message" data-chat-id="{channel["chat_id"]}" '
+                f'data-origin="{channel["origin"]}"></span>'
+                f'<span data-type="unlink_profile" data-value="{channel["profile_id"]}">'
+                f"</span></div>"
+            )
+        padding = "<div class='feed-note'>" + "x" * 1018 + "</div>"
+        parts.extend(padding for _ in range(self.config.lead_page_padding_kb))
+        parts.append("</div></body></html>")
+
+        return FakeResponse(
+            status=200,
+            body="".join(parts).encode(),
+            content_type="text/html; charset=utf-8",
+        )
+
+    def _handle_talks(self, query: dict[str, list[str]], **_: Any) -> FakeResponse:
+        result: dict[str, list[dict[str, Any]]] = {}
+        for chat_id in query.get("chats_ids[]", []):
+            base = zlib.crc32(chat_id.encode()) % 1_000_000 * 100
+            talks = []
+            for i in range(self.config.talks_per_chat):
+                talk_id = base + i
+                with self.__state_lock:
+                    is_closed = talk_id in self.__closed_talks
+                is_open = (
+                    i >= self.config.talks_per_chat - self.config.open_talks_per_chat
+                    and not is_closed
+                )
+                talks.append(
+                    {
+                        "talk_id": talk_id,
+                        "chat_id": chat_id,
+                        "status": 0 if is_open else 1,
+                    }
+                )
+            result[chat_id] = talks
+
+        return self.__json(200, result)
+
+    def _handle_close_talk(self, talk_id: str, **_: Any) -> FakeResponse:
+        with self.__state_lock:
+            if int(talk_id) in self.__closed_talks:
+                return self.__json(422, {"detail": "Беседа уже закрыта"})
+            self.__closed_talks.add(int(talk_id))
+
+        return FakeResponse(status=202)
+
+    def _handle_unlink(self, body: dict[str, list[str]], **_: Any) -> FakeResponse:
+        profile_id = int(body.get("profile_id", ["0"])[0])
+        with self.__state_lock:
+            if profile_id in self.__unlinked_profiles:
+                return self.__json(404, {"detail": "Профиль не найден"})
+            self.__unlinked_profiles.add(profile_id)
+
+        return self.__json(200, {"status": "ok"})
+
+    def _handle_messages(
+        self, query: dict[str, list[str]], amojo_id: str, **_: Any
+    ) -> FakeResponse:
+        if amojo_id != self.AMOJO_ID:
+            return self.__json(404, {"detail": "Аккаунт не найден"})
+
+        chat_id = query.get("chat_id[]", [""])[0]
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", ["100"])[0])
+        end = min(offset + limit, self.config.messages_per_chat)
+        if offset >= end:
+            return FakeResponse(status=204)
+
+        return self.__json(
+            200, [self._message(chat_id, index) for index in range(offset, end)]
+        )
+
+    # Вспомогательные методы.
+
+    def __sleep(self, route_name: str) -> None:
+        latency = self.config.endpoint_latency.get(route_name, self.config.latency)
+        if self.config.latency_jitter > 0:
+            latency += self.__random_value() * self.config.latency_jitter
+        if latency > 0:
+            time.sleep(latency)
+
+    def __random_value(self) -> float:
+        with self.__random_lock:
+            return self.__random.random()
+
+    @staticmethod
+    def __json(status: int, data: Any) -> FakeResponse:
+        return FakeResponse(status=status, body=json.dumps(data).encode())
+
+
+class _FakeRequestHandler(BaseHTTPRequestHandler):
+    """Адаптер `FakeAmoCRMBackend` к `http.server`"""
+
+    protocol_version = "HTTP/1.1"
+    # Заголовки и тело пишутся отдельно, без этого Nagle и отложенные ACK
+    # добавляют к каждому ответу ~40 мс.
+    disable_nagle_algorithm = True
+    backend: FakeAmoCRMBackend
+
+    def do_GET(self) -> None:
+        self.__dispatch()
+
+    def do_POST(self) -> None:
+        self.__dispatch()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def __dispatch(self) -> None:
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length).decode() if length > 0 else ""
+
+        response = self.backend.handle(
+            method=self.command,
+            path=url.path,
+            query=parse_qs(url.query),
+            body=_parse_body(self.headers.get("Content-Type", ""), raw_body),
+        )
+
+        self.send_response(response.status)
+        self.send_header("Content-Type", response.content_type)
+        self.send_header("Content-Length", str(len(response.body)))
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(response.body)
+
+
+class _FakeHTTP2Handler(socketserver.BaseRequestHandler):
+    """
+    Соединение HTTP/2 без TLS.
+
+    Каждый запрос обрабатывается в своем потоке, поэтому медленные ответы
+    одного соединения не задерживают остальные его запросы. Ответы
+    отправляются с учетом окон управления потоком HTTP/2.
+    """
+
+    backend: FakeAmoCRMBackend
+
+    def handle(self) -> None:
+        import h2.events
+        import h2.config
+        import h2.connection
+
+        sock: socket.socket = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self.__connection = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        # Защищает соединение и сокет, по ней же ответы ждут окон отправки.
+        self.__condition = threading.Condition()
+        self.__closed = False
+
+        with self.__condition:
+            self.__connection.initiate_connection()
+            sock.sendall(self.__connection.data_to_send())
+
+        # Заголовки и тело еще не завершенных запросов по ID потока.
+        requests: dict[int, tuple[dict[str, str], bytearray]] = {}
+        try:
+            while not self.__closed:
+                data = sock.recv(1 << 16)
+                if not data:
+                    break
+
+                with self.__condition:
+                    for event in self.__connection.receive_data(data):
+                        if isinstance(event, h2.events.RequestReceived):
+                            requests[event.stream_id] = (
+                                dict(event.headers),  # type: ignore[arg-type]
+                                bytearray(),
+                            )
+                        elif isinstance(event, h2.events.DataReceived):
+                            requests[event.stream_id][1].extend(event.data)
+                            self.__connection.acknowledge_received_data(
+                                event.flow_controlled_length, event.stream_id
+                            )
+                        elif isinstance(event, h2.events.StreamEnded):
+                            headers, body = requests.pop(event.stream_id)
+                            threading.Thread(
+                                target=self.__respond,
+                                args=(event.stream_id, headers, bytes(body)),
+                                daemon=True,
+                            ).start()
+                        elif isinstance(event, h2.events.StreamReset):
+                            requests.pop(event.stream_id, None)
+                        elif isinstance(event, h2.events.ConnectionTerminated):
+                            self.__closed = True
+                    # Окна отправки могли увеличиться.
+                    self.__condition.notify_all()
+                    sock.sendall(self.__connection.data_to_send())
+        except OSError:
+            pass
+        finally:
+            with self.__condition:
+                self.__closed = True
+                self.__condition.notify_all()
+
+    def __respond(self, stream_id: int, headers: dict[str, str], body: bytes) -> None:
+        import h2.exceptions
+
+        url = urlsplit(headers.get(":path", "/"))
+        response = self.backend.handle(
+            method=headers.get(":method", "GET"),
+            path=url.path,
+            query=parse_qs(url.query),
+            body=_parse_body(headers.get("content-type", ""), body.decode()),
+        )
+
+        sock: socket.socket = self.request
+        connection = self.__connection
+        try:
+            with self.__condition:
+                connection.send_headers(
+                    stream_id,
+                    [
+                        (":status", str(response.status)),
+                        ("content-type", response.content_type),
+                        ("content-length", str(len(response.body))),
+                        *(
+                            (name.lower(), value)
+                            for name, value in response.headers.items()
+                        ),
+                    ],
+                    end_stream=len(response.body) == 0,
+                )
+                sock.sendall(connection.data_to_send())
+
+            offset = 0
+            while offset < len(response.body):
+                with self.__condition:
+                    while not self.__closed:
+                        window = min(
+                            connection.local_flow_control_window(stream_id),
+                            connection.max_outbound_frame_size,
+                        )
+                        if window > 0:
+                            break
+                        self.__condition.wait()
+                    if self.__closed:
+                        return
+
+                    chunk = response.body[offset : offset + window]
+                    offset += len(chunk)
+                    connection.send_data(
+                        stream_id, chunk, end_stream=offset >= len(response.body)
+                    )
+                    sock.sendall(connection.data_to_send())
+        except (OSError, h2.exceptions.StreamClosedError, h2.exceptions.ProtocolError):
+            # Клиент закрыл поток или соединение, не дождавшись ответа.
+            pass
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeAmoCRMServer:
+    """
+    Локальный HTTP-сервер, заменяющий amoCRM и amojo.
+
+    Использование::
+
+        with FakeAmoCRMServer(FakeServerConfig(latency=0.01)) as server:
+            client = AmoCRMClient(base_url=server.url, ...)
+    """
+
+    def __init__(
+        self,
+        config: FakeServerConfig | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        http2: bool = False,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param config: Настройки поведения сервера.
+        :param host: Адрес, на котором слушает сервер.
+        :param port: Порт. 0 - выбрать свободный порт автоматически.
+        :param http2:
+            Принимать HTTP/2 без TLS (h2c) вместо HTTP/1.1. Клиент должен
+            заранее знать протокол, см. `HTTP2Adapter(prior_knowledge=True)`.
+        """
+
+        self.backend = FakeAmoCRMBackend(config)
+        self.http2 = http2
+
+        self.__server: socketserver.TCPServer
+        if http2:
+            handler: type = type(
+                "FakeHTTP2Handler", (_FakeHTTP2Handler,), {"backend": self.backend}
+            )
+            self.__server = _ThreadingTCPServer((host, port), handler)
+        else:
+            handler = type(
+                "FakeRequestHandler", (_FakeRequestHandler,), {"backend": self.backend}
+            )
+            self.__server = ThreadingHTTPServer((host, port), handler)
+            self.__server.daemon_threads = True
+        self.__thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        if isinstance(host, bytes):
+            host = host.decode()
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        """Запуск сервера в фоновом потоке"""
+
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever, name="fake-amocrm", daemon=True
+        )
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Остановка сервера"""
+
+        self.__server.shutdown()
+        self.__server.server_close()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def __enter__(self) -> "FakeAmoCRMServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Локальный сервер amoCRM/amojo")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--messages-per-chat", type=int, default=250)
+    parser.add_argument("--http2", action="store_true", help="HTTP/2 без TLS (h2c)")
+    args = parser.parse_args()
+
+    server = FakeAmoCRMServer(
+        FakeServerConfig(
+            latency=args.latency,
+            rate_limit=args.rate_limit,
+            error_rate=args.error_rate,
+            messages_per_chat=args.messages_per_chat,
+        ),
+        port=args.port,
+        http2=args.http2,
+    )
+    print(f"Сервер запущен на {server.url}")
+    try:
+        server.start()
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
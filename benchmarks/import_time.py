@@ -0,0 +1,123 @@
+"""
+Проверка времени импорта основных модулей пакета.
+
+Запуск::
+
+    python -m benchmarks.import_time --budget-ms 250
+
+Каждый модуль импортируется в отдельном процессе с `python -X importtime`.
+Проверяется, что суммарное время импорта модуля укладывается в бюджет и что
+при импорте не загружаются тяжелые необязательные зависимости: они должны
+импортироваться при первом использовании. Код возврата 1, если проверка не
+прошла, поэтому скрипт можно запускать в CI.
+"""
+
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+
+
+# Модули, которые импортируют воркеры и команды при старте.
+MODULES = (
+    "amocrm.services.core.client",
+    "amocrm.services.core.contacts",
+    "amocrm.services.core.talks",
+    "amocrm.services.core.communication_channels.channel_screener",
+    "amocrm.services.core.communication_channels.channel_data_parser",
+    "amocrm.services.amojo.client",
+    "amocrm.services.amojo.chat_unloader",
+    "amocrm.services.archive.deduplication",
+    "amocrm.services.scheduling.work_scheduler",
+    "amocrm.services.utils.http2_adapter",
+)
+
+# Каталог, из которого импортируется пакет `amocrm`.
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Необязательные зависимости, которые не должны загружаться при импорте.
+LAZY_DEPENDENCIES = (
+    "bs4",
+    "lxml",
+    "pyarrow",
+    "zstandard",
+    "orjson",
+    "msgspec",
+    "django",
+    "opentelemetry",
+    "prometheus_client",
+    "httpx",
+    "h2",
+)
+
+
+def measure(module: str) -> tuple[float, list[str]]:
+    """
+    Импорт модуля в отдельном процессе.
+
+    :param module: Имя модуля.
+
+    :return: Суммарное время импорта модуля в миллисекундах и список
+        загруженных при этом необязательных зависимостей.
+    """
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=ROOT_DIR,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Не удалось импортировать {module}:\n{process.stderr}")
+
+    cumulative_us = 0
+    loaded: list[str] = []
+    for line in process.stderr.splitlines():
+        # Формат строки: "import time: <self, мкс> | <cumulative, мкс> | <модуль>".
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        name = name.strip()
+        if name == module:
+            cumulative_us = int(cumulative)
+        package = name.split(".")[0]
+        if package in LAZY_DEPENDENCIES and package not in loaded:
+            loaded.append(package)
+
+    return cumulative_us / 1000, loaded
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Проверка времени импорта")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=250.0,
+        help="Бюджет суммарного времени импорта одного модуля",
+    )
+    parser.add_argument(
+        "--module",
+        action="append",
+        help="Модуль для проверки. Можно указать несколько раз. По умолчанию все.",
+    )
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.module or MODULES:
+        elapsed_ms, loaded = measure(module)
+
+        problems: list[str] = []
+        if elapsed_ms > args.budget_ms:
+            problems.append(f"дольше бюджета {args.budget_ms:.0f} мс")
+        if loaded:
+            problems.append(f"загружены {', '.join(loaded)}")
+        failed = failed or len(problems) > 0
+
+        status = "; ".join(problems) if problems else "ok"
+        print(f"{elapsed_ms:8.1f} мс  {module}  [{status}]")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
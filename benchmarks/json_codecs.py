@@ -0,0 +1,128 @@
+"""
+Сравнение кодеков JSON на типичных ответах amoCRM и amojo.
+
+Запуск::
+
+    python -m benchmarks.json_codecs --messages 1000 --repeat 50
+
+Для каждого установленного кодека выводит среднее время разбора страницы
+сообщений amojo, ответа со списком контактов и ответа с беседами: в словари
+(`loads`) и сразу в схемы ответов (`decode`).
+"""
+
+import json
+import time
+import argparse
+from typing import Any
+
+from amocrm.services.core.schemas import (
+    AmoCRMTalksByChat,
+    AmoCRMContactsPage,
+)
+from amocrm.services.amojo.schemas import AmoJoMessage
+from amocrm.services.utils.json_codec import (
+    JSONCodec,
+    get_json_codec,
+)
+
+from .fake_server import FakeAmoCRMBackend
+
+
+def _payloads(messages: int, contacts: int) -> dict[str, bytes]:
+    """Тела ответов, на которых сравниваются кодеки"""
+
+    backend = FakeAmoCRMBackend()
+    amojo_page = [backend._message("chat-1-0", index) for index in range(messages)]
+    contacts_page = {
+        "_embedded": {
+            "contacts": [
+                {
+                    **backend._contact(contact_id),
+                    "_embedded": {"leads": [{"id": contact_id * 10, "_links": {}}]},
+                }
+                for contact_id in range(1, contacts + 1)
+            ]
+        }
+    }
+    talks = {
+        "chat-1-0": [
+            {"talk_id": talk_id, "status": talk_id % 2, "chat_id": "chat-1-0"}
+            for talk_id in range(messages // 10)
+        ]
+    }
+
+    return {
+        "amojo_page": json.dumps(amojo_page, ensure_ascii=False).encode(),
+        "contacts": json.dumps(contacts_page, ensure_ascii=False).encode(),
+        "talks": json.dumps(talks).encode(),
+    }
+
+
+# Схемы, в которые разбираются тела ответов.
+_PAYLOAD_TYPES: dict[str, Any] = {
+    "amojo_page": list[AmoJoMessage],
+    "contacts": AmoCRMContactsPage,
+    "talks": AmoCRMTalksByChat,
+}
+
+
+def _measure(
+    codec: JSONCodec, payload: bytes, repeat: int, type_: Any | None = None
+) -> float:
+    """
+    Среднее время разбора в миллисекундах.
+
+    :param type_: Схема для разбора через `decode`. Если None, используется `loads`.
+    """
+
+    def decode() -> Any:
+        if type_ is None:
+            return codec.loads(payload)
+        return codec.decode(payload, type_)
+
+    decode()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        decode()
+
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Сравнение кодеков JSON")
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--contacts", type=int, default=250)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    payloads = _payloads(args.messages, args.contacts)
+
+    results: dict[str, dict[str, Any]] = {}
+    for name in ("stdlib", "orjson", "msgspec"):
+        try:
+            codec = get_json_codec(name)
+        except ImportError:
+            print(f"{name}: не установлен")
+            continue
+
+        results[name] = {
+            payload_name: _measure(codec, payload, args.repeat)
+            for payload_name, payload in payloads.items()
+        }
+        results[f"{name}:typed"] = {
+            payload_name: _measure(
+                codec, payload, args.repeat, _PAYLOAD_TYPES[payload_name]
+            )
+            for payload_name, payload in payloads.items()
+        }
+
+    for payload_name, payload in payloads.items():
+        print(f"== {payload_name}: {len(payload) / 1024:.0f} КБ")
+        baseline = results.get("stdlib", {}).get(payload_name)
+        for name, timings in results.items():
+            speedup = f" (x{baseline / timings[payload_name]:.1f})" if baseline else ""
+            print(f"   {name:<14} {timings[payload_name]:.3f} мс{speedup}")
+
+
+if __name__ == "__main__":
+    main()
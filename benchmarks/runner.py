@@ -0,0 +1,435 @@
+"""
+Бенчмарки сервисов пакета на локальной замене amoCRM/amojo.
+
+Запуск::
+
+    python -m benchmarks.runner --contacts 200 --workers 8 --latency 0.005
+
+Сравнение транспортов HTTP/1.1 и HTTP/2 (нужен `httpx[http2]`)::
+
+    python -m benchmarks.runner --workload unload --workload close_talks \
+        --workers 32 --latency 0.02 --transport http1 --transport http2
+
+Каждая нагрузка прогоняется на свежем состоянии `FakeAmoCRMBackend` и
+выдает пропускную способность, p50/p99 времени обработки одной единицы
+работы и пиковую память. С флагом `--json` результаты дописываются в файл
+построчно, чтобы их можно было сравнивать между коммитами.
+"""
+
+import sys
+import json
+import time
+import argparse
+import resource
+import platform
+import tracemalloc
+import subprocess
+from typing import Callable
+from dataclasses import (
+    asdict,
+    field,
+    dataclass,
+)
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from amocrm.services.core.talks import AmoCRMTalks
+from amocrm.services.core.client import AmoCRMClient
+from amocrm.services.core.contacts import AmoCRMContacts
+from amocrm.services.core.communication_channels.channel_unlinker import (
+    AmoCRMCommunicationChannelUnlinker,
+)
+from amocrm.services.core.communication_channels.channel_data_parser import (
+    AmoCRMCommunicationChannelsDataParser,
+)
+from amocrm.services.amojo.client import AmoJoClient
+from amocrm.services.amojo.chat_unloader import AmoJoChatUnloader
+from amocrm.services.instrumentation.histogram import LatencyHistogram
+from amocrm.services.instrumentation.aggregator import EndpointMetricsAggregator
+from amocrm.services.utils.http2_adapter import HTTP2Adapter
+from amocrm.services.tokens.managers.memory_tokens_manager import MemoryTokensManager
+
+from .fake_server import (
+    FakeAmoCRMServer,
+    FakeServerConfig,
+)
+
+
+@dataclass
+class BenchmarkClients:
+    """Клиенты, общие для всех единиц работы одного прогона"""
+
+    amocrm_client: AmoCRMClient
+    amojo_client: AmoJoClient
+
+
+@dataclass
+class BenchmarkResult:
+    """Результат прогона одной нагрузки"""
+
+    workload: str
+    items: int
+    errors: int
+    workers: int
+    duration: float
+    throughput: float
+    p50: float
+    p99: float
+    max: float
+    peak_memory_mb: float
+    max_rss_mb: float
+    transport: str = "http1"
+    endpoints: list[dict[str, float | int | str]] = field(default_factory=list)
+
+
+# Нагрузки. Каждая принимает клиентов и ID контакта и возвращает количество
+# обработанных сообщений (для контроля, что работа действительно сделана).
+
+
+def contact_pipeline_workload(clients: BenchmarkClients, contact_id: int) -> int:
+    """Полная обработка контакта, как в `ContactHandler`, без записи в БД"""
+
+    amocrm_client = clients.amocrm_client
+    leads = AmoCRMContacts(amocrm_client).get_leads_by_contact(contact_id)
+    if len(leads) == 0:
+        return 0
+
+    contact_channels = AmoCRMCommunicationChannelsDataParser(amocrm_client).parse(
+        leads[0].id, contact_id
+    )
+    amocrm_talks = AmoCRMTalks(amocrm_client)
+    unlinker = AmoCRMCommunicationChannelUnlinker(amocrm_client)
+
+    messages_count = 0
+    for channel_data in contact_channels.stale_channels:
+        for messages in AmoJoChatUnloader(clients.amojo_client, channel_data.chat_id):
+            messages_count += len(messages)
+        amocrm_talks.close_talks_by_chat_id(channel_data.chat_id)
+        unlinker.unlink_chat(channel_data)
+
+    return messages_count
+
+
+def lead_parse_workload(clients: BenchmarkClients, contact_id: int) -> int:
+    """Получение сделок контакта и разбор страницы сделки"""
+
+    leads = AmoCRMContacts(clients.amocrm_client).get_leads_by_contact(contact_id)
+    contact_channels = AmoCRMCommunicationChannelsDataParser(
+        clients.amocrm_client
+    ).parse(leads[0].id, contact_id)
+
+    return len(contact_channels)
+
+
+def unload_workload(clients: BenchmarkClients, contact_id: int) -> int:
+    """Выгрузка одного чата контакта"""
+
+    messages_count = 0
+    for messages in AmoJoChatUnloader(clients.amojo_client, f"chat-{contact_id}-0"):
+        messages_count += len(messages)
+
+    return messages_count
+
+
+def unload_raw_workload(clients: BenchmarkClients, contact_id: int) -> int:
+    """Выгрузка одного чата контакта сырыми страницами, без разбора сообщений"""
+
+    pages_count = 0
+    for _ in AmoJoChatUnloader(
+        clients.amojo_client, f"chat-{contact_id}-0"
+    ).iter_raw_pages():
+        pages_count += 1
+
+    return pages_count
+
+
+def unload_lazy_workload(clients: BenchmarkClients, contact_id: int) -> int:
+    """Выгрузка одного чата контакта ленивыми представлениями сообщений"""
+
+    messages_count = 0
+    for messages in AmoJoChatUnloader(
+        clients.amojo_client, f"chat-{contact_id}-0"
+    ).iter_lazy_pages():
+        messages_count += len(messages)
+
+    return messages_count
+
+
+def close_talks_workload(clients: BenchmarkClients, contact_id: int) -> int:
+    """Закрытие бесед одного чата контакта"""
+
+    return AmoCRMTalks(clients.amocrm_client).close_talks_by_chat_id(
+        f"chat-{contact_id}-0"
+    )
+
+
+WORKLOADS: dict[str, Callable[[BenchmarkClients, int], int]] = {
+    "pipeline": contact_pipeline_workload,
+    "lead_parse": lead_parse_workload,
+    "unload": unload_workload,
+    "unload_raw": unload_raw_workload,
+    "unload_lazy": unload_lazy_workload,
+    "close_talks": close_talks_workload,
+}
+
+
+def run_workload(
+    server: FakeAmoCRMServer,
+    name: str,
+    contacts: int,
+    workers: int,
+    trace_memory: bool = False,
+    session: requests.Session | None = None,
+) -> BenchmarkResult:
+    """
+    Прогон одной нагрузки.
+
+    :param server: Запущенный локальный сервер.
+    :param name: Название нагрузки из `WORKLOADS`.
+    :param contacts: Количество обрабатываемых контактов.
+    :param workers: Количество потоков.
+    :param trace_memory:
+        Замерять пиковую память Python через `tracemalloc`. Замедляет
+        прогон, поэтому выключено по умолчанию.
+    :param session:
+        HTTP-сессия клиентов, например, с транспортом HTTP/2. По умолчанию
+        сессия с пулом HTTP/1.1 на `workers` соединений.
+
+    :return: Результат прогона.
+    """
+
+    server.backend.reset()
+    workload = WORKLOADS[name]
+
+    if session is None:
+        session = create_session("http1", workers)
+
+    aggregator = EndpointMetricsAggregator()
+    amocrm_client = AmoCRMClient(
+        base_url=server.url,
+        session=session,
+        secret_key="secret",
+        integration_id="integration",
+        auth_code="code",
+        redirect_url="http://localhost",
+        tokens_manager=MemoryTokensManager(),
+    )
+    amojo_client = AmoJoClient(
+        base_url=server.url,
+        amocrm_client=amocrm_client,
+        tokens_manager=MemoryTokensManager(),
+        session=session,
+    )
+    # Хуки добавляем после инициализации, чтобы не учитывать авторизацию.
+    amocrm_client.add_request_hook(aggregator)
+    amojo_client.add_request_hook(aggregator)
+    clients = BenchmarkClients(amocrm_client, amojo_client)
+
+    latencies = LatencyHistogram(significant_figures=3)
+    errors = 0
+
+    def process(contact_id: int) -> float | None:
+        start = time.perf_counter()
+        try:
+            workload(clients, contact_id)
+        except Exception:
+            return None
+        return time.perf_counter() - start
+
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for latency in executor.map(process, range(1, contacts + 1)):
+            if latency is None:
+                errors += 1
+            else:
+                latencies.record(latency)
+    duration = time.perf_counter() - start
+
+    peak_memory = 0.0
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+
+    # В Linux `ru_maxrss` в КБ, в macOS - в байтах.
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    max_rss_mb = max_rss / 1024 / 1024 if sys.platform == "darwin" else max_rss / 1024
+
+    return BenchmarkResult(
+        workload=name,
+        items=contacts,
+        errors=errors,
+        workers=workers,
+        duration=duration,
+        throughput=contacts / duration if duration > 0 else 0.0,
+        p50=latencies.percentile(50),
+        p99=latencies.percentile(99),
+        max=latencies.max,
+        peak_memory_mb=peak_memory,
+        max_rss_mb=max_rss_mb,
+        transport="http2" if server.http2 else "http1",
+        endpoints=[
+            {
+                "method": stats.method,
+                "endpoint": stats.endpoint,
+                "count": stats.requests_count,
+                "errors": stats.errors_count,
+                "p50": stats.latency.percentile(50),
+                "p99": stats.latency.percentile(99),
+                "bytes": stats.response_bytes,
+            }
+            for stats in aggregator.snapshot()
+        ],
+    )
+
+
+def create_session(transport: str, workers: int) -> requests.Session:
+    """
+    Сессия клиентов бенчмарка.
+
+    :param transport:
+        `http1` - пул HTTP/1.1 на `workers` соединений, `http2` - одно
+        соединение HTTP/2 без TLS на хост.
+    :param workers: Количество потоков.
+    """
+
+    session = requests.Session()
+    adapter = (
+        HTTP2Adapter(max_connections=1, prior_knowledge=True)
+        if transport == "http2"
+        else HTTPAdapter(pool_connections=2, pool_maxsize=workers)
+    )
+    session.mount("http://", adapter)
+
+    return session
+
+
+def format_result(result: BenchmarkResult) -> str:
+    """Человекочитаемое представление результата"""
+
+    lines = [
+        f"== {result.workload} [{result.transport}]: {result.items} шт., "
+        f"{result.workers} потоков",
+        f"   время:        {result.duration:.3f} с",
+        f"   пропускная:   {result.throughput:.1f} шт/с",
+        f"   p50 / p99:    {result.p50 * 1000:.1f} / {result.p99 * 1000:.1f} мс",
+        f"   max:          {result.max * 1000:.1f} мс",
+        f"   ошибок:       {result.errors}",
+        f"   память:       {result.peak_memory_mb:.1f} МБ (tracemalloc), "
+        f"{result.max_rss_mb:.1f} МБ (max RSS)",
+    ]
+    for endpoint in sorted(result.endpoints, key=lambda e: str(e["endpoint"])):
+        lines.append(
+            f"   {endpoint['method']:<5} {endpoint['endpoint']:<32} "
+            f"n={endpoint['count']:<6} "
+            f"p50={float(endpoint['p50']) * 1000:.1f}мс "
+            f"p99={float(endpoint['p99']) * 1000:.1f}мс"
+        )
+
+    return "\n".join(lines)
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарки сервисов amoCRM")
+    parser.add_argument(
+        "--workload",
+        action="append",
+        choices=sorted(WORKLOADS),
+        help="Нагрузка для прогона. Можно указать несколько раз. По умолчанию все.",
+    )
+    parser.add_argument("--contacts", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--channels-per-contact", type=int, default=4)
+    parser.add_argument("--messages-per-chat", type=int, default=250)
+    parser.add_argument("--lead-page-kb", type=int, default=200)
+    parser.add_argument("--trace-memory", action="store_true")
+    parser.add_argument(
+        "--transport",
+        action="append",
+        choices=("http1", "http2"),
+        help="Транспорт клиентов. Можно указать несколько раз. По умолчанию http1.",
+    )
+    parser.add_argument(
+        "--json", help="Файл, в который дописываются результаты в формате JSONL"
+    )
+    args = parser.parse_args(argv)
+
+    config = FakeServerConfig(
+        contacts_count=args.contacts,
+        channels_per_contact=args.channels_per_contact,
+        messages_per_chat=args.messages_per_chat,
+        lead_page_padding_kb=args.lead_page_kb,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        rate_limit=args.rate_limit,
+        error_rate=args.error_rate,
+    )
+
+    revision = _git_revision()
+    results: list[BenchmarkResult] = []
+    for transport in args.transport or ["http1"]:
+        with FakeAmoCRMServer(config, http2=transport == "http2") as server:
+            for name in args.workload or list(WORKLOADS):
+                session = create_session(transport, args.workers)
+                try:
+                    result = run_workload(
+                        server,
+                        name,
+                        args.contacts,
+                        args.workers,
+                        args.trace_memory,
+                        session,
+                    )
+                finally:
+                    session.close()
+                print(format_result(result))
+                results.append(result)
+
+                if not args.json:
+                    continue
+
+                record = {
+                    "revision": revision,
+                    "python": platform.python_version(),
+                    "timestamp": time.time(),
+                    "config": asdict(config),
+                    **asdict(result),
+                }
+                with open(args.json, "a", encoding="utf-8") as file:
+                    file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    if len(args.transport or []) > 1:
+        print("== Сравнение транспортов")
+        for name in args.workload or list(WORKLOADS):
+            for result in results:
+                if result.workload == name:
+                    print(
+                        f"   {name:<12} {result.transport:<6} "
+                        f"{result.throughput:8.1f} шт/с  "
+                        f"p50={result.p50 * 1000:.1f}мс  p99={result.p99 * 1000:.1f}мс  "
+                        f"ошибок={result.errors}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
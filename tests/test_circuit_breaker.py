@@ -0,0 +1,234 @@
+"""Проверка переходов состояний `CircuitBreaker`"""
+
+import types
+import threading
+
+import pytest
+
+from amocrm.services.utils import circuit_breaker
+from amocrm.services.utils.exceptions import CircuitBreakerOpenException
+from amocrm.services.utils.circuit_breaker import (
+    CircuitState,
+    CircuitBreaker,
+    CircuitBreakerSettings,
+    CircuitBreakerRegistry,
+)
+
+
+SETTINGS = CircuitBreakerSettings(
+    failure_rate_threshold=0.5,
+    slow_call_duration=1.0,
+    slow_call_rate_threshold=0.8,
+    window_size=4,
+    min_calls=4,
+    open_timeout=10.0,
+    half_open_max_calls=2,
+)
+
+
+class _Clock:
+    """Управляемые часы вместо `time.monotonic`"""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> _Clock:
+    clock = _Clock()
+    monkeypatch.setattr(
+        circuit_breaker, "time", types.SimpleNamespace(monotonic=clock.monotonic)
+    )
+    return clock
+
+
+def _call(breaker: CircuitBreaker, failed: bool = False, duration: float = 0.1) -> None:
+    breaker.before_call()
+    breaker.record(failed, duration)
+
+
+def _open(breaker: CircuitBreaker) -> None:
+    for _ in range(SETTINGS.window_size):
+        _call(breaker, failed=True)
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_opens_by_failure_rate_after_min_calls(clock: _Clock) -> None:
+    """Предохранитель размыкается по доле ошибок, но не раньше `min_calls`"""
+
+    breaker = CircuitBreaker("example.com", SETTINGS)
+    for _ in range(3):
+        _call(breaker, failed=True)
+    assert breaker.state == CircuitState.CLOSED
+
+    _call(breaker)
+    assert breaker.state == CircuitState.OPEN
+
+    clock.now += 4
+    with pytest.raises(CircuitBreakerOpenException) as error:
+        breaker.before_call()
+    assert error.value.host == "example.com"
+    assert error.value.retry_after == pytest.approx(6.0)
+
+
+def test_window_forgets_old_results(clock: _Clock) -> None:
+    """Результаты, вытесненные из окна, не учитываются в долях"""
+
+    breaker = CircuitBreaker("example.com", SETTINGS)
+    _call(breaker, failed=True)
+    for _ in range(6):
+        _call(breaker)
+    # В окне одна ошибка из четырех запросов, затем две.
+    _call(breaker, failed=True)
+    assert breaker.state == CircuitState.CLOSED
+    _call(breaker, failed=True)
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_opens_by_slow_call_rate(clock: _Clock) -> None:
+    """Медленные ответы размыкают предохранитель так же, как ошибки"""
+
+    breaker = CircuitBreaker("example.com", SETTINGS)
+    for _ in range(4):
+        _call(breaker, duration=SETTINGS.slow_call_duration or 0)
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_half_open_probes_close_breaker(clock: _Clock) -> None:
+    """После `open_timeout` пропускаются пробные запросы, их успех замыкает цепь"""
+
+    breaker = CircuitBreaker("example.com", SETTINGS)
+    _open(breaker)
+
+    clock.now += SETTINGS.open_timeout
+    assert breaker.state == CircuitState.HALF_OPEN
+
+    breaker.before_call()
+    breaker.before_call()
+    # Все места пробных запросов заняты.
+    with pytest.raises(CircuitBreakerOpenException):
+        breaker.before_call()
+
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitState.HALF_OPEN
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitState.CLOSED
+
+    # Окно очищено: прежние ошибки не размыкают цепь снова.
+    for _ in range(3):
+        _call(breaker, failed=True)
+    assert breaker.state == CircuitState.CLOSED
+
+
+@pytest.mark.parametrize("failed, duration", [(True, 0.1), (False, 5.0)])
+def test_failed_probe_reopens_breaker(
+    clock: _Clock, failed: bool, duration: float
+) -> None:
+    """Неуспешный или медленный пробный запрос снова размыкает цепь"""
+
+    breaker = CircuitBreaker("example.com", SETTINGS)
+    _open(breaker)
+    clock.now += SETTINGS.open_timeout
+
+    breaker.before_call()
+    breaker.record(failed, duration)
+    assert breaker.state == CircuitState.OPEN
+
+    # Таймаут отсчитывается заново от момента повторного размыкания.
+    clock.now += SETTINGS.open_timeout - 1
+    assert breaker.state == CircuitState.OPEN
+    clock.now += 1
+    assert breaker.state == CircuitState.HALF_OPEN
+
+
+def test_result_of_call_sent_before_opening_is_ignored(clock: _Clock) -> None:
+    """Ответ на запрос, отправленный до размыкания, не меняет состояние"""
+
+    breaker = CircuitBreaker("example.com", SETTINGS)
+    breaker.before_call()
+    _open(breaker)
+
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_cancel_call_releases_probe_slot(clock: _Clock) -> None:
+    """Отмененный пробный запрос освобождает место, и цепь может замкнуться"""
+
+    breaker = CircuitBreaker(
+        "example.com",
+        CircuitBreakerSettings(
+            window_size=4, min_calls=4, open_timeout=10.0, half_open_max_calls=1
+        ),
+    )
+    _open(breaker)
+    clock.now += 10
+
+    breaker.before_call()
+    with pytest.raises(CircuitBreakerOpenException):
+        breaker.before_call()
+
+    # Без `cancel_call` цепь осталась бы полуразомкнутой навсегда.
+    breaker.cancel_call()
+    breaker.before_call()
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitState.CLOSED
+
+    # В замкнутом состоянии отмена ничего не меняет.
+    breaker.cancel_call()
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_concurrent_probes_respect_limit(clock: _Clock) -> None:
+    """Одновременные потоки получают не больше `half_open_max_calls` мест"""
+
+    breaker = CircuitBreaker("example.com", SETTINGS)
+    _open(breaker)
+    clock.now += SETTINGS.open_timeout
+
+    threads_count = 16
+    start = threading.Barrier(threads_count)
+    allowed: list[bool] = []
+    allowed_lock = threading.Lock()
+
+    def probe() -> None:
+        start.wait()
+        try:
+            breaker.before_call()
+        except CircuitBreakerOpenException:
+            is_allowed = False
+        else:
+            is_allowed = True
+        with allowed_lock:
+            allowed.append(is_allowed)
+
+    threads = [threading.Thread(target=probe) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert allowed.count(True) == SETTINGS.half_open_max_calls
+
+
+def test_registry_shares_breakers_by_host(clock: _Clock) -> None:
+    """Реестр отдает один предохранитель на хост с его настройками"""
+
+    host_settings = CircuitBreakerSettings(window_size=1, min_calls=1)
+    registry = CircuitBreakerRegistry(SETTINGS, {"slow.example.com": host_settings})
+
+    breaker = registry.get("https://example.com/api/v4/leads")
+    assert registry.get("https://example.com/ajax/") is breaker
+    assert registry.get("example.com") is breaker
+
+    _call(registry.get("https://slow.example.com/"), failed=True)
+    assert registry.states() == {
+        "example.com": CircuitState.CLOSED,
+        "slow.example.com": CircuitState.OPEN,
+    }
+
+    registry.get("slow.example.com").reset()
+    assert registry.get("slow.example.com").state == CircuitState.CLOSED
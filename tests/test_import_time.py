@@ -0,0 +1,52 @@
+"""
+Проверка того, что импорт пакета не загружает тяжелые зависимости
+и укладывается в бюджет времени (см. `benchmarks.import_time`).
+"""
+
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+from benchmarks.import_time import (
+    MODULES,
+    ROOT_DIR,
+    LAZY_DEPENDENCIES,
+    measure,
+)
+
+
+# Бюджет с запасом: тест не должен падать на медленной машине CI.
+IMPORT_BUDGET_MS = float(os.environ.get("AMOCRM_IMPORT_BUDGET_MS", 500))
+
+
+def test_lazy_dependencies_not_imported() -> None:
+    """После импорта модулей пакета тяжелых зависимостей нет в `sys.modules`"""
+
+    code = (
+        "import sys, json\n"
+        + "".join(f"import {module}\n" for module in MODULES)
+        + f"print(json.dumps(sorted({{m.split('.')[0] for m in sys.modules}}"
+        f" & set({list(LAZY_DEPENDENCIES)!r}))))"
+    )
+    process = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=ROOT_DIR,
+    )
+
+    assert process.returncode == 0, process.stderr
+    assert json.loads(process.stdout) == []
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_import_time_budget(module: str) -> None:
+    """Импорт каждого модуля укладывается в бюджет времени"""
+
+    elapsed_ms, loaded = measure(module)
+
+    assert loaded == []
+    assert elapsed_ms <= IMPORT_BUDGET_MS
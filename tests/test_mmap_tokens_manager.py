@@ -0,0 +1,127 @@
+"""Проверка seqlock `MmapTokensManager` под конкурентной записью"""
+
+import mmap
+import struct
+import multiprocessing
+from typing import Any
+from pathlib import Path
+
+import pytest
+
+from amocrm.services.tokens import Tokens
+from amocrm.services.tokens.managers.mmap_tokens_manager import MmapTokensManager
+
+
+WRITES = 2000
+READERS = 3
+PROCESSES = 4
+INCREMENTS = 200
+
+
+def _tokens(generation: int) -> Tokens:
+    # Токены разной длины, чтобы читатель, смешавший две записи, заметил это.
+    return Tokens(f"access-{generation}-" + "a" * (generation % 50), str(generation))
+
+
+def _read_until(path: Path, ready: Any, is_done: Any, errors: Any) -> None:
+    """Чтение токенов, пока писатель не закончит, с проверкой целостности пар"""
+
+    reader = MmapTokensManager(path, "client")
+    ready.wait()
+    last_generation = 0
+    while not is_done.is_set():
+        tokens = reader.get_tokens()
+        assert tokens is not None
+        generation = int(tokens.refresh_token)
+        # Пара из разных записей или откат к старой версии.
+        if tokens != _tokens(generation) or generation < last_generation:
+            with errors.get_lock():
+                errors.value += 1
+        last_generation = generation
+    reader.close()
+
+
+def test_readers_see_whole_token_pairs(tmp_path: Path) -> None:
+    """Читатели других процессов видят только целые пары токенов во время записи"""
+
+    path = tmp_path / "tokens"
+    writer = MmapTokensManager(path, "client")
+    writer.save_tokens(_tokens(0))
+
+    context = multiprocessing.get_context("spawn")
+    ready = context.Barrier(READERS + 1)
+    is_done = context.Event()
+    errors = context.Value("i", 0)
+    readers = [
+        context.Process(target=_read_until, args=(path, ready, is_done, errors))
+        for _ in range(READERS)
+    ]
+    for reader in readers:
+        reader.start()
+    # Запись начинается, когда все читатели уже читают.
+    ready.wait()
+    for generation in range(1, WRITES + 1):
+        writer.save_tokens(_tokens(generation))
+    is_done.set()
+    for reader in readers:
+        reader.join(timeout=60)
+        assert reader.exitcode == 0
+
+    assert errors.value == 0
+    assert writer.get_tokens() == _tokens(WRITES)
+    writer.close()
+
+
+def test_reader_recovers_after_interrupted_write(tmp_path: Path) -> None:
+    """Нечетная версия, оставшаяся от упавшего писателя, не блокирует чтение"""
+
+    path = tmp_path / "tokens"
+    manager = MmapTokensManager(path, "client")
+    manager.save_tokens(_tokens(1))
+
+    # Писатель пометил запись начатой и завершился.
+    with open(path, "r+b") as file, mmap.mmap(file.fileno(), 0) as mapping:
+        seq = struct.unpack_from("<Q", mapping, 8)[0]
+        struct.pack_into("<Q", mapping, 8, seq + 1)
+
+    other = MmapTokensManager(path, "client")
+    assert other.get_tokens() == _tokens(1)
+    other.save_tokens(_tokens(2))
+    assert manager.get_tokens() == _tokens(2)
+    other.close()
+    manager.close()
+
+
+def _increment(manager: MmapTokensManager) -> None:
+    """Обновление токенов под `refresh_lock`: прочитать, увеличить, сохранить"""
+
+    for _ in range(INCREMENTS):
+        with manager.refresh_lock():
+            tokens = manager.get_tokens()
+            assert tokens is not None
+            manager.save_tokens(_tokens(int(tokens.refresh_token) + 1))
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="Нужен fork",
+)
+def test_refresh_lock_excludes_forked_processes(tmp_path: Path) -> None:
+    """Процессы, унаследовавшие менеджер через fork, исключают друг друга"""
+
+    manager = MmapTokensManager(tmp_path / "tokens", "client")
+    manager.save_tokens(_tokens(0))
+
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=_increment, args=(manager,)) for _ in range(PROCESSES)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    # Ни одно обновление не потеряно.
+    assert manager.get_tokens() == _tokens(PROCESSES * INCREMENTS)
+    manager.close()
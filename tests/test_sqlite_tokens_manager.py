@@ -0,0 +1,85 @@
+"""Проверка блокировки обновления токенов в SQLite между процессами"""
+
+import time
+import asyncio
+import multiprocessing
+from typing import Any
+from pathlib import Path
+
+from amocrm.services.tokens import Tokens
+from amocrm.services.tokens.managers.sqlite_tokens_manager import (
+    SQLiteTokensManager,
+    AsyncSQLiteTokensManager,
+)
+
+
+WORKERS = 4
+
+
+def _refresh(db_path: Path, start: Any, refreshes: Any) -> None:
+    """Обновление токенов так же, как это делает клиент при ответе 401"""
+
+    manager = SQLiteTokensManager(db_path, "client")
+    seen_tokens = manager.get_tokens()
+    start.wait()
+
+    with manager.refresh_lock():
+        if manager.get_tokens() != seen_tokens:
+            return
+        time.sleep(0.05)
+        with refreshes.get_lock():
+            refreshes.value += 1
+        manager.save_tokens(Tokens("access-1", "1"))
+
+
+def test_refresh_lock_serializes_processes(tmp_path: Path) -> None:
+    """Токены, прочитанные всеми воркерами до обновления, обновляются один раз"""
+
+    db_path = tmp_path / "tokens.sqlite3"
+    SQLiteTokensManager(db_path, "client").save_tokens(Tokens("access-0", "0"))
+
+    context = multiprocessing.get_context("spawn")
+    start = context.Event()
+    refreshes = context.Value("i", 0)
+    processes = [
+        context.Process(target=_refresh, args=(db_path, start, refreshes))
+        for _ in range(WORKERS)
+    ]
+    for process in processes:
+        process.start()
+    # Воркеры должны успеть прочитать исходные токены.
+    time.sleep(1)
+    start.set()
+    for process in processes:
+        process.join(timeout=30)
+        assert process.exitcode == 0
+
+    assert refreshes.value == 1
+    assert SQLiteTokensManager(db_path, "client").get_tokens() == Tokens(
+        "access-1", "1"
+    )
+
+
+def test_async_refresh_lock_serializes_tasks(tmp_path: Path) -> None:
+    """Асинхронный менеджер держит блокировку через `await` без взаимоблокировки"""
+
+    db_path = tmp_path / "tokens.sqlite3"
+    refreshes = 0
+
+    async def refresh(manager: AsyncSQLiteTokensManager, seen: Tokens) -> None:
+        nonlocal refreshes
+        async with manager.refresh_lock():
+            if await manager.get_tokens() != seen:
+                return
+            await asyncio.sleep(0.01)
+            refreshes += 1
+            await manager.save_tokens(Tokens("access-1", "1"))
+
+    async def main() -> Tokens | None:
+        managers = [AsyncSQLiteTokensManager(db_path, "client") for _ in range(3)]
+        seen = await managers[0].save_tokens(Tokens("access-0", "0"))
+        await asyncio.gather(*(refresh(manager, seen) for manager in managers))
+        return await managers[0].get_tokens()
+
+    assert asyncio.run(main()) == Tokens("access-1", "1")
+    assert refreshes == 1
@@ -0,0 +1,196 @@
+"""Проверка порядка выполнения и лимитов `WorkScheduler`"""
+
+import time
+import threading
+from typing import (
+    Any,
+    Callable,
+)
+from collections import Counter
+from collections.abc import Hashable
+
+from amocrm.services.scheduling.work_item import (
+    WorkItem,
+    EndpointClass,
+)
+from amocrm.services.scheduling.work_scheduler import WorkScheduler
+
+
+TIMEOUT = 10
+
+
+class _Tracker:
+    """Учет порядка и одновременности выполнения работ"""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.order: list[str] = []
+        self.running: Counter[Hashable] = Counter()
+        self.max_running: Counter[Hashable] = Counter()
+
+    def work(
+        self,
+        name: str,
+        key: Hashable = None,
+        release: threading.Event | None = None,
+    ) -> str:
+        with self.lock:
+            self.order.append(name)
+            self.running[key] += 1
+            self.max_running[key] = max(self.max_running[key], self.running[key])
+        try:
+            if release is not None:
+                assert release.wait(TIMEOUT)
+        finally:
+            with self.lock:
+                self.running[key] -= 1
+        return name
+
+
+def _wait_for(predicate: Callable[[], bool]) -> None:
+    """Ожидание условия: `Future` завершается раньше, чем поток учтет это"""
+
+    deadline = time.monotonic() + TIMEOUT
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def _item(fn: Any, *args: Any, **kwargs: Any) -> WorkItem:
+    endpoint_class = kwargs.pop("endpoint_class", EndpointClass.READ)
+    group_id = kwargs.pop("group_id", None)
+    account_id = kwargs.pop("account_id", None)
+    return WorkItem(
+        endpoint_class,
+        fn,
+        args,
+        kwargs,
+        group_id=group_id,
+        account_id=account_id,
+    )
+
+
+def test_started_groups_run_before_new_groups() -> None:
+    """Работы начатой группы, в том числе поставленные из нее, идут раньше новых"""
+
+    tracker = _Tracker()
+    release = threading.Event()
+
+    with WorkScheduler(max_workers=1) as scheduler:
+
+        def first_of_a() -> str:
+            # Работа начатой группы, поставленная во время выполнения.
+            scheduler.submit(_item(tracker.work, "a3", group_id="a"))
+            return tracker.work("a1")
+
+        # Пока единственный поток занят, копим очередь.
+        blocker = scheduler.submit(_item(tracker.work, "blocker", release=release))
+        futures = [
+            scheduler.submit(_item(first_of_a, group_id="a")),
+            scheduler.submit(_item(tracker.work, "b1", group_id="b")),
+            scheduler.submit(_item(tracker.work, "a2", group_id="a")),
+            scheduler.submit(_item(tracker.work, "c1", group_id="c")),
+            scheduler.submit(_item(tracker.work, "b2", group_id="b")),
+        ]
+        release.set()
+        blocker.result(TIMEOUT)
+        for future in futures:
+            future.result(TIMEOUT)
+
+    assert tracker.order == ["blocker", "a1", "a2", "a3", "b1", "b2", "c1"]
+    assert scheduler.metrics().completed == 7
+    assert scheduler.metrics().groups_in_progress == 0
+
+
+def test_endpoint_limit_leaves_threads_for_other_classes() -> None:
+    """Лимит класса эндпоинтов не дает медленным работам занять все потоки"""
+
+    tracker = _Tracker()
+    release = threading.Event()
+
+    with WorkScheduler(
+        max_workers=4, endpoint_limits={EndpointClass.HTML_PAGE: 1}
+    ) as scheduler:
+        pages = [
+            scheduler.submit(
+                _item(
+                    tracker.work,
+                    f"page{i}",
+                    EndpointClass.HTML_PAGE,
+                    release,
+                    endpoint_class=EndpointClass.HTML_PAGE,
+                )
+            )
+            for i in range(3)
+        ]
+        # Быстрая работа выполняется, пока страница занимает свой лимит.
+        read = scheduler.submit(_item(tracker.work, "read", EndpointClass.READ))
+        assert read.result(TIMEOUT) == "read"
+        _wait_for(lambda: scheduler.metrics().completed == 1)
+
+        metrics = scheduler.metrics()
+        assert metrics.in_flight[EndpointClass.HTML_PAGE] == 1
+        assert metrics.queued[EndpointClass.HTML_PAGE] == 2
+
+        release.set()
+        for page in pages:
+            page.result(TIMEOUT)
+
+    assert tracker.max_running[EndpointClass.HTML_PAGE] == 1
+    assert [name for name in tracker.order if name.startswith("page")] == [
+        "page0",
+        "page1",
+        "page2",
+    ]
+
+
+def test_per_account_concurrency() -> None:
+    """Работы аккаунта, превысившего лимит, пропускаются и выполняются позже"""
+
+    tracker = _Tracker()
+    release = threading.Event()
+
+    with WorkScheduler(max_workers=4, per_account_concurrency=1) as scheduler:
+        account_a = [
+            scheduler.submit(_item(tracker.work, f"a{i}", "a", release, account_id="a"))
+            for i in range(3)
+        ]
+        # Работа другого аккаунта не ждет работ аккаунта `a`.
+        account_b = scheduler.submit(_item(tracker.work, "b0", "b", account_id="b"))
+        assert account_b.result(TIMEOUT) == "b0"
+        _wait_for(lambda: scheduler.metrics().completed == 1)
+
+        metrics = scheduler.metrics()
+        assert metrics.in_flight[EndpointClass.READ] == 1
+        assert metrics.queued[EndpointClass.READ] == 2
+
+        release.set()
+        assert [future.result(TIMEOUT) for future in account_a] == ["a0", "a1", "a2"]
+
+    assert tracker.max_running["a"] == 1
+    assert tracker.order.index("b0") < tracker.order.index("a1")
+
+
+def test_failed_and_cancelled_work() -> None:
+    """Исключение работы попадает в `Future`, отмененная работа не выполняется"""
+
+    tracker = _Tracker()
+    release = threading.Event()
+
+    def fail() -> None:
+        raise ValueError("failed")
+
+    with WorkScheduler(max_workers=1) as scheduler:
+        blocker = scheduler.submit(_item(tracker.work, "blocker", release=release))
+        failed = scheduler.submit(_item(fail, group_id="a"))
+        cancelled = scheduler.submit(_item(tracker.work, "cancelled", group_id="a"))
+        assert cancelled.cancel()
+        release.set()
+        blocker.result(TIMEOUT)
+        assert isinstance(failed.exception(TIMEOUT), ValueError)
+
+    assert tracker.order == ["blocker"]
+    metrics = scheduler.metrics()
+    assert metrics.completed == 3
+    assert metrics.groups_in_progress == 0
+    assert metrics.groups_waiting == 0
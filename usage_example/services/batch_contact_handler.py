@@ -0,0 +1,207 @@
+from dataclasses import (
+    field,
+    dataclass,
+)
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from django.conf import settings
+from django.db import connections
+
+from apps.amocrm.services.core.client import AmoCRMClient
+from apps.amocrm.services.core.contacts import AmoCRMContacts
+from apps.amocrm.services.core.schemas import AmoCRMContact
+from apps.amocrm.services.core import exceptions as amocrm_exceptions
+from apps.amocrm.services.amojo.client import AmoJoClient
+from apps.amocrm.services.utils.rate_limiter import RateLimiter
+from apps.amocrm.services.utils.http2_adapter import create_http_adapter
+from apps.amocrm.services.archive.interfaces.chat_messages_sink import (
+    IChatMessagesSink,
+)
+from apps.amocrm.services.journal.interfaces.contact_step_journal import (
+    IContactStepJournal,
+)
+
+from .clients import (
+    create_amojo_client,
+    create_amocrm_client,
+)
+from .chat_sinks import create_chat_messages_sink
+from .step_journal import create_step_journal
+from .contact_handler import ContactHandler
+
+
+@dataclass
+class BatchContactsResult:
+    """Результат обработки пачки контактов"""
+
+    # Контакты, обработанные успешно.
+    processed: list[int] = field(default_factory=list)
+    # Контакты без сделок, обрабатывать которые не нужно.
+    without_leads: list[int] = field(default_factory=list)
+    # Контакты, при обработке которых возникли ошибки.
+    failed: dict[int, BaseException] = field(default_factory=dict)
+
+
+class BatchContactHandler:
+    """
+    Класс для обработки пачки контактов.
+
+    В отличие от `ContactHandler`, запущенного на каждый контакт отдельно:
+
+        1. Клиенты amoCRM и amojo, их токены и пул HTTP-соединений создаются
+        один раз на всю пачку.
+        2. Сделки всех контактов запрашиваются пачками по 250 контактов,
+        а не отдельным запросом на каждый контакт.
+        3. Контакты обрабатываются параллельно в пуле потоков, а общий
+        ограничитель частоты держит суммарную нагрузку на amoCRM в рамках лимита.
+    """
+
+    def __init__(
+        self,
+        contact_ids: list[int],
+        max_workers: int | None = None,
+        rate_limit: float | None = None,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param contact_ids: ID обрабатываемых контактов.
+        :param max_workers:
+            Количество потоков обработки. По умолчанию `AMO_BATCH_WORKERS`
+            из настроек или 8.
+        :param rate_limit:
+            Максимальное количество запросов в секунду ко всем серверам
+            вместе. По умолчанию `AMO_RATE_LIMIT` из настроек или 7.
+        """
+
+        self.__contact_ids = list(dict.fromkeys(contact_ids))
+        self.__max_workers = max_workers or getattr(settings, "AMO_BATCH_WORKERS", 8)
+        self.__rate_limit = rate_limit or getattr(settings, "AMO_RATE_LIMIT", 7)
+
+    def run(self) -> BatchContactsResult:
+        """
+        Запуск обработки пачки контактов.
+
+        Ошибки отдельных контактов не прерывают обработку остальных и
+        попадают в `BatchContactsResult.failed`.
+
+        :raise AmoCRMClientInitException: В случае ошибки инициализации клиента.
+
+        :return: Результат обработки с разбивкой контактов по статусам.
+        """
+
+        result = BatchContactsResult()
+        if len(self.__contact_ids) == 0:
+            return result
+
+        # Общие для всей пачки пул соединений и ограничитель частоты.
+        session = requests.Session()
+        adapter = create_http_adapter(
+            http2=getattr(settings, "AMO_HTTP2", False),
+            max_connections=self.__max_workers,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        rate_limiter = RateLimiter(self.__rate_limit)
+
+        amocrm_client = create_amocrm_client(session, rate_limiter)
+
+        # Получаем данные всех контактов вместе со сделками пачками.
+        try:
+            contacts = AmoCRMContacts(amocrm_client).get_contacts_by_ids(
+                self.__contact_ids, [AmoCRMContacts.EmbeddedEntities.LEADS]
+            )
+        except Exception as e:
+            for contact_id in self.__contact_ids:
+                result.failed[contact_id] = e
+            return result
+
+        contacts_by_id = {contact.id: contact for contact in contacts}
+
+        contacts_to_process: list[int] = []
+        for contact_id in self.__contact_ids:
+            contact = contacts_by_id.get(contact_id)
+            leads = contact.leads if contact is not None else None
+            if leads is None:
+                result.failed[contact_id] = amocrm_exceptions.AmoCRMGetContactException(
+                    contact_id
+                )
+            elif len(leads) == 0:
+                result.without_leads.append(contact_id)
+            else:
+                contacts_to_process.append(contact_id)
+
+        if len(contacts_to_process) == 0:
+            return result
+
+        # Клиент amojo нужен, только если есть что обрабатывать.
+        try:
+            amojo_client = create_amojo_client(amocrm_client, session, rate_limiter)
+        except Exception as e:
+            for contact_id in contacts_to_process:
+                result.failed[contact_id] = e
+            return result
+
+        # Одно хранилище переписок на всю пачку: архив получает крупные файлы,
+        # а не по файлу на каждый контакт.
+        chat_sink = create_chat_messages_sink()
+        step_journal = create_step_journal()
+        try:
+            with ThreadPoolExecutor(max_workers=self.__max_workers) as executor:
+                futures = {
+                    contact_id: executor.submit(
+                        self.__process_contact,
+                        contact_id,
+                        amocrm_client,
+                        amojo_client,
+                        contacts_by_id[contact_id],
+                        chat_sink,
+                        step_journal,
+                    )
+                    for contact_id in contacts_to_process
+                }
+                for contact_id, future in futures.items():
+                    error = future.result()
+                    if error is None:
+                        result.processed.append(contact_id)
+                    else:
+                        result.failed[contact_id] = error
+        finally:
+            chat_sink.close()
+
+        return result
+
+    @staticmethod
+    def __process_contact(
+        contact_id: int,
+        amocrm_client: AmoCRMClient,
+        amojo_client: AmoJoClient,
+        contact: AmoCRMContact,
+        chat_sink: IChatMessagesSink,
+        step_journal: IContactStepJournal,
+    ) -> BaseException | None:
+        """
+        Обработка одного контакта в потоке пула.
+
+        :return: Исключение, если обработка завершилась ошибкой, иначе None.
+        """
+
+        try:
+            ContactHandler(
+                contact_id,
+                amocrm_client,
+                amojo_client,
+                leads=contact.leads,
+                contact_updated_at=contact.updated_at,
+                chat_sink=chat_sink,
+                step_journal=step_journal,
+            ).run()
+        except Exception as e:
+            return e
+        finally:
+            # Каждый поток держит свое соединение с БД, закрываем его сразу.
+            connections.close_all()
+
+        return None
@@ -0,0 +1,120 @@
+"""
+Хранилища выгруженных переписок.
+"""
+
+import os
+import socket
+
+from django.conf import settings
+
+from apps.amocrm.models import AmoCRMChatMessage
+from apps.amocrm.services.amojo.chat_unloader import AmoJoChatUnloader
+from apps.amocrm.services.archive.interfaces.chat_messages_sink import (
+    IChatMessagesSink,
+)
+from apps.amocrm.services.archive.spilling_sink import SpillingChatPagesSink
+from apps.amocrm.services.archive.deduplication import (
+    ChatMessagesDeduplicator,
+    DeduplicatingChatMessagesSink,
+)
+
+
+# Индекс сохраненных сообщений, общий для всех обработчиков в процессе воркера.
+_DEDUPLICATOR = ChatMessagesDeduplicator(
+    max_chats=getattr(settings, "AMO_DEDUP_MAX_CHATS", 10_000),
+    max_messages_per_chat=getattr(settings, "AMO_DEDUP_MAX_MESSAGES_PER_CHAT", 100_000),
+)
+
+
+class DjangoChatMessagesSink(IChatMessagesSink):
+    """
+    Сохранение сообщений в модель `AmoCRMChatMessage`.
+
+    Повторно выгруженные сообщения отбрасывает уникальное ограничение на
+    (`chat_id`, `message_id`), поэтому повторы задач на других воркерах и
+    после перезапуска не создают дублей. Индекс в памяти (см. `_DEDUPLICATOR`)
+    лишь избавляет от лишних вставок в пределах процесса.
+    """
+
+    def write(
+        self,
+        chat_id: str,
+        origin: str,
+        messages: list[AmoJoChatUnloader.ChatMessage],
+    ) -> None:
+        AmoCRMChatMessage.objects.bulk_create(
+            [
+                AmoCRMChatMessage(
+                    chat_id=message.chat_id,
+                    message_id=message.message_id,
+                    origin=origin,
+                    sender=message.sender,
+                    receiver=message.receiver,
+                    time=message.time,
+                    text=message.text,
+                    media=message.media,
+                )
+                for message in messages
+            ],
+            ignore_conflicts=True,
+        )
+
+    def close(self) -> None:
+        pass
+
+
+def create_chat_messages_sink() -> IChatMessagesSink:
+    """
+    Создание хранилища переписок из настроек проекта.
+
+    Если задан `AMO_CHAT_SPOOL_DIR`, сырые страницы переписок пишутся в спул
+    zstd JSONL в этом каталоге. Если задан `AMO_CHAT_ARCHIVE_DIR`, переписки
+    пишутся в колоночный архив Parquet. Иначе - в БД.
+
+    Если задан `AMO_CHAT_BUFFER_MEMORY_BYTES`, страницы чата сначала
+    накапливаются в буфере с этим ограничением памяти и переносятся во
+    временный файл при его превышении или при превышении резидентной памятью
+    процесса `AMO_CHAT_BUFFER_MAX_RSS_BYTES`. В хранилище чат попадает целиком
+    по завершении выгрузки.
+    """
+
+    sink = _create_storage_sink()
+
+    buffer_memory_bytes = getattr(settings, "AMO_CHAT_BUFFER_MEMORY_BYTES", None)
+    if buffer_memory_bytes is None:
+        return sink
+
+    return SpillingChatPagesSink(
+        sink,
+        max_memory_bytes=buffer_memory_bytes,
+        max_rss_bytes=getattr(settings, "AMO_CHAT_BUFFER_MAX_RSS_BYTES", None),
+        spill_dir=getattr(settings, "AMO_CHAT_BUFFER_DIR", None),
+    )
+
+
+def _create_storage_sink() -> IChatMessagesSink:
+    """Создание хранилища, в котором переписки сохраняются окончательно"""
+
+    spool_dir = getattr(settings, "AMO_CHAT_SPOOL_DIR", None)
+    if spool_dir is not None:
+        # zstandard нужен только для спула, поэтому импортируем его по требованию.
+        from apps.amocrm.services.archive.jsonl_spool import ZstdJsonlChatSpool
+
+        # В один каталог спула пишет только один процесс.
+        return ZstdJsonlChatSpool(
+            os.path.join(spool_dir, f"{socket.gethostname()}-{os.getpid()}")
+        )
+
+    archive_dir = getattr(settings, "AMO_CHAT_ARCHIVE_DIR", None)
+    if archive_dir is None:
+        return DeduplicatingChatMessagesSink(DjangoChatMessagesSink(), _DEDUPLICATOR)
+
+    # pyarrow нужен только для архива, поэтому импортируем его по требованию.
+    from apps.amocrm.services.archive.parquet_writer import ParquetChatArchiveWriter
+
+    return DeduplicatingChatMessagesSink(
+        ParquetChatArchiveWriter(
+            archive_dir, account_id=getattr(settings, "AMO_ACCOUNT_ID", "default")
+        ),
+        _DEDUPLICATOR,
+    )
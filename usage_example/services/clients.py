@@ -0,0 +1,143 @@
+"""
+Создание клиентов amoCRM и amojo из настроек проекта.
+"""
+
+import os
+import threading
+
+import requests
+
+from django.conf import settings
+
+from apps.amocrm.services.core.client import AmoCRMClient
+from apps.amocrm.services.core import exceptions as amocrm_exceptions
+from apps.amocrm.services.amojo.client import AmoJoClient
+from apps.amocrm.services.amojo import exceptions as amojo_exceptions
+from apps.amocrm.services.utils.rate_limiter import RateLimiter
+from apps.amocrm.services.utils.single_flight import SingleFlight
+from apps.amocrm.services.utils.circuit_breaker import (
+    CircuitBreakerRegistry,
+    CircuitBreakerSettings,
+)
+from apps.amocrm.services.instrumentation.interfaces.request_hook import IRequestHook
+from apps.amocrm.services.tokens.interfaces.token_managed import ITokenManaged
+
+from apps.amocrm.tokens_managers import AmoCRMTokensManager
+
+
+# Предохранители общие для всех клиентов процесса: если amojo или amoCRM
+# недоступны, задачи воркера узнают об этом сразу, а не по таймаутам.
+CIRCUIT_BREAKERS = CircuitBreakerRegistry(
+    CircuitBreakerSettings(
+        failure_rate_threshold=getattr(settings, "AMO_BREAKER_FAILURE_RATE", 0.5),
+        slow_call_duration=getattr(settings, "AMO_BREAKER_SLOW_CALL_DURATION", 10.0),
+        open_timeout=getattr(settings, "AMO_BREAKER_OPEN_TIMEOUT", 30.0),
+    )
+)
+
+
+# Одинаковые одновременные GET-запросы потоков процесса (например, страница
+# одной и той же сделки) выполняются одним запросом.
+SINGLE_FLIGHT = SingleFlight()
+
+# Менеджеры токенов в общих файлах, по одному на имя в процессе.
+_MMAP_TOKENS_MANAGERS: dict[str, ITokenManaged] = {}
+_MMAP_TOKENS_MANAGERS_LOCK = threading.Lock()
+
+
+def get_tokens_manager(name: str) -> ITokenManaged:
+    """
+    Менеджер токенов из настроек проекта.
+
+    Если задан `AMO_TOKENS_MMAP_DIR`, токены хранятся в отображаемых в память
+    файлах этого каталога, общих для всех воркеров машины: воркеры читают
+    токены без запросов к БД, а обновленные одним воркером токены сразу видны
+    остальным. Пустой файл заполняется токенами из БД. Иначе токены хранятся в БД.
+
+    :param name: Уникальное название менеджера.
+    """
+
+    mmap_dir = getattr(settings, "AMO_TOKENS_MMAP_DIR", None)
+    if mmap_dir is None:
+        return AmoCRMTokensManager(name)
+
+    with _MMAP_TOKENS_MANAGERS_LOCK:
+        tokens_manager = _MMAP_TOKENS_MANAGERS.get(name)
+        if tokens_manager is None:
+            from apps.amocrm.services.tokens.managers.mmap_tokens_manager import (
+                MmapTokensManager,
+            )
+
+            tokens_manager = MmapTokensManager(
+                os.path.join(mmap_dir, f"{name}.tokens"), name
+            )
+            with tokens_manager.refresh_lock():
+                if tokens_manager.get_tokens() is None:
+                    db_tokens = AmoCRMTokensManager(name).get_tokens()
+                    if db_tokens is not None:
+                        tokens_manager.save_tokens(db_tokens)
+            _MMAP_TOKENS_MANAGERS[name] = tokens_manager
+
+    return tokens_manager
+
+
+def create_amocrm_client(
+    session: requests.Session | None = None,
+    rate_limiter: RateLimiter | None = None,
+    request_hooks: list[IRequestHook] | None = None,
+    circuit_breakers: CircuitBreakerRegistry | None = CIRCUIT_BREAKERS,
+    single_flight: SingleFlight | None = SINGLE_FLIGHT,
+) -> AmoCRMClient:
+    """
+    Создание клиента для работы с API amoCRM.
+
+    :raise AmoCRMClientInitException: В случае ошибки инициализации клиента.
+    """
+
+    try:
+        return AmoCRMClient(
+            base_url=settings.AMO_BASE_URL,
+            secret_key=settings.AMO_SECRET_KEY,
+            integration_id=settings.AMO_INTEGRATION_ID,
+            auth_code=settings.AMO_AUTH_CODE,
+            redirect_url=settings.AMO_REDIRECT_URL,
+            tokens_manager=get_tokens_manager("amocrm_client"),
+            request_hooks=request_hooks,
+            session=session,
+            rate_limiter=rate_limiter,
+            circuit_breakers=circuit_breakers,
+            single_flight=single_flight,
+        )
+    except Exception as e:
+        raise amocrm_exceptions.AmoCRMClientInitException() from e
+
+
+def create_amojo_client(
+    amocrm_client: AmoCRMClient,
+    session: requests.Session | None = None,
+    rate_limiter: RateLimiter | None = None,
+    request_hooks: list[IRequestHook] | None = None,
+    circuit_breakers: CircuitBreakerRegistry | None = CIRCUIT_BREAKERS,
+    single_flight: SingleFlight | None = SINGLE_FLIGHT,
+) -> AmoJoClient:
+    """
+    Создание клиента для работы с закрытым API Чатов.
+
+    :param amocrm_client: Клиент amoCRM, через который получаются токены amojo.
+
+    :raise AmoJoClientInitException: В случае ошибки инициализации клиента.
+    """
+
+    try:
+        return AmoJoClient(
+            base_url=settings.AMOJO_BASE_URL,
+            amocrm_client=amocrm_client,
+            tokens_manager=get_tokens_manager("amojo_client"),
+            request_hooks=request_hooks,
+            session=session,
+            rate_limiter=rate_limiter,
+            circuit_breakers=circuit_breakers,
+            single_flight=single_flight,
+        )
+    except Exception as e:
+        raise amojo_exceptions.AmoJoClientInitException() from e
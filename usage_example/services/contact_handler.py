@@ -1,13 +1,16 @@
-from itertools import groupby
-
 from django.conf import settings
-from django.db import transaction
+from django.db import (
+    connections,
+    transaction,
+)
 
 from apps.amocrm.services.core.talks import AmoCRMTalks
 from apps.amocrm.services.core.client import AmoCRMClient
 from apps.amocrm.services.core.contacts import AmoCRMContacts
+from apps.amocrm.services.core.schemas import AmoCRMLead
 from apps.amocrm.services.core import exceptions as amocrm_exceptions
 from apps.amocrm.services.core.communication_channels.channel_data import (
+    AmoCRMContactChannels,
     AmoCRMCommunicationChannelData,
 )
 from apps.amocrm.services.core.communication_channels.channel_unlinker import (
@@ -16,14 +19,45 @@ from apps.amocrm.services.core.communication_channels.channel_unlinker import (
 from apps.amocrm.services.core.communication_channels.channel_data_parser import (
     AmoCRMCommunicationChannelsDataParser,
 )
+from apps.amocrm.services.core.communication_channels.channel_screener import (
+    AmoCRMChannelsScreeningResult,
+    AmoCRMCommunicationChannelsScreener,
+)
 
 from apps.amocrm.services.amojo.client import AmoJoClient
-from apps.amocrm.services.amojo import exceptions as amojo_exceptions
 from apps.amocrm.services.amojo.chat_unloader import AmoJoChatUnloader
+from apps.amocrm.services.utils.ttl_cache import TTLCache
+from apps.amocrm.services.archive.interfaces.chat_messages_sink import (
+    IChatMessagesSink,
+)
+from apps.amocrm.services.archive.interfaces.raw_chat_pages_sink import (
+    IRawChatPagesSink,
+)
+from apps.amocrm.services.planning.action_plan import AmoCRMOperationType
+from apps.amocrm.services.journal.interfaces.contact_step_journal import (
+    IContactStepJournal,
+)
 
-from apps.amocrm.tokens_managers import AmoCRMTokensManager
+from .clients import (
+    create_amojo_client,
+    create_amocrm_client,
+)
+from .chat_sinks import create_chat_messages_sink
+from .step_journal import create_step_journal
+from .contact_trace import (
+    ContactTrace,
+    ContactProfiler,
+)
 
-from ..models import AmoCRMChatMessage
+
+# Кэш предварительной проверки каналов контактов, общий для всех
+# обработчиков в процессе воркера.
+_SCREENING_CACHE: TTLCache[int, tuple[int | None, AmoCRMChannelsScreeningResult]] = (
+    TTLCache(
+        maxsize=getattr(settings, "AMO_SCREENING_CACHE_SIZE", 100_000),
+        ttl=getattr(settings, "AMO_SCREENING_CACHE_TTL", 24 * 60 * 60),
+    )
+)
 
 
 class ContactHandler:
@@ -38,118 +72,334 @@ class ContactHandler:
 
         1. Получает информацию о контакте с ID связанных сделок.
         2. Если сделки есть, берет любую (первую, например), запрашивает
-        страницу этой сделки и парсит с нее данные о каналах связи с контактом.
+        страницу этой сделки и быстро проверяет, есть ли у контакта дубли
+        каналов связи. Если дублей нет, обработка на этом заканчивается.
+        Иначе парсит со страницы данные о каналах связи с контактом.
         3. Группирует каналы связей по источникам и в каждой такое группе
         удаляет все каналы связи, сохраняя переписку из них и закрывая беседы,
         кроме последнего. Здесь порядок каналов связи на странице берем на веру, что он
         отображает их хронологию по времени. Именно поэтому сохраняем переписки из каналов,
         которые имеют более низкий порядковый номер.
+        4. Открепляет все каналы, переписки которых сохранены, одновременными запросами.
+
+    Выполненные шаги каждого канала (выгрузка, закрытие бесед, открепление)
+    записываются в журнал. Если обработка контакта завершилась ошибкой,
+    при повторе выполненные шаги пропускаются. После успешной обработки
+    журнал контакта очищается.
     """
 
-    def __init__(self, contact_id: int) -> None:
+    def __init__(
+        self,
+        contact_id: int,
+        amocrm_client: AmoCRMClient | None = None,
+        amojo_client: AmoJoClient | None = None,
+        leads: list[AmoCRMLead] | None = None,
+        contact_updated_at: int | None = None,
+        chat_sink: IChatMessagesSink | None = None,
+        step_journal: IContactStepJournal | None = None,
+    ) -> None:
         """
         Инициализатор класса.
 
         :param contact_id: ID обрабатываемого контакта.
+        :param amocrm_client:
+            Готовый клиент amoCRM. Если None, клиент создается из настроек.
+            Передается, когда клиенты разделяются между несколькими контактами.
+        :param amojo_client: Готовый клиент amojo. Если None, создается из настроек.
+        :param leads:
+            Заранее полученные сделки контакта. Если None, сделки будут
+            запрошены у amoCRM.
+        :param contact_updated_at:
+            Время последнего изменения контакта. Нужно вместе с `leads`, чтобы
+            пользоваться кэшем предварительной проверки каналов.
+        :param chat_sink:
+            Хранилище выгруженных переписок. Если None, создается из настроек
+            и закрывается по окончании обработки контакта.
+        :param step_journal:
+            Журнал выполненных шагов. Если None, создается из настроек.
         """
 
         self.__contact_id = contact_id
+        self.__amocrm_client = amocrm_client
+        self.__amojo_client = amojo_client
+        self.__leads = leads
+        self.__contact_updated_at = contact_updated_at
+        self.__chat_sink = chat_sink
+        self.__step_journal = step_journal or create_step_journal()
+        # Есть ли в журнале шаги контакта, которые нужно очистить.
+        self.__has_journal_entries = False
+        self.__trace = ContactTrace(contact_id)
+        self.__profiler = ContactProfiler(
+            sample_rate=getattr(settings, "AMO_PROFILE_SAMPLE_RATE", 0.0),
+            backend=getattr(settings, "AMO_PROFILER", ContactProfiler.CPROFILE),
+            output_dir=getattr(settings, "AMO_PROFILE_DIR", "profiles"),
+        )
+
+    @property
+    def trace(self) -> ContactTrace:
+        return self.__trace
 
     def run(self) -> None:
-        """Запуск обработки контакта"""
+        """
+        Запуск обработки контакта.
 
-        # Инициализируем клиент для работы с amoCRM.
+        По завершении, в том числе с ошибкой, пишет в лог одну сводную
+        запись с таймингами всех этапов и каналов. После успешной обработки
+        очищает журнал шагов контакта, если в нем что-то было.
+        """
+
+        chat_sink = self.__chat_sink or create_chat_messages_sink()
+
+        error: BaseException | None = None
         try:
-            amocrm_client = AmoCRMClient(
-                base_url=settings.AMO_BASE_URL,
-                secret_key=settings.AMO_SECRET_KEY,
-                integration_id=settings.AMO_INTEGRATION_ID,
-                auth_code=settings.AMO_AUTH_CODE,
-                redirect_url=settings.AMO_REDIRECT_URL,
-                tokens_manager=AmoCRMTokensManager("amocrm_client"),
-            )
-        except Exception as e:
-            raise amocrm_exceptions.AmoCRMClientInitException() from e
+            with self.__profiler.profile(self.__trace, self.__contact_id):
+                self.__process(chat_sink)
+            # Большинство контактов отсеивается проверкой, не оставляя шагов в
+            # журнале: для них лишний запрос к журналу не нужен. Шаги прошлой
+            # попытки контакта, отсеянного теперь проверкой, удаляются вместе
+            # с самим контактом (см. `tasks._delete_contacts`).
+            if self.__has_journal_entries:
+                self.__step_journal.clear(self.__contact_id)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            if self.__chat_sink is None:
+                chat_sink.close()
+            self.__trace.emit(error)
+
+    def __process(self, chat_sink: IChatMessagesSink) -> None:
+        """
+        Обработка контакта по этапам.
+
+        :param chat_sink: Хранилище выгруженных переписок.
+        """
+
+        trace = self.__trace
+
+        # Инициализируем клиент для работы с amoCRM.
+        amocrm_client = self.__amocrm_client
+        if amocrm_client is None:
+            with trace.stage("amocrm_client_init"):
+                amocrm_client = create_amocrm_client()
 
         # Получим информацию по сделкам контакта.
-        try:
-            leads = AmoCRMContacts(amocrm_client).get_leads_by_contact(
-                self.__contact_id
-            )
-        except Exception as e:
-            raise amocrm_exceptions.AmoCRMGetContactException(self.__contact_id) from e
+        leads = self.__leads
+        contact_updated_at = self.__contact_updated_at
+        if leads is None:
+            with trace.stage("leads_fetch"):
+                try:
+                    contact = AmoCRMContacts(amocrm_client).get_contact_with_leads(
+                        self.__contact_id
+                    )
+                except Exception as e:
+                    raise amocrm_exceptions.AmoCRMGetContactException(
+                        self.__contact_id
+                    ) from e
+                leads = contact.leads
+                contact_updated_at = contact.updated_at
+        trace.increment("leads", len(leads))
 
         if len(leads) == 0:
             raise amocrm_exceptions.AmoCRMNoLeadsException()
 
-        # Инициализация клиента для работы с закрытым API Чатов.
-        try:
-            amojo_client = AmoJoClient(
-                base_url=settings.AMOJO_BASE_URL,
-                amocrm_client=amocrm_client,
-                tokens_manager=AmoCRMTokensManager("amojo_client"),
+        # Дешево проверяем, есть ли у контакта дубли каналов. Большинству
+        # контактов обработка не нужна, и для них не стоит ни разбирать
+        # страницу сделки целиком, ни поднимать клиент amojo.
+        screener = AmoCRMCommunicationChannelsScreener(amocrm_client, _SCREENING_CACHE)
+        with trace.stage("screening", lead_id=leads[0].id) as span:
+            screening = screener.screen(
+                self.__contact_id, leads[0].id, contact_updated_at
             )
-        except Exception as e:
-            raise amojo_exceptions.AmoJoClientInitException() from e
+            span.attributes["from_cache"] = screening.from_cache
+        if not screening.has_duplicates:
+            trace.increment("screened_out")
+            return
 
-        amocrm_talks = AmoCRMTalks(amocrm_client)
-        amocrm_chat_unlinker = AmoCRMCommunicationChannelUnlinker(amocrm_client)
+        # Инициализация клиента для работы с закрытым API Чатов.
+        amojo_client = self.__amojo_client
+        if amojo_client is None:
+            with trace.stage("amojo_client_init"):
+                amojo_client = create_amojo_client(amocrm_client)
 
-        # Парсим со страницы сделки все данные о каналах связи с контактом.
-        channels_data = AmoCRMCommunicationChannelsDataParser(amocrm_client).parse(
-            leads[0]["id"], self.__contact_id
+        amocrm_talks = AmoCRMTalks(amocrm_client)
+        # Потоки открепления могут открыть соединения с БД при повторной
+        # авторизации, закрываем их сразу.
+        amocrm_chat_unlinker = AmoCRMCommunicationChannelUnlinker(
+            amocrm_client, thread_cleanup=connections.close_all
         )
 
-        # Сюда будем собирать ошибки при обработке источников.
-        process_origins_errors: list[Exception] = []
-
-        # Группируем каналы связи по типу источника (whatsapp, viber, telegram и прочее).
-        for origin, grouper_channels in groupby(
-            channels_data, key=lambda channel_data: channel_data.origin
-        ):
-            try:
-                # Сортируем сгруппированные каналы связи по порядковому номеру.
-                # Порядковый номер обозначает хронологию чатов с контактом.
-                sorted_channels_data: list[AmoCRMCommunicationChannelData] = sorted(
-                    grouper_channels,
-                    key=lambda channel_data: channel_data.serial_number,
+        # Парсим со страницы сделки все данные о каналах связи с контактом.
+        # Страница обычно уже получена при проверке, повторно ее не запрашиваем.
+        parser = AmoCRMCommunicationChannelsDataParser(amocrm_client)
+        with trace.stage("lead_page_parse", lead_id=leads[0].id):
+            contact_channels: AmoCRMContactChannels
+            if screening.lead_page is not None:
+                contact_channels = parser.parse_page(
+                    screening.lead_page, self.__contact_id
                 )
+            else:
+                contact_channels = parser.parse(leads[0].id, self.__contact_id)
+            trace.increment("channels", len(contact_channels))
 
-                # Сюда будем сохранять ошибки, возникшие в ходе обработки каналов.
-                process_channels_errors: list[Exception] = []
-
-                # В каждой группе каналов связи у всех старых каналов (всех, кроме последнего),
-                # выгрузим переписку, закроем все беседы и открепим эти каналы.
-                # Затем, выгруженную переписку сохраним КУДА-ТО (решение куда пока что еще не принято).
-                for channel_data in sorted_channels_data[:-1]:
-                    try:
-                        with transaction.atomic():
-                            # Выгружаем сообщения из чата "пачками", а не все сразу.
-                            for messages in AmoJoChatUnloader(
-                                amojo_client, channel_data.chat_id
-                            ):
-                                messages_models = [
-                                    AmoCRMChatMessage(**message.__dict__)
-                                    for message in messages
-                                ]
-                                AmoCRMChatMessage.objects.bulk_create(messages_models)
-
-                            # Закрываем беседы канала и отключаем канал от контакта.
-                            amocrm_talks.close_talks_by_chat_id(channel_data.chat_id)
-                            amocrm_chat_unlinker.unlink_chat(channel_data)
-                    except* Exception as e:
-                        process_channels_errors.append(e)
-
-                if len(process_channels_errors) > 0:
-                    raise ExceptionGroup(
-                        f"Ошибки при обработке {len(process_channels_errors)} каналов источника {origin}",
-                        process_channels_errors,
-                    )
-            except* Exception as e:
-                process_origins_errors.append(e)
+        # Каналы контакта сейчас изменятся, старый результат проверки больше
+        # не актуален.
+        screener.invalidate(self.__contact_id)
+
+        # Шаги, выполненные при прошлых попытках обработки контакта.
+        completed_steps = self.__step_journal.get_completed_steps(self.__contact_id)
+        if len(completed_steps) > 0:
+            self.__has_journal_entries = True
+
+        # Сюда будем собирать ошибки при обработке каналов по источникам.
+        channels_errors: dict[str, list[Exception]] = {}
+        # Каналы, переписка которых выгружена, а беседы закрыты. Открепляются
+        # все вместе одновременными запросами.
+        channels_to_unlink: list[AmoCRMCommunicationChannelData] = []
+
+        # Каналы связи уже сгруппированы по типу источника (whatsapp, viber, telegram
+        # и прочее) и упорядочены по порядковому номеру, который обозначает хронологию
+        # чатов с контактом. Обрабатываем только источники с устаревшими каналами.
+        for origin, stale_channels in contact_channels.stale_by_origin.items():
+            # В каждой группе каналов связи у всех старых каналов (всех, кроме последнего),
+            # выгрузим переписку в хранилище и закроем все беседы.
+            for channel_data in stale_channels:
+                chat_id = channel_data.chat_id
+                chat_completed_steps = {
+                    step
+                    for step_chat_id, step in completed_steps
+                    if step_chat_id == chat_id
+                }
+                if AmoCRMOperationType.UNLINK in chat_completed_steps:
+                    trace.increment("skipped_steps")
+                    continue
+
+                # Шаги канала, выполненные в этой попытке.
+                steps: list[AmoCRMOperationType] = []
+                try:
+                    with (
+                        trace.stage("channel", origin=origin, chat_id=chat_id),
+                        transaction.atomic(),
+                    ):
+                        # Выгружаем сообщения из чата "пачками", а не все сразу.
+                        if AmoCRMOperationType.UNLOAD in chat_completed_steps:
+                            trace.increment("skipped_steps")
+                        else:
+                            with trace.stage("unload"):
+                                self.__unload_chat(
+                                    amojo_client, chat_sink, chat_id, origin
+                                )
+                            # Выгрузка считается выполненной, а канал можно
+                            # открепить, только когда переписка надежно
+                            # сохранена, а не лежит в буферах хранилища.
+                            with trace.stage("flush"):
+                                chat_sink.flush_chat(chat_id)
+                            steps.append(AmoCRMOperationType.UNLOAD)
+
+                        # Закрываем беседы канала.
+                        if AmoCRMOperationType.CLOSE_TALKS in chat_completed_steps:
+                            trace.increment("skipped_steps")
+                        else:
+                            with trace.stage("close_talks"):
+                                trace.increment(
+                                    "talks",
+                                    amocrm_talks.close_talks_by_chat_id(chat_id),
+                                )
+                            steps.append(AmoCRMOperationType.CLOSE_TALKS)
+                except* Exception as e:
+                    # Транзакция канала откатилась вместе с его сообщениями.
+                    # Переписку, выгруженную при прошлой попытке, не трогаем.
+                    if AmoCRMOperationType.UNLOAD not in chat_completed_steps:
+                        chat_sink.rollback_chat(chat_id)
+                    channels_errors.setdefault(origin, []).append(e)
+                else:
+                    # Шаги записываются после фиксации транзакции: если
+                    # запись не удалась, шаги просто выполнятся повторно.
+                    self.__mark_completed(chat_id, steps, channels_errors, origin)
+                    channels_to_unlink.append(channel_data)
 
-        if len(process_origins_errors) > 0:
+        # Отключаем от контакта все каналы, переписка которых сохранена. Запросы
+        # идут одновременно, поэтому открепление занимает время одного запроса.
+        if len(channels_to_unlink) > 0:
+            with trace.stage("unlink", channels=len(channels_to_unlink)):
+                for unlink_result in amocrm_chat_unlinker.unlink_chats(
+                    channels_to_unlink
+                ):
+                    channel_data = unlink_result.channel_data
+                    if unlink_result.error is not None:
+                        channels_errors.setdefault(channel_data.origin, []).append(
+                            unlink_result.error
+                        )
+                    else:
+                        self.__mark_completed(
+                            channel_data.chat_id,
+                            [AmoCRMOperationType.UNLINK],
+                            channels_errors,
+                            channel_data.origin,
+                        )
+
+        if len(channels_errors) > 0:
             raise ExceptionGroup(
                 f"Ошибки при обработке каналов контакта {self.__contact_id}",
-                process_origins_errors,
+                [
+                    ExceptionGroup(
+                        f"Ошибки при обработке {len(errors)} каналов источника {origin}",
+                        errors,
+                    )
+                    for origin, errors in channels_errors.items()
+                ],
             )
+
+    def __unload_chat(
+        self,
+        amojo_client: AmoJoClient,
+        chat_sink: IChatMessagesSink,
+        chat_id: str,
+        origin: str,
+    ) -> None:
+        """
+        Выгрузка переписки чата в хранилище.
+
+        :param amojo_client: Клиент amojo.
+        :param chat_sink: Хранилище выгруженных переписок.
+        :param chat_id: ID чата.
+        :param origin: Источник канала связи.
+        """
+
+        trace = self.__trace
+        chat_unloader = AmoJoChatUnloader(amojo_client, chat_id)
+        # Хранилищу сырых страниц сообщения не разбираем.
+        if isinstance(chat_sink, IRawChatPagesSink):
+            for page in chat_unloader.iter_raw_pages():
+                chat_sink.write_page(chat_id, origin, page)
+                trace.increment("pages")
+            chat_sink.finish_chat(chat_id)
+        else:
+            for messages in chat_unloader:
+                chat_sink.write(chat_id, origin, messages)
+                trace.increment("pages")
+                trace.increment("messages", len(messages))
+
+    def __mark_completed(
+        self,
+        chat_id: str,
+        steps: list[AmoCRMOperationType],
+        channels_errors: dict[str, list[Exception]],
+        origin: str,
+    ) -> None:
+        """
+        Запись выполненных шагов канала в журнал.
+
+        Ошибка записи не отменяет выполненных шагов, поэтому она только
+        добавляется к ошибкам каналов источника.
+        """
+
+        if len(steps) == 0:
+            return
+
+        # Даже неудачная запись могла частично попасть в журнал.
+        self.__has_journal_entries = True
+        try:
+            self.__step_journal.mark_completed(self.__contact_id, chat_id, steps)
+        except Exception as e:
+            channels_errors.setdefault(origin, []).append(e)
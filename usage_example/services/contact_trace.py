@@ -0,0 +1,256 @@
+"""
+Трассировка и профилирование обработки контакта.
+
+`ContactTrace` записывает спаны для каждого этапа обработки контакта и каждого
+канала связи, копит счетчики (сообщения, страницы, беседы) и в конце выдает
+одну сводную запись на контакт. `ContactProfiler` по желанию профилирует
+выборочные контакты через cProfile или pyinstrument.
+"""
+
+import json
+import time
+import uuid
+import random
+import logging
+import cProfile
+import threading
+from pathlib import Path
+from typing import (
+    Any,
+    Iterator,
+)
+from contextlib import contextmanager
+from dataclasses import (
+    field,
+    dataclass,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Профилировщик может быть активен только один на процесс: с Python 3.12
+# повторный `cProfile.Profile.enable()` при активном профилировщике падает.
+_PROFILER_LOCK = threading.Lock()
+
+
+@dataclass(slots=True)
+class Span:
+    """Отрезок времени, затраченный на один этап обработки"""
+
+    span_id: int
+    parent_id: int | None
+    name: str
+    started_at: float
+    duration: float = 0.0
+    error: str | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+
+class ContactTrace:
+    """Контекст трассировки обработки одного контакта"""
+
+    def __init__(self, contact_id: int) -> None:
+        """
+        Инициализатор класса.
+
+        :param contact_id: ID обрабатываемого контакта.
+        """
+
+        self.__contact_id = contact_id
+        self.__trace_id = uuid.uuid4().hex
+        self.__started_at = time.perf_counter()
+
+        self.__spans: list[Span] = []
+        self.__stack: list[Span] = []
+        self.__counters: dict[str, int] = {}
+
+    @property
+    def trace_id(self) -> str:
+        return self.__trace_id
+
+    @property
+    def spans(self) -> list[Span]:
+        return self.__spans
+
+    @property
+    def counters(self) -> dict[str, int]:
+        return self.__counters
+
+    @contextmanager
+    def stage(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """
+        Замер этапа обработки.
+
+        Вложенные этапы становятся дочерними спанами текущего этапа.
+
+        :param name: Название этапа.
+        :param attributes: Произвольные атрибуты спана.
+        """
+
+        span = Span(
+            span_id=len(self.__spans),
+            parent_id=self.__stack[-1].span_id if self.__stack else None,
+            name=name,
+            started_at=time.perf_counter() - self.__started_at,
+            attributes=attributes,
+        )
+        self.__spans.append(span)
+        self.__stack.append(span)
+
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            self.__stack.pop()
+
+    def increment(self, counter: str, value: int = 1) -> None:
+        """
+        Увеличение счетчика контакта и текущего спана.
+
+        :param counter: Название счетчика.
+        :param value: Величина увеличения.
+        """
+
+        self.__counters[counter] = self.__counters.get(counter, 0) + value
+        if self.__stack:
+            attributes = self.__stack[-1].attributes
+            attributes[counter] = attributes.get(counter, 0) + value
+
+    def summary(self, error: BaseException | None = None) -> dict[str, Any]:
+        """
+        Формирование сводной записи по контакту.
+
+        :param error: Исключение, с которым завершилась обработка.
+
+        :return: Словарь, пригодный для сериализации в JSON.
+        """
+
+        # Суммарное время по названиям этапов, чтобы сразу видеть горячие места.
+        stages: dict[str, float] = {}
+        for span in self.__spans:
+            stages[span.name] = stages.get(span.name, 0.0) + span.duration
+
+        return {
+            "trace_id": self.__trace_id,
+            "contact_id": self.__contact_id,
+            "status": "error" if error is not None else "ok",
+            "error": type(error).__name__ if error is not None else None,
+            "duration": round(time.perf_counter() - self.__started_at, 6),
+            "counters": dict(self.__counters),
+            "stages": {name: round(value, 6) for name, value in stages.items()},
+            "spans": [
+                {
+                    "id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "name": span.name,
+                    "start": round(span.started_at, 6),
+                    "duration": round(span.duration, 6),
+                    "error": span.error,
+                    **span.attributes,
+                }
+                for span in self.__spans
+            ],
+        }
+
+    def emit(self, error: BaseException | None = None) -> None:
+        """
+        Запись сводки по контакту в лог одной строкой.
+
+        :param error: Исключение, с которым завершилась обработка.
+        """
+
+        summary = self.summary(error)
+        logger.info(
+            json.dumps(summary, ensure_ascii=False, default=str),
+            extra={"contact_trace": summary},
+        )
+
+
+class ContactProfiler:
+    """
+    Выборочное профилирование обработки контактов.
+
+    Профилирует долю контактов, заданную `sample_rate`, и сохраняет
+    результаты в `output_dir`: `.prof` для cProfile и `.html` для pyinstrument.
+
+    Одновременно профилируется только один контакт процесса: контакты,
+    попавшие в выборку, пока профилируется другой (например, в соседнем
+    потоке пула), обрабатываются без профилирования.
+    """
+
+    CPROFILE = "cprofile"
+    PYINSTRUMENT = "pyinstrument"
+
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        backend: str = CPROFILE,
+        output_dir: str | Path = "profiles",
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param sample_rate: Доля профилируемых контактов от 0 до 1.
+        :param backend: `cprofile` или `pyinstrument`.
+        :param output_dir: Директория для сохранения профилей.
+        """
+
+        if backend not in (self.CPROFILE, self.PYINSTRUMENT):
+            raise ValueError(f"Неизвестный профилировщик: {backend}")
+
+        self.__sample_rate = sample_rate
+        self.__backend = backend
+        self.__output_dir = Path(output_dir)
+
+    @contextmanager
+    def profile(self, trace: ContactTrace, contact_id: int) -> Iterator[None]:
+        """
+        Профилирование блока кода, если контакт попал в выборку.
+
+        :param trace: Трассировка контакта, ее ID попадает в имя файла.
+        :param contact_id: ID обрабатываемого контакта.
+        """
+
+        if self.__sample_rate <= 0 or random.random() >= self.__sample_rate:
+            yield
+            return
+
+        if not _PROFILER_LOCK.acquire(blocking=False):
+            yield
+            return
+
+        try:
+            with self.__profile(trace, contact_id):
+                yield
+        finally:
+            _PROFILER_LOCK.release()
+
+    @contextmanager
+    def __profile(self, trace: ContactTrace, contact_id: int) -> Iterator[None]:
+        """Профилирование блока кода выбранным профилировщиком"""
+
+        self.__output_dir.mkdir(parents=True, exist_ok=True)
+        file_stem = self.__output_dir / f"contact_{contact_id}_{trace.trace_id}"
+
+        if self.__backend == self.PYINSTRUMENT:
+            from pyinstrument import Profiler
+
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                file_stem.with_suffix(".html").write_text(profiler.output_html())
+        else:
+            c_profiler = cProfile.Profile()
+            c_profiler.enable()
+            try:
+                yield
+            finally:
+                c_profiler.disable()
+                c_profiler.dump_stats(file_stem.with_suffix(".prof"))
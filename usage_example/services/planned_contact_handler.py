@@ -0,0 +1,208 @@
+from typing import Iterator
+from contextlib import contextmanager
+
+import requests
+
+from django.conf import settings
+from django.db import (
+    connections,
+    transaction,
+)
+
+from apps.amocrm.services.core import exceptions as amocrm_exceptions
+from apps.amocrm.services.core.communication_channels.channel_screener import (
+    AmoCRMCommunicationChannelsScreener,
+)
+from apps.amocrm.services.utils.rate_limiter import RateLimiter
+from apps.amocrm.services.utils.http2_adapter import create_http_adapter
+from apps.amocrm.services.scheduling.work_item import EndpointClass
+from apps.amocrm.services.scheduling.work_scheduler import WorkScheduler
+from apps.amocrm.services.planning.action_plan import (
+    AmoCRMSkipReason,
+    AmoCRMActionPlan,
+    AmoCRMChannelPlan,
+)
+from apps.amocrm.services.planning.plan_executor import AmoCRMPlanExecutor
+from apps.amocrm.services.planning.contacts_planner import AmoCRMContactsPlanner
+
+from .clients import (
+    create_amojo_client,
+    create_amocrm_client,
+)
+from .chat_sinks import create_chat_messages_sink
+from .contact_handler import _SCREENING_CACHE
+from .batch_contact_handler import BatchContactsResult
+
+
+@contextmanager
+def _channel_transaction(_: AmoCRMChannelPlan) -> Iterator[None]:
+    """Транзакция обработки канала в потоке планировщика"""
+
+    try:
+        with transaction.atomic():
+            yield
+    finally:
+        # Каждый поток планировщика держит свое соединение с БД, закрываем его сразу.
+        connections.close_all()
+
+
+class PlannedContactsHandler:
+    """
+    Класс для обработки пачки контактов в две фазы: планирование и выполнение.
+
+    В отличие от `BatchContactHandler`, где каждый контакт обрабатывается
+    от начала до конца отдельно и чтения перемежаются изменениями:
+
+        1. Сначала выполняются все чтения по всем контактам: контакты,
+        страницы сделок, беседы чатов (пачками) и оценки размеров чатов.
+        Результат - план изменений с оценкой количества запросов.
+        2. Затем план выполняется: каналы всех контактов обрабатываются
+        параллельно, беседы заново не запрашиваются.
+
+    В режиме `dry_run` выполняется только первая фаза, в amoCRM ничего не меняется.
+    """
+
+    def __init__(
+        self,
+        contact_ids: list[int],
+        max_workers: int | None = None,
+        rate_limit: float | None = None,
+        probe_chat_sizes: bool | None = None,
+    ) -> None:
+        """
+        Инициализатор класса.
+
+        :param contact_ids: ID обрабатываемых контактов.
+        :param max_workers:
+            Количество потоков планировщика. По умолчанию `AMO_BATCH_WORKERS`
+            из настроек или 8.
+        :param rate_limit:
+            Максимальное количество запросов в секунду ко всем серверам
+            вместе. По умолчанию `AMO_RATE_LIMIT` из настроек или 7.
+        :param probe_chat_sizes:
+            Оценивать ли размеры чатов пробными запросами. Пробы стоят
+            нескольких легких запросов на чат. По умолчанию
+            `AMO_PLAN_PROBE_CHAT_SIZES` из настроек или True.
+        """
+
+        self.__contact_ids = list(dict.fromkeys(contact_ids))
+        self.__max_workers = max_workers or getattr(settings, "AMO_BATCH_WORKERS", 8)
+        self.__rate_limit = rate_limit or getattr(settings, "AMO_RATE_LIMIT", 7)
+        self.__probe_chat_sizes = (
+            probe_chat_sizes
+            if probe_chat_sizes is not None
+            else getattr(settings, "AMO_PLAN_PROBE_CHAT_SIZES", True)
+        )
+
+    def plan(self) -> AmoCRMActionPlan:
+        """
+        Составление плана без изменений в amoCRM (dry run).
+
+        :raise AmoCRMClientInitException: В случае ошибки инициализации клиента.
+
+        :return: План обработки контактов.
+        """
+
+        return self.__run(dry_run=True)[0]
+
+    def run(self) -> BatchContactsResult:
+        """
+        Составление и выполнение плана.
+
+        Ошибки отдельных контактов не прерывают обработку остальных и
+        попадают в `BatchContactsResult.failed`.
+
+        :raise AmoCRMClientInitException: В случае ошибки инициализации клиента.
+
+        :return: Результат обработки с разбивкой контактов по статусам.
+        """
+
+        return self.__run(dry_run=False)[1]
+
+    def __run(self, dry_run: bool) -> tuple[AmoCRMActionPlan, BatchContactsResult]:
+        """
+        Планирование и, если это не `dry_run`, выполнение плана.
+
+        :return: План и результат выполнения.
+        """
+
+        result = BatchContactsResult()
+        if len(self.__contact_ids) == 0:
+            return AmoCRMActionPlan(), result
+
+        # Общие для обеих фаз пул соединений и ограничитель частоты.
+        session = requests.Session()
+        adapter = create_http_adapter(
+            http2=getattr(settings, "AMO_HTTP2", False),
+            max_connections=self.__max_workers,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        rate_limiter = RateLimiter(self.__rate_limit)
+
+        amocrm_client = create_amocrm_client(session, rate_limiter)
+        # Без проб размеров чатов клиент amojo нужен только для выполнения.
+        amojo_client = (
+            create_amojo_client(amocrm_client, session, rate_limiter)
+            if self.__probe_chat_sizes or not dry_run
+            else None
+        )
+        screener = AmoCRMCommunicationChannelsScreener(amocrm_client, _SCREENING_CACHE)
+
+        # Каждый канал при выполнении - одна работа класса выгрузки из amojo,
+        # поэтому этот класс может занимать все потоки.
+        with WorkScheduler(
+            self.__max_workers,
+            endpoint_limits={EndpointClass.AMOJO_PAGING: self.__max_workers},
+        ) as scheduler:
+            try:
+                plan = AmoCRMContactsPlanner(
+                    amocrm_client,
+                    scheduler,
+                    amojo_client if self.__probe_chat_sizes else None,
+                    screener,
+                ).plan(self.__contact_ids)
+            except Exception as e:
+                for contact_id in self.__contact_ids:
+                    result.failed[contact_id] = e
+                return AmoCRMActionPlan(), result
+
+            for contact_plan in plan.contacts:
+                if contact_plan.error is not None:
+                    result.failed[contact_plan.contact_id] = contact_plan.error
+                elif contact_plan.skip_reason == AmoCRMSkipReason.NOT_FOUND:
+                    result.failed[contact_plan.contact_id] = (
+                        amocrm_exceptions.AmoCRMGetContactException(
+                            contact_plan.contact_id
+                        )
+                    )
+                elif contact_plan.skip_reason == AmoCRMSkipReason.NO_LEADS:
+                    result.without_leads.append(contact_plan.contact_id)
+                elif contact_plan.skip_reason == AmoCRMSkipReason.NO_DUPLICATES:
+                    result.processed.append(contact_plan.contact_id)
+
+            if dry_run:
+                return plan, result
+
+            assert amojo_client is not None
+            chat_sink = create_chat_messages_sink()
+            try:
+                execution = AmoCRMPlanExecutor(
+                    amocrm_client,
+                    amojo_client,
+                    chat_sink,
+                    scheduler,
+                    _channel_transaction,
+                ).execute(plan)
+            finally:
+                chat_sink.close()
+
+        # Каналы обработанных контактов изменились, как и каналы контактов,
+        # часть каналов которых обработать не удалось.
+        for contact_id in execution.processed + list(execution.failed):
+            screener.invalidate(contact_id)
+
+        result.processed.extend(execution.processed)
+        result.failed.update(execution.failed)
+
+        return plan, result
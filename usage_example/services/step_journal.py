@@ -0,0 +1,45 @@
+"""
+Журнал выполненных шагов обработки контактов.
+"""
+
+import threading
+
+from django.conf import settings
+
+from apps.amocrm.services.journal.interfaces.contact_step_journal import (
+    IContactStepJournal,
+)
+
+from apps.amocrm.step_journals import AmoCRMContactStepJournal
+
+
+# Журналы в файлах SQLite, по одному на путь в процессе.
+_SQLITE_JOURNALS: dict[str, IContactStepJournal] = {}
+_SQLITE_JOURNALS_LOCK = threading.Lock()
+
+
+def create_step_journal() -> IContactStepJournal:
+    """
+    Журнал шагов из настроек проекта.
+
+    Если задан `AMO_STEP_JOURNAL_SQLITE_PATH`, шаги хранятся в этом файле
+    SQLite, общем для воркеров одной машины. Иначе шаги хранятся в БД и
+    видны воркерам всех машин.
+    """
+
+    sqlite_path = getattr(settings, "AMO_STEP_JOURNAL_SQLITE_PATH", None)
+    if sqlite_path is None:
+        return AmoCRMContactStepJournal()
+
+    with _SQLITE_JOURNALS_LOCK:
+        journal = _SQLITE_JOURNALS.get(sqlite_path)
+        if journal is None:
+            from apps.amocrm.services.journal.sqlite_journal import (
+                SQLiteContactStepJournal,
+            )
+
+            journal = _SQLITE_JOURNALS[sqlite_path] = SQLiteContactStepJournal(
+                sqlite_path
+            )
+
+    return journal
@@ -0,0 +1,59 @@
+"""
+Постановка контактов в обработку по вебхукам amoCRM.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.amocrm.services.core.webhooks import AmoCRMWebhookEvent
+
+from ..models import AmoCRMContact
+from ..tasks import delete_contacts_chats_task
+
+
+def _debounce_key(contact_id: int) -> str:
+    return f"amocrm:webhook:contact:{contact_id}"
+
+
+def ingest_webhook_events(events: list[AmoCRMWebhookEvent]) -> list[int]:
+    """
+    Постановка в обработку контактов, затронутых событиями вебхука.
+
+    События одного контакта объединяются в окне `AMO_WEBHOOK_DEBOUNCE_SECONDS`:
+    первое событие ставит задачу с задержкой на длину окна, а следующие за
+    ним события того же контакта до запуска задачи ничего не ставят. Так
+    объединение дублей и пачка новых бесед, приходящие несколькими вебхуками,
+    обрабатываются одной задачей, когда amoCRM уже закончит изменения.
+    Признак поставленной задачи хранится в кэше Django, общем для всех
+    процессов веб-сервера.
+
+    Контакты записываются в `AmoCRMContact`, чтобы при ошибке обработки они
+    остались в БД со статусом необработанных.
+
+    :param events: События вебхука.
+
+    :return: ID контактов, для которых поставлены задачи.
+    """
+
+    window = getattr(settings, "AMO_WEBHOOK_DEBOUNCE_SECONDS", 30)
+
+    # Порядок важен только для читаемости логов, поэтому dict, а не set.
+    contact_ids = list(dict.fromkeys(event.contact_id for event in events))
+    if len(contact_ids) == 0:
+        return []
+
+    AmoCRMContact.objects.bulk_create(
+        [AmoCRMContact(contact_id=contact_id) for contact_id in contact_ids],
+        ignore_conflicts=True,
+    )
+
+    enqueued: list[int] = []
+    for contact_id in contact_ids:
+        # `add` атомарен: из одновременных вебхуков задачу поставит только один.
+        # Ключ живет до запуска задачи, поэтому события, пришедшие во время
+        # обработки, поставят новую задачу.
+        if cache.add(_debounce_key(contact_id), True, timeout=window):
+            delete_contacts_chats_task.apply_async((contact_id,), countdown=window)
+            enqueued.append(contact_id)
+
+    return enqueued
@@ -4,17 +4,66 @@
 
 import logging
 import traceback
+from typing import Any
 from celery import shared_task
 
+from django.conf import settings
+
 from apps.amocrm.services.core.exceptions import AmoCRMNoLeadsException
+from apps.amocrm.services.utils.exceptions import CircuitBreakerOpenException
 
 from .models import AmoCRMContact
+from .services.step_journal import create_step_journal
 from .services.contact_handler import ContactHandler
+from .services.batch_contact_handler import BatchContactHandler
+from .services.planned_contact_handler import PlannedContactsHandler
 
 
 logger = logging.getLogger(__name__)
 
 
+def _find_circuit_breaker_error(
+    error: BaseException,
+) -> CircuitBreakerOpenException | None:
+    """
+    Поиск исключения разомкнутого предохранителя среди вложенных исключений
+    и их причин.
+
+    :param error: Исключение или группа исключений.
+
+    :return: Найденное исключение или None.
+    """
+
+    if isinstance(error, CircuitBreakerOpenException):
+        return error
+
+    if isinstance(error, BaseExceptionGroup):
+        for nested_error in error.exceptions:
+            found = _find_circuit_breaker_error(nested_error)
+            if found is not None:
+                return found
+
+    if error.__cause__ is not None:
+        return _find_circuit_breaker_error(error.__cause__)
+
+    return None
+
+
+def _delete_contacts(contact_ids: list[int]) -> None:
+    """
+    Удаление обработанных контактов вместе с их шагами в журнале.
+
+    Контакт, частично обработанный при прошлой попытке, при повторе может
+    быть отсеян проверкой, и тогда обработчик не знает о его шагах в журнале.
+    Очистка здесь не оставляет в журнале шагов удаленных контактов.
+
+    :param contact_ids: ID контактов.
+    """
+
+    AmoCRMContact.objects.filter(contact_id__in=contact_ids).delete()
+    create_step_journal().clear_many(contact_ids)
+
+
 @shared_task
 def delete_contacts_chats_task(contact_id: int) -> None:
     """
@@ -28,17 +77,127 @@ def delete_contacts_chats_task(contact_id: int) -> None:
     # Начнем обработку контакта.
     # В случае возникновения какой-либо ошибки, кроме `AmoCRMNoLeadsException`,
     # поменяем статус контакта на `необработанный`.
+    # Если amoCRM или amojo недоступны, отложим контакт до замыкания предохранителя.
     # Если контакт обработался успешно, удалим его из БД.
     try:
         ContactHandler(contact_id).run()
     except* AmoCRMNoLeadsException:
-        AmoCRMContact.objects.filter(contact_id=contact_id).delete()
+        _delete_contacts([contact_id])
         logger.info(f"Контакт {contact_id} обрабатывать не нужно, сделок нет")
-    except* Exception:
-        AmoCRMContact.objects.filter(contact_id=contact_id).update(
+    except* Exception as errors:
+        circuit_breaker_error = _find_circuit_breaker_error(errors)
+        if circuit_breaker_error is not None:
+            delete_contacts_chats_task.apply_async(
+                (contact_id,), countdown=max(circuit_breaker_error.retry_after, 1.0)
+            )
+            logger.warning(
+                f"Обработка контакта {contact_id} отложена: "
+                f"{circuit_breaker_error.message}"
+            )
+        else:
+            AmoCRMContact.objects.filter(contact_id=contact_id).update(
+                status=AmoCRMContact.Status.UNPROCESSED
+            )
+            logger.error(traceback.format_exc())
+    else:
+        _delete_contacts([contact_id])
+        logger.info(f"Контакт {contact_id} успешно обработан")
+
+
+@shared_task
+def delete_contacts_chats_batch_task(contact_ids: list[int]) -> None:
+    """
+    Задача на удаление лишних чатов у пачки контактов.
+
+    Клиенты, токены и соединения создаются один раз на всю пачку, а статусы
+    контактов обновляются двумя запросами к БД вместо запросов на каждый контакт.
+    Если включен `AMO_BATCH_PLANNER`, пачка обрабатывается по заранее
+    составленному плану (см. `PlannedContactsHandler`).
+
+    :param contact_ids: ID обрабатываемых контактов.
+    """
+
+    logger.info(f"Началась обработка {len(contact_ids)} контактов")
+
+    handler_class = (
+        PlannedContactsHandler
+        if getattr(settings, "AMO_BATCH_PLANNER", False)
+        else BatchContactHandler
+    )
+    try:
+        result = handler_class(contact_ids).run()
+    except Exception as e:
+        circuit_breaker_error = _find_circuit_breaker_error(e)
+        if circuit_breaker_error is not None:
+            delete_contacts_chats_batch_task.apply_async(
+                (contact_ids,), countdown=max(circuit_breaker_error.retry_after, 1.0)
+            )
+            logger.warning(f"Обработка пачки отложена: {circuit_breaker_error.message}")
+            return
+
+        AmoCRMContact.objects.filter(contact_id__in=contact_ids).update(
             status=AmoCRMContact.Status.UNPROCESSED
         )
         logger.error(traceback.format_exc())
-    else:
-        AmoCRMContact.objects.filter(contact_id=contact_id).delete()
-        logger.info(f"Контакт {contact_id} успешно обработан")
+        return
+
+    # Контакты без сделок, как и успешно обработанные, больше не нужны.
+    _delete_contacts(result.processed + result.without_leads)
+
+    # Контакты, упавшие из-за недоступности хоста, откладываем целиком,
+    # а не помечаем необработанными.
+    postponed: list[int] = []
+    retry_after = 1.0
+    for contact_id, error in list(result.failed.items()):
+        circuit_breaker_error = _find_circuit_breaker_error(error)
+        if circuit_breaker_error is not None:
+            postponed.append(contact_id)
+            retry_after = max(retry_after, circuit_breaker_error.retry_after)
+            del result.failed[contact_id]
+    if len(postponed) > 0:
+        delete_contacts_chats_batch_task.apply_async(
+            (postponed,), countdown=retry_after
+        )
+        logger.warning(
+            f"Обработка {len(postponed)} контактов отложена на {retry_after:.1f} с: "
+            f"хост недоступен"
+        )
+
+    if len(result.failed) > 0:
+        AmoCRMContact.objects.filter(contact_id__in=list(result.failed)).update(
+            status=AmoCRMContact.Status.UNPROCESSED
+        )
+        for contact_id, error in result.failed.items():
+            logger.error(
+                f"Ошибка при обработке контакта {contact_id}",
+                exc_info=(type(error), error, error.__traceback__),
+            )
+
+    logger.info(
+        f"Обработано контактов: {len(result.processed)}, без сделок: "
+        f"{len(result.without_leads)}, с ошибками: {len(result.failed)}"
+    )
+
+
+@shared_task
+def plan_contacts_chats_task(contact_ids: list[int]) -> dict[str, Any]:
+    """
+    Задача на составление плана обработки пачки контактов без изменений (dry run).
+
+    Нужна для оценки объема работы: сколько каналов придется обработать,
+    сколько бесед закрыть и сколько запросов к каким эндпоинтам это займет.
+
+    :param contact_ids: ID контактов.
+
+    :return: План в виде, пригодном для сериализации в JSON.
+    """
+
+    plan = PlannedContactsHandler(contact_ids).plan().to_dict()
+    summary = plan["summary"]
+    logger.info(
+        f"План по {summary['contacts']} контактам: каналов {summary['channels']}, "
+        f"бесед {summary['talks_to_close']}, сообщений до "
+        f"{summary['estimated_messages']}, запросов {summary['execution_requests']}"
+    )
+
+    return plan
@@ -0,0 +1,50 @@
+"""
+Прием вебхуков amoCRM.
+
+Пример подключения в `urls.py`::
+
+    path("amocrm/webhook/<str:secret>/", views.amocrm_webhook_view)
+
+Адрес с секретом указывается в настройках вебхука в amoCRM: сама amoCRM
+вебхуки не подписывает.
+"""
+
+import hmac
+import logging
+
+from django.conf import settings
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+)
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from apps.amocrm.services.core.webhooks import parse_webhook
+
+from .services.webhook_ingestion import ingest_webhook_events
+
+
+logger = logging.getLogger(__name__)
+
+
+@csrf_exempt
+@require_POST
+def amocrm_webhook_view(request: HttpRequest, secret: str) -> HttpResponse:
+    """
+    Прием вебхука об изменении контактов и новых беседах.
+
+    Вебхук только ставит задачи и сразу отвечает: amoCRM отключает вебхуки,
+    которые отвечают медленно или с ошибками.
+    """
+
+    if not hmac.compare_digest(secret, settings.AMO_WEBHOOK_SECRET):
+        return HttpResponse(status=404)
+
+    events = parse_webhook(request.POST.items())
+    enqueued = ingest_webhook_events(events)
+    logger.info(
+        f"Вебхук amoCRM: событий {len(events)}, поставлено контактов {len(enqueued)}"
+    )
+
+    return HttpResponse(status=204)